@@ -1,14 +1,15 @@
-from pynput import mouse, keyboard
 import threading
 import time
 from datetime import datetime
 
 class ActivityMonitor:
-    def __init__(self, db, user_id, timetrack_id, log_interval=60):
-        self.db = db
+    def __init__(self, sink, user_id, timetrack_id, log_interval=60, on_level=None):
+        # Destino das leituras: agente de ingestão ou o banco (ver telemetry.py)
+        self.sink = sink
         self.user_id = user_id
         self.timetrack_id = timetrack_id
         self.log_interval = log_interval  # Intervalo de log em segundos
+        self.on_level = on_level  # Chamado com o nível de cada leitura registrada
         
         self.mouse_events = 0
         self.keyboard_events = 0
@@ -25,6 +26,9 @@ class ActivityMonitor:
             
         self.is_monitoring = True
         
+        # Importado só aqui: o pynput é lento e exige um servidor gráfico ao ser carregado
+        from pynput import mouse, keyboard
+        
         # Inicia listeners em threads separadas
         self.mouse_listener = mouse.Listener(
             on_move=self.on_mouse_move,
@@ -87,7 +91,7 @@ class ActivityMonitor:
             self._log_current_activity()
             
     def _log_current_activity(self):
-        """Registra o nível atual de atividade no banco de dados"""
+        """Envia o nível de atividade do último intervalo"""
         with self.lock:
             # Calcula o nível de atividade (0-100)
             # Considera tanto eventos de mouse quanto teclado
@@ -105,8 +109,12 @@ class ActivityMonitor:
             if time.time() - self.last_activity > self.log_interval:
                 activity_level = 0
                 
-        # Registra no banco de dados
-        self.db.log_activity(self.timetrack_id, activity_level)
+        self.sink.send_activity(self.timetrack_id, activity_level)
+        if self.on_level:
+            try:
+                self.on_level(activity_level)
+            except Exception as e:
+                print(f"Erro ao notificar nível de atividade: {e}")
         
     def get_current_activity_level(self):
         """Retorna o nível atual de atividade (0-100)"""
@@ -1,40 +1,284 @@
+import base64
 import bcrypt
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from state_store import MemoryStateStore, get_state_store
+
+# Custo do bcrypt e limites do pool de verificação (configuráveis por ambiente)
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+AUTH_WORKERS = int(os.getenv('AUTH_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+AUTH_MAX_PENDING = int(os.getenv('AUTH_MAX_PENDING', str(AUTH_WORKERS * 4)))
+
+# Tokens de sessão assinados (HMAC) para restaurar logins sem bcrypt
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', str(12 * 3600)))
+SESSION_SECRET = os.getenv('SESSION_SECRET')
+if not SESSION_SECRET:
+    # Sem segredo configurado os tokens valem apenas para este processo
+    print("Aviso: SESSION_SECRET não definido; sessões não sobrevivem a reinícios.")
+    SESSION_SECRET = secrets.token_hex(32)
+
+# bcrypt libera o GIL, então um pool de threads limita o uso de CPU sem bloquear a UI
+_hash_pool = ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix='bcrypt')
+_pending = threading.BoundedSemaphore(AUTH_MAX_PENDING)
+
+class LoginRateLimited(Exception):
+    """Tentativa de login rejeitada antes da verificação da senha."""
+
+def _run_in_pool(func, *args):
+    """Executa uma operação de bcrypt no pool, rejeitando se a fila estiver cheia."""
+    if not _pending.acquire(blocking=False):
+        raise LoginRateLimited("Servidor ocupado. Tente novamente em alguns segundos.")
+    try:
+        return _hash_pool.submit(func, *args).result()
+    finally:
+        _pending.release()
+
+def hash_password(password):
+    """Gera o hash bcrypt da senha com o custo configurado"""
+    hashed = _run_in_pool(
+        lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+    )
+    return hashed.decode('utf-8')
+
+def check_password(password, hashed):
+    """Verifica a senha contra o hash armazenado"""
+    return _run_in_pool(
+        lambda: bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    )
+
+@lru_cache(maxsize=1)
+def _dummy_hash():
+    """Hash fictício, com o custo configurado, para logins de usuários inexistentes"""
+    return bcrypt.hashpw(secrets.token_bytes(16), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+class LoginRateLimiter:
+    """Limita tentativas de login falhas por usuário e por IP.
+
+    As falhas são contadas no armazenamento de estado (compartilhado entre os
+    workers, ver state_store), em uma janela de window_seconds a partir da
+    primeira falha.
+    """
+
+    def __init__(self, max_per_user=None, max_per_ip=None, window_seconds=None, store=None):
+        self.max_per_user = max_per_user or int(os.getenv('LOGIN_MAX_ATTEMPTS_USER', '5'))
+        # O IP costuma ser compartilhado (quiosques), então o limite é maior
+        self.max_per_ip = max_per_ip or int(os.getenv('LOGIN_MAX_ATTEMPTS_IP', '50'))
+        self.window_seconds = window_seconds or int(os.getenv('LOGIN_WINDOW_SECONDS', '300'))
+        self.store = store or MemoryStateStore()
+
+    def _keys(self, username, ip):
+        keys = [(f"login:user:{username.lower()}", self.max_per_user)]
+        if ip:
+            keys.append((f"login:ip:{ip}", self.max_per_ip))
+        return keys
+
+    def is_allowed(self, username, ip=None):
+        """Retorna False se o usuário ou o IP excederam o limite de falhas"""
+        for key, limit in self._keys(username, ip):
+            if (self.store.get(key) or 0) >= limit:
+                return False
+        return True
+
+    def record_failure(self, username, ip=None):
+        for key, _limit in self._keys(username, ip):
+            self.store.incr(key, ttl=self.window_seconds)
+
+    def reset(self, username):
+        self.store.delete(f"login:user:{username.lower()}")
+
+# Um limitador por processo: cada sessão da página cria o seu AuthManager, e
+# contadores por sessão seriam zerados a cada recarga
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_login_rate_limiter(db=None):
+    """Retorna o limitador de tentativas de login compartilhado pelo processo."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = LoginRateLimiter(store=get_state_store(db))
+        return _rate_limiter
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+class SessionTokens:
+    """Emite e valida tokens de sessão assinados com HMAC-SHA256.
+
+    O token carrega ``user_id:versão:expira_em:token_id``; a validação é
+    apenas uma comparação de HMAC e a consulta aos tokens revogados, guardados
+    no armazenamento de estado (compartilhado entre os workers, ver
+    state_store). A versão é a users.session_version do usuário na emissão:
+    quem restaura a sessão a compara com a atual, e a troca de senha (que
+    incrementa a versão) invalida os tokens já emitidos.
+    """
+
+    def __init__(self, secret=None, ttl_seconds=None, store=None):
+        self.secret = (secret or SESSION_SECRET).encode('utf-8')
+        self.ttl_seconds = ttl_seconds or SESSION_TTL_SECONDS
+        self.store = store or MemoryStateStore()
+
+    def _sign(self, payload):
+        return hmac.new(self.secret, payload, hashlib.sha256).digest()
+
+    def issue(self, user_id, version=0):
+        """Gera um token para o usuário com validade de ttl_seconds"""
+        expires_at = int(time.time()) + self.ttl_seconds
+        payload = f"{user_id}:{version}:{expires_at}:{secrets.token_urlsafe(12)}".encode('utf-8')
+        return f"{_b64encode(payload)}.{_b64encode(self._sign(payload))}"
+
+    def _decode(self, token):
+        """Retorna (user_id, version, expires_at, token_id) se a assinatura for válida"""
+        try:
+            payload_part, signature_part = token.split('.', 1)
+            payload = _b64decode(payload_part)
+            if not hmac.compare_digest(self._sign(payload), _b64decode(signature_part)):
+                return None
+            user_id, version, expires_at, token_id = payload.decode('utf-8').split(':', 3)
+            return int(user_id), int(version), int(expires_at), token_id
+        except (ValueError, TypeError):
+            return None
+
+    def validate(self, token):
+        """Retorna (user_id, version) do token, ou None se inválido, expirado ou revogado"""
+        decoded = self._decode(token) if token else None
+        if not decoded:
+            return None
+
+        user_id, version, expires_at, token_id = decoded
+        if expires_at < time.time():
+            return None
+
+        if self.store.get(f"revoked:{token_id}"):
+            return None
+        return user_id, version
+
+    def revoke(self, token):
+        """Revoga o token até a sua expiração"""
+        decoded = self._decode(token) if token else None
+        if not decoded:
+            return
+
+        _user_id, _version, expires_at, token_id = decoded
+        ttl = expires_at - time.time()
+        # Tokens já expirados não precisam constar como revogados
+        if ttl > 0:
+            self.store.set(f"revoked:{token_id}", True, ttl=int(ttl) + 1)
 
 class AuthManager:
-    def __init__(self, db):
+    def __init__(self, db, rate_limiter=None, session_tokens=None):
         self.db = db
         self.current_user = None
-        
-    def login(self, username, password):
+        self.rate_limiter = rate_limiter or get_login_rate_limiter(db)
+        self.session_tokens = session_tokens or SessionTokens(store=get_state_store(db))
+
+    def login(self, username, password, ip=None):
         """Autentica usuário"""
-        query = "SELECT * FROM users WHERE username = %s"
+        if not self.rate_limiter.is_allowed(username, ip):
+            raise LoginRateLimited("Muitas tentativas de login. Aguarde alguns minutos.")
+
+        query = """
+            SELECT id, username, password, full_name, role, hourly_rate, session_version,
+                   location_tracking_consent, activity_tracking_consent
+            FROM users WHERE username = %s AND status = 'active'
+        """
         users = self.db.execute_query(query, (username,))
-        
+
         if users and len(users) > 0:
             user = users[0]
-            stored_password = user['password'].encode('utf-8')
-            
-            if bcrypt.checkpw(password.encode('utf-8'), stored_password):
-                self.current_user = user
-                return user
+            stored_password = user.pop('password')
+        else:
+            # Usuário inexistente: confere com um hash fictício para que o tempo
+            # de resposta não revele quais usuários existem
+            user, stored_password = None, _dummy_hash()
+
+        if check_password(password, stored_password) and user is not None:
+            self.rate_limiter.reset(username)
+            self._rehash_if_needed(user['id'], password, stored_password)
+            self.current_user = user
+            return user
+
+        self.rate_limiter.record_failure(username, ip)
         return None
-        
+
+    def issue_session_token(self, user):
+        """Emite um token de sessão para o usuário autenticado"""
+        return self.session_tokens.issue(user['id'], user.get('session_version') or 0)
+
+    def restore_session(self, token):
+        """Restaura a sessão a partir de um token, sem verificar a senha.
+
+        Falha para usuários desativados e para tokens emitidos antes da
+        última troca de senha (session_version diferente).
+        """
+        validated = self.session_tokens.validate(token)
+        if not validated:
+            return None
+
+        user_id, version = validated
+        query = """
+            SELECT id, username, full_name, role, hourly_rate, session_version,
+                   location_tracking_consent, activity_tracking_consent
+            FROM users WHERE id = %s AND status = 'active'
+        """
+        users = self.db.execute_query(query, (user_id,))
+        if not users or users[0]['session_version'] != version:
+            return None
+
+        self.current_user = users[0]
+        return self.current_user
+
+    def revoke_session(self, token):
+        """Revoga um token de sessão (logout)"""
+        self.session_tokens.revoke(token)
+
+    def _rehash_if_needed(self, user_id, password, stored_password):
+        """Atualiza em segundo plano hashes gerados com outro custo de bcrypt"""
+        if int(stored_password.split('$')[2]) == BCRYPT_ROUNDS:
+            return
+
+        # Também conta no limite da fila; com ela cheia fica para o próximo login
+        if not _pending.acquire(blocking=False):
+            return
+
+        def rehash():
+            try:
+                hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+                self.db.execute_query(
+                    "UPDATE users SET password = %s WHERE id = %s",
+                    (hashed.decode('utf-8'), user_id)
+                )
+            finally:
+                _pending.release()
+
+        _hash_pool.submit(rehash)
+
     def logout(self):
         """Desloga usuário atual"""
         self.current_user = None
-        
+
     def register_user(self, username, password, full_name, role='colaborador'):
         """Registra novo usuário (apenas admin)"""
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        
+        hashed_password = hash_password(password)
+
         query = """
             INSERT INTO users (username, password, full_name, role)
             VALUES (%s, %s, %s, %s)
         """
-        return self.db.execute_query(query, (username, hashed_password.decode('utf-8'), full_name, role))
-        
+        return self.db.execute_query(query, (username, hashed_password, full_name, role))
+
     def is_admin(self, user=None):
         """Verifica se usuário é admin"""
         if user is None:
             user = self.current_user
-        return user and user.get('role') == 'admin'
\ No newline at end of file
+        return user and user.get('role') == 'admin'
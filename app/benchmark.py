@@ -0,0 +1,457 @@
+"""Benchmark da camada de dados (Database e ReportGenerator).
+
+Popula um banco MySQL/MariaDB local com dados sintéticos em várias escalas e
+mede o tempo de cada método público, gravando os resultados em JSON Lines
+para acompanhamento de regressões.
+
+Uso:
+    python benchmark.py --scales 10,100,500 --days 365 --output bench.jsonl
+
+O banco indicado em --db-name é apagado e recriado a cada escala; por
+segurança o nome precisa conter "bench".
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import mysql.connector
+from dotenv import load_dotenv
+
+# Métodos de inicialização/infraestrutura que não fazem sentido medir isoladamente
+SKIPPED_METHODS = {
+    'connect': 'infraestrutura',
+    'create_database_if_not_exists': 'inicialização',
+    'create_tables': 'inicialização',
+    'create_default_admin': 'inicialização',
+    'create_default_projects': 'inicialização',
+    'execute_query': 'infraestrutura',
+    'execute_many': 'infraestrutura',
+    'execute_transaction': 'infraestrutura',
+    'execute_update': 'infraestrutura',
+    'fetch_records': 'infraestrutura',
+    'stream_query': 'infraestrutura',
+    'wait_ready': 'inicialização',
+    'advisory_lock': 'infraestrutura',
+}
+
+class SyntheticDataGenerator:
+    """Gera e insere em lote um conjunto de dados sintético com distribuições realistas."""
+
+    BATCH_SIZE = 5000
+
+    def __init__(self, db, users, projects, tasks_per_project=15, days=365,
+                 telemetry_days=30, activity_interval=15, seed=42):
+        self.db = db
+        self.users = users
+        self.projects = projects
+        self.tasks_per_project = tasks_per_project
+        self.days = days
+        self.telemetry_days = telemetry_days
+        self.activity_interval = activity_interval
+        self.random = random.Random(seed)
+        self.counts = {}
+
+    def _flush(self, table, columns, rows):
+        if not rows:
+            return
+        placeholders = ', '.join(['%s'] * len(columns))
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        self.db.execute_many(query, rows)
+        self.counts[table] = self.counts.get(table, 0) + len(rows)
+        rows.clear()
+
+    def _insert_all(self, table, columns, rows):
+        for start in range(0, len(rows), self.BATCH_SIZE):
+            self._flush(table, columns, rows[start:start + self.BATCH_SIZE])
+
+    def seed(self):
+        """Popula usuários, projetos, tarefas, ponto, pausas e telemetria."""
+        rnd = self.random
+        # Um único hash de custo baixo: o benchmark não mede bcrypt
+        import bcrypt
+        password = bcrypt.hashpw(b"bench123", bcrypt.gensalt(rounds=4)).decode('utf-8')
+
+        self._insert_all('users', (
+            'username', 'password', 'full_name', 'role', 'hourly_rate',
+            'location_tracking_consent', 'activity_tracking_consent'
+        ), [
+            (f"bench_user_{i}", password, f"Colaborador Sintético {i:05d}", 'colaborador',
+             round(rnd.uniform(20, 150), 2), rnd.random() < 0.5, rnd.random() < 0.8)
+            for i in range(self.users)
+        ])
+        self._insert_all('projects', ('name', 'description', 'hourly_rate'), [
+            (f"Projeto Sintético {i:04d}", "Projeto gerado pelo benchmark",
+             round(rnd.uniform(80, 250), 2) if rnd.random() < 0.7 else None)
+            for i in range(self.projects)
+        ])
+
+        project_ids = [row['id'] for row in self.db.execute_query(
+            "SELECT id FROM projects WHERE name LIKE 'Projeto Sintético%%' ORDER BY id")]
+        self._insert_all('tasks', ('project_id', 'name', 'status'), [
+            (project_id, f"Tarefa {t}", rnd.choices(
+                ['pending', 'in_progress', 'completed'], weights=[3, 2, 5])[0])
+            for project_id in project_ids
+            for t in range(self.tasks_per_project)
+        ])
+
+        users = self.db.execute_query(
+            "SELECT id, location_tracking_consent, activity_tracking_consent "
+            "FROM users WHERE username LIKE 'bench_user_%%' ORDER BY id")
+        tasks_by_project = {}
+        for row in self.db.execute_query("SELECT id, project_id FROM tasks ORDER BY id"):
+            tasks_by_project.setdefault(row['project_id'], []).append(row['id'])
+        admin_id = self.db.execute_query("SELECT id FROM users WHERE role = 'admin' LIMIT 1")[0]['id']
+
+        self._seed_timetrack(users, project_ids, tasks_by_project, admin_id)
+        self.db.rebuild_activity_rollup()
+        self.db.rebuild_counters()
+        return self.counts
+
+    def _seed_timetrack(self, users, project_ids, tasks_by_project, admin_id):
+        rnd = self.random
+        today = date.today()
+        first_day = today - timedelta(days=self.days)
+        telemetry_start = today - timedelta(days=self.telemetry_days)
+
+        timetrack_columns = (
+            'id', 'user_id', 'project_id', 'task_id', 'check_in', 'check_out', 'total_hours',
+            'date', 'manual_entry', 'manual_entry_reason', 'approved_by'
+        )
+        break_columns = ('timetrack_id', 'start_time', 'end_time', 'break_type', 'total_minutes')
+        activity_columns = ('timetrack_id', 'timestamp', 'activity_level')
+        location_columns = ('timetrack_id', 'timestamp', 'latitude', 'longitude', 'city', 'region', 'country', 'timezone')
+
+        timetrack_rows, break_rows, activity_rows, location_rows = [], [], [], []
+        timetrack_id = 0
+
+        for user in users:
+            # Cada colaborador concentra o trabalho em poucos projetos
+            preferred = rnd.sample(project_ids, k=min(3, len(project_ids)))
+            weights = [0.6, 0.3, 0.1][:len(preferred)]
+            base_lat, base_lng = rnd.uniform(-23.7, -23.4), rnd.uniform(-46.8, -46.4)
+
+            day = first_day
+            while day <= today:
+                if day.weekday() >= 5 or rnd.random() > 0.92:
+                    day += timedelta(days=1)
+                    continue
+
+                timetrack_id += 1
+                check_in = datetime.combine(day, datetime.min.time()) + timedelta(
+                    minutes=max(360, rnd.gauss(510, 25)))
+                duration = max(1.0, rnd.gauss(8.5, 0.75))
+                check_out = check_in + timedelta(hours=duration)
+                is_open = day == today
+                project_id = rnd.choices(preferred, weights=weights)[0]
+                tasks = tasks_by_project.get(project_id) or [None]
+                manual = rnd.random() < 0.03
+
+                timetrack_rows.append((
+                    timetrack_id, user['id'], project_id, rnd.choice(tasks), check_in,
+                    None if is_open else check_out,
+                    None if is_open else round(duration, 2),
+                    day, manual, "Esqueci de registrar o ponto" if manual else None,
+                    admin_id if manual and rnd.random() < 0.5 else None
+                ))
+
+                # Almoço e pausas curtas
+                if rnd.random() < 0.9:
+                    lunch_start = datetime.combine(day, datetime.min.time()) + timedelta(
+                        minutes=rnd.gauss(735, 30))
+                    lunch_minutes = max(20, int(rnd.gauss(60, 10)))
+                    break_rows.append((timetrack_id, lunch_start,
+                                       lunch_start + timedelta(minutes=lunch_minutes), 'lunch', lunch_minutes))
+                for _ in range(rnd.randint(0, 2)):
+                    rest_start = check_in + timedelta(hours=rnd.uniform(1, max(1.5, duration - 1)))
+                    rest_minutes = rnd.randint(5, 15)
+                    break_rows.append((timetrack_id, rest_start,
+                                       rest_start + timedelta(minutes=rest_minutes), 'rest', rest_minutes))
+
+                if day >= telemetry_start:
+                    if user['activity_tracking_consent']:
+                        stamp = check_in
+                        while stamp < check_out:
+                            level = int(100 * rnd.betavariate(2, 2))
+                            activity_rows.append((timetrack_id, stamp, level))
+                            stamp += timedelta(minutes=self.activity_interval)
+                    if user['location_tracking_consent']:
+                        for stamp in (check_in, check_out):
+                            location_rows.append((
+                                timetrack_id, stamp,
+                                round(base_lat + rnd.gauss(0, 0.01), 8),
+                                round(base_lng + rnd.gauss(0, 0.01), 8),
+                                'São Paulo', 'São Paulo', 'Brazil', 'America/Sao_Paulo'
+                            ))
+
+                if len(timetrack_rows) >= self.BATCH_SIZE:
+                    self._flush('timetrack', timetrack_columns, timetrack_rows)
+                # Filhos só depois do pai estar gravado (chaves estrangeiras)
+                if not timetrack_rows:
+                    self._flush_children(break_columns, break_rows, activity_columns, activity_rows,
+                                         location_columns, location_rows)
+                day += timedelta(days=1)
+
+        self._flush('timetrack', timetrack_columns, timetrack_rows)
+        self._flush_children(break_columns, break_rows, activity_columns, activity_rows,
+                             location_columns, location_rows)
+
+    def _flush_children(self, break_columns, break_rows, activity_columns, activity_rows,
+                        location_columns, location_rows):
+        for table, columns, rows in (('breaks', break_columns, break_rows),
+                                     ('activity_logs', activity_columns, activity_rows),
+                                     ('location_logs', location_columns, location_rows)):
+            while rows:
+                chunk = rows[:self.BATCH_SIZE]
+                del rows[:self.BATCH_SIZE]
+                self._flush(table, columns, chunk)
+
+class BenchContext:
+    """Identificadores de amostra e dados intermediários usados pelos casos."""
+
+    def __init__(self, db, reports):
+        self.db = db
+        self.reports = reports
+        sample = db.execute_query("""
+            SELECT t.id, t.user_id, t.project_id, t.task_id
+            FROM timetrack t
+            JOIN users u ON t.user_id = u.id
+            WHERE u.activity_tracking_consent = TRUE AND t.check_out IS NOT NULL
+            ORDER BY t.id DESC LIMIT 1
+        """)[0]
+        self.timetrack_id = sample['id']
+        self.user_id = sample['user_id']
+        self.project_id = sample['project_id']
+        self.task_id = sample['task_id']
+        self.admin_id = db.execute_query("SELECT id FROM users WHERE role = 'admin' LIMIT 1")[0]['id']
+        self.user_ids = [row['id'] for row in db.execute_query(
+            "SELECT id FROM users WHERE role = 'colaborador' ORDER BY id LIMIT 25")]
+        self.start_date = datetime.now() - timedelta(days=30)
+        self.end_date = datetime.now()
+        self._cache = {}
+
+    def cached(self, key, factory):
+        if key not in self._cache:
+            self._cache[key] = factory()
+        return self._cache[key]
+
+    @property
+    def open_timetrack_id(self):
+        return self.cached('open_timetrack', lambda: self.db.check_in_user(self.user_id, self.project_id))
+
+    @property
+    def break_id(self):
+        return self.cached('break', lambda: self.db.start_break(self.timetrack_id, 'rest'))
+
+    @property
+    def manual_entry_id(self):
+        check_in = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        return self.cached('manual', lambda: self.db.create_manual_entry(
+            self.user_id, self.project_id, check_in, check_in + timedelta(hours=8), "benchmark"))
+
+# Cada caso recebe o contexto e devolve (args, kwargs) para o método
+DATABASE_CASES = {
+    'add_task': lambda c: ((c.project_id, "Tarefa benchmark"), {}),
+    'approve_manual_entries': lambda c: ((c.admin_id,), {'project_id': c.project_id}),
+    'approve_manual_entry': lambda c: ((c.manual_entry_id, c.admin_id), {}),
+    'assign_task': lambda c: ((c.task_id, c.user_id), {}),
+    'check_in_user': lambda c: ((c.user_id, c.project_id), {}),
+    'check_counters': lambda c: ((), {'project_ids': [c.project_id]}),
+    'check_out_user': lambda c: ((c.open_timetrack_id,), {}),
+    'close_orphan_breaks': lambda c: ((), {}),
+    'close_stale_sessions': lambda c: ((), {'stale_hours': 24 * 3650}),
+    'count_pending_approvals': lambda c: ((), {}),
+    'create_manual_entry': lambda c: ((c.user_id, c.project_id, c.start_date,
+                                       c.start_date + timedelta(hours=8), "benchmark"), {}),
+    'end_break': lambda c: ((c.break_id,), {}),
+    'get_active_break': lambda c: ((c.timetrack_id,), {}),
+    'get_active_projects': lambda c: ((), {}),
+    'get_activity_history': lambda c: ((c.timetrack_id,), {}),
+    'get_activity_stats': lambda c: ((c.timetrack_id,), {}),
+    'get_all_users_status': lambda c: ((), {}),
+    'get_auto_closed_sessions': lambda c: ((), {}),
+    'get_collaborators': lambda c: ((), {'limit': 50}),
+    'get_live_sessions': lambda c: ((), {}),
+    'get_location_history': lambda c: ((c.user_id,), {'start_date': c.start_date}),
+    'get_pending_approvals': lambda c: ((), {}),
+    'get_project_detailed_stats': lambda c: ((c.project_id,), {}),
+    'get_project_hourly_rate': lambda c: ((c.project_id,), {}),
+    'get_project_statistics': lambda c: ((c.project_id,), {}),
+    'get_project_tasks': lambda c: ((c.project_id,), {}),
+    'get_job_runs': lambda c: ((), {}),
+    'get_session_heartbeat': lambda c: ((c.timetrack_id,), {}),
+    'get_task': lambda c: ((c.task_id,), {}),
+    'get_task_time_entries': lambda c: ((c.task_id,), {}),
+    'get_today_activity': lambda c: ((c.user_id,), {}),
+    'get_user_history': lambda c: ((c.user_id, 30), {}),
+    'get_user_tasks': lambda c: ((c.user_id,), {}),
+    'get_user_timetrack_today': lambda c: ((c.user_id,), {}),
+    'get_weekly_report': lambda c: ((), {}),
+    'log_activity_batch': lambda c: (([(c.timetrack_id, datetime.now(), level) for level in range(0, 100, 5)],), {}),
+    'log_location': lambda c: ((c.timetrack_id, -23.55, -46.63, {'city': 'São Paulo'}), {}),
+    'log_location_batch': lambda c: (([(c.timetrack_id, datetime.now(), -23.55, -46.63, {'city': 'São Paulo'})] * 20,), {}),
+    'prune_activity_logs': lambda c: ((3650,), {}),
+    'prune_job_runs': lambda c: ((3650,), {}),
+    'prune_location_logs': lambda c: ((3650,), {}),
+    'rebuild_activity_rollup': lambda c: ((c.timetrack_id,), {}),
+    'rebuild_counters': lambda c: ((), {'project_ids': [c.project_id]}),
+    'record_job_run': lambda c: (('benchmark', datetime.now(), 1, 'success'), {}),
+    'reject_manual_entries': lambda c: ((), {'ids': [c.manual_entry_id]}),
+    'search_users': lambda c: (("Sintético 00",), {}),
+    'start_break': lambda c: ((c.timetrack_id, 'rest'), {}),
+    'update_activity_level': lambda c: ((c.timetrack_id, 50), {}),
+    'update_task_status': lambda c: ((c.task_id, 'in_progress'), {}),
+    'update_timetrack_location': lambda c: ((c.timetrack_id, -23.55, -46.63), {}),
+    'update_user_consent': lambda c: ((c.user_id,), {'activity_consent': True}),
+}
+
+REPORT_CASES = {
+    'format_summary_card': lambda c: ((c.cached('summary', lambda: c.reports.generate_project_summary(c.project_id)),), {}),
+    'generate_activity_heatmap': lambda c: ((c.user_id,), {}),
+    'generate_presence_summary': lambda c: ((), {'start_date': c.start_date, 'end_date': c.end_date}),
+    'generate_productivity_report': lambda c: ((), {'start_date': c.start_date, 'end_date': c.end_date}),
+    'generate_project_summary': lambda c: ((c.project_id,), {}),
+    'generate_team_heatmap': lambda c: ((), {'user_ids': c.user_ids}),
+    'generate_team_productivity': lambda c: ((), {'user_ids': c.user_ids}),
+    'plot_activity_heatmap': lambda c: ((c.cached('heatmap', lambda: c.reports.generate_activity_heatmap(c.user_id)),), {}),
+    'plot_productivity_trends': lambda c: ((c.cached('productivity', lambda: c.reports.generate_productivity_report(
+        start_date=c.start_date, end_date=c.end_date)),), {}),
+    'plot_project_progress': lambda c: ((c.cached('summary', lambda: c.reports.generate_project_summary(c.project_id)),), {}),
+    'plot_team_heatmap': lambda c: ((c.cached('team_heatmap', lambda: c.reports.generate_team_heatmap(user_ids=c.user_ids)),), {}),
+}
+
+def public_methods(cls):
+    return sorted(
+        name for name, _ in inspect.getmembers(cls, predicate=inspect.isfunction)
+        if not name.startswith('_')
+    )
+
+def result_rows(result):
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, dict):
+        return len(result.get('lines', result.get('users', []))) if ('lines' in result or 'users' in result) else 1
+    return None
+
+def time_method(target, name, case, ctx, repeat):
+    """Executa o método `repeat` vezes e devolve estatísticas de tempo em ms."""
+    method = getattr(target, name)
+    args, kwargs = case(ctx)
+    timings = []
+    rows = None
+    error = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+            rows = result_rows(result)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            break
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'runs': len(timings),
+        'min_ms': round(min(timings), 3) if timings else None,
+        'median_ms': round(statistics.median(timings), 3) if timings else None,
+        'max_ms': round(max(timings), 3) if timings else None,
+        'rows': rows,
+        'error': error,
+    }
+
+def recreate_database(db_name):
+    connection = mysql.connector.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASSWORD', '')
+    )
+    cursor = connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{db_name}`")
+    cursor.close()
+    connection.close()
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+def run_scale(args, users, output):
+    os.environ['DB_NAME'] = args.db_name
+    recreate_database(args.db_name)
+
+    from db import Database
+    from reports import ReportGenerator
+
+    db = Database()
+    generator = SyntheticDataGenerator(
+        db, users=users, projects=args.projects, tasks_per_project=args.tasks,
+        days=args.days, telemetry_days=args.telemetry_days,
+        activity_interval=args.activity_interval, seed=args.seed
+    )
+    seed_started = time.perf_counter()
+    counts = generator.seed()
+    print(f"[{users} usuários] dados gerados em {time.perf_counter() - seed_started:.1f}s: {counts}")
+
+    reports = ReportGenerator(db)
+    ctx = BenchContext(db, reports)
+    common = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_rev': git_revision(),
+        'python': platform.python_version(),
+        'scale': {'users': users, 'projects': args.projects, 'days': args.days, 'rows': counts},
+    }
+
+    for cls_name, target, cases in (('Database', db, DATABASE_CASES),
+                                    ('ReportGenerator', reports, REPORT_CASES)):
+        for name in public_methods(type(target)):
+            record = {**common, 'class': cls_name, 'method': name}
+            if name in SKIPPED_METHODS:
+                record['skipped'] = SKIPPED_METHODS[name]
+            elif name not in cases:
+                record['skipped'] = 'sem caso de benchmark'
+            else:
+                record.update(time_method(target, name, cases[name], ctx, args.repeat))
+                status = record['error'] or f"mediana {record['median_ms']} ms ({record['rows']} linhas)"
+                print(f"  {cls_name}.{name}: {status}")
+            output.write(json.dumps(record, default=str) + "\n")
+            output.flush()
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='10,100', help="quantidades de usuários, separadas por vírgula")
+    parser.add_argument('--projects', type=int, default=20)
+    parser.add_argument('--tasks', type=int, default=15, help="tarefas por projeto")
+    parser.add_argument('--days', type=int, default=365, help="dias de histórico de ponto")
+    parser.add_argument('--telemetry-days', type=int, default=30, help="dias com activity_logs/location_logs")
+    parser.add_argument('--activity-interval', type=int, default=15, help="minutos entre leituras de atividade")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db-name', default='timetrack_bench')
+    parser.add_argument('--output', default='bench_results.jsonl')
+    args = parser.parse_args(argv)
+
+    if 'bench' not in args.db_name:
+        parser.error("--db-name precisa conter 'bench' (o banco é apagado a cada escala)")
+
+    # O código da aplicação importa módulos a partir de app/
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    with open(args.output, 'a', encoding='utf-8') as output:
+        for users in (int(value) for value in args.scales.split(',')):
+            run_scale(args, users, output)
+
+    print(f"Resultados gravados em {args.output}")
+
+if __name__ == "__main__":
+    main()
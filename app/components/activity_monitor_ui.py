@@ -1,5 +1,4 @@
 import flet as ft
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 
 class ActivityGraph:
@@ -22,7 +21,9 @@ class ActivityGraph:
             timestamps.append(record['timestamp'].strftime('%H:%M'))
             activity_levels.append(record['activity_level'])
             
-        # Criar gráfico com plotly
+        # Criar gráfico com plotly (importado sob demanda, é pesado)
+        import plotly.graph_objects as go
+
         fig = go.Figure()
         fig.add_trace(go.Scatter(
             x=timestamps,
@@ -7,16 +7,25 @@ class StatsCard:
         self.value = value
         self.icon = icon
         self.color = color
+        self.value_text = None
+        
+    def set_value(self, value):
+        """Atualiza apenas o valor exibido no card"""
+        self.value = value
+        if self.value_text:
+            self.value_text.value = value
+            self.value_text.update()
         
     def build(self):
         """Constrói card de estatística"""
+        self.value_text = ft.Text(self.value, size=24, weight=ft.FontWeight.BOLD)
         return ft.Card(
             content=ft.Container(
                 content=ft.Row([
                     ft.Icon(self.icon, size=40, color=self.color),
                     ft.Column([
                         ft.Text(self.title, size=14, color=ft.Colors.GREY),
-                        ft.Text(self.value, size=24, weight=ft.FontWeight.BOLD)
+                        self.value_text
                     ], spacing=5)
                 ], alignment=ft.MainAxisAlignment.START, spacing=15),
                 padding=20,
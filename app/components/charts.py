@@ -29,7 +29,7 @@ class WeeklyChart:
             user_totals = {}
             for record in self.data:
                 user = record['full_name']
-                hours = float(record['daily_hours'] or 0)
+                hours = record['daily_hours'] or 0
                 user_totals[user] = user_totals.get(user, 0) + hours
                 
             chart_data = list(user_totals.items())
@@ -39,9 +39,9 @@ class WeeklyChart:
             daily_breaks = {}
             for record in self.data:
                 day = record['date'].strftime('%d/%m') if record['date'] else 'N/A'
-                total_hours = float(record['daily_hours'] or 0)
-                break_hours = float(record['break_hours'] or 0)
-                effective_hours = float(record['effective_hours'] or 0)
+                total_hours = record['daily_hours'] or 0
+                break_hours = record['break_hours'] or 0
+                effective_hours = record['effective_hours'] or 0
                 
                 # Acumular horas por dia
                 daily_totals[day] = total_hours
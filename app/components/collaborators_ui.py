@@ -1,6 +1,8 @@
 import flet as ft
-import bcrypt
+from auth import hash_password
 from datetime import datetime
+from profiling import profiled
+from components.virtual_table import VirtualTable
 
 class CollaboratorsScreen:
     def __init__(self, user, db, on_back):
@@ -49,61 +51,64 @@ class CollaboratorsScreen:
             value="active"
         )
         
-        # Lista de colaboradores
-        self.collaborators_list = ft.DataTable(
+        # Lista de colaboradores, carregada por páginas com ordenação/filtro no servidor
+        self.collaborators_table = VirtualTable(
             columns=[
-                ft.DataColumn(ft.Text("Nome")),
-                ft.DataColumn(ft.Text("E-mail")),
-                ft.DataColumn(ft.Text("Usuário")),
-                ft.DataColumn(ft.Text("Valor/Hora")),
-                ft.DataColumn(ft.Text("Status")),
-                ft.DataColumn(ft.Text("Ações")),
+                {'key': 'full_name', 'label': "Nome", 'expand': True, 'sortable': True},
+                {'key': 'email', 'label': "E-mail", 'width': 200, 'sortable': True},
+                {'key': 'username', 'label': "Usuário", 'width': 130, 'sortable': True},
+                {'key': 'hourly_rate', 'label': "Valor/Hora", 'width': 110, 'sortable': True},
+                {'key': 'status', 'label': "Status", 'width': 90, 'sortable': True},
+                {'key': 'actions', 'label': "Ações", 'width': 110},
             ],
-            vertical_lines=ft.BorderSide(1, ft.colors.OUTLINE),
-            horizontal_lines=ft.BorderSide(1, ft.colors.OUTLINE),
-            sort_column_index=0,
-            width=900
+            fetch_page=lambda offset, limit, sort_key, descending, filters: self.db.get_collaborators(
+                offset=offset, limit=limit, sort=sort_key, descending=descending, **filters
+            ),
+            build_cells=self._build_collaborator_cells,
+            sort_key='full_name',
+            height=500
+        )
+        self.status_filter = ft.Dropdown(
+            label="Filtrar status",
+            width=150,
+            text_size=14,
+            options=[
+                ft.dropdown.Option("all", "Todos"),
+                ft.dropdown.Option("active", "Ativos"),
+                ft.dropdown.Option("inactive", "Inativos")
+            ],
+            value="all",
+            on_change=lambda e: self.collaborators_table.set_filters(
+                status=None if e.control.value == "all" else e.control.value
+            )
         )
 
-    def _load_collaborators(self):
-        """Carrega a lista de colaboradores do banco de dados."""
-        collaborators = self.db.execute_query("""
-            SELECT id, full_name, email, username, hourly_rate, status
-            FROM users
-            WHERE role = 'colaborador'
-            ORDER BY full_name
-        """)
-        
-        self.collaborators_list.rows = []
-        
-        for collab in collaborators:
-            self.collaborators_list.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(collab['full_name'])),
-                        ft.DataCell(ft.Text(collab['email'])),
-                        ft.DataCell(ft.Text(collab['username'])),
-                        ft.DataCell(ft.Text(f"R$ {float(collab['hourly_rate']):.2f}")),
-                        ft.DataCell(ft.Text("Ativo" if collab['status'] == 'active' else "Inativo")),
-                        ft.DataCell(
-                            ft.Row([
-                                ft.IconButton(
-                                    icon=ft.icons.EDIT,
-                                    tooltip="Editar",
-                                    on_click=lambda e, c=collab: self._edit_collaborator(c)
-                                ),
-                                ft.IconButton(
-                                    icon=ft.icons.DELETE,
-                                    tooltip="Excluir",
-                                    on_click=lambda e, c=collab: self._confirm_delete(c)
-                                )
-                            ])
-                        )
-                    ]
+    def _build_collaborator_cells(self, collab):
+        """Células de uma linha da lista de colaboradores."""
+        return [
+            ft.Text(collab['full_name']),
+            ft.Text(collab['email'] or '--'),
+            ft.Text(collab['username']),
+            ft.Text(f"R$ {float(collab['hourly_rate'] or 0):.2f}"),
+            ft.Text("Ativo" if collab['status'] == 'active' else "Inativo"),
+            ft.Row([
+                ft.IconButton(
+                    icon=ft.icons.EDIT,
+                    tooltip="Editar",
+                    on_click=lambda e, c=collab: self._edit_collaborator(c)
+                ),
+                ft.IconButton(
+                    icon=ft.icons.DELETE,
+                    tooltip="Excluir",
+                    on_click=lambda e, c=collab: self._confirm_delete(c)
                 )
-            )
-        
-        self.collaborators_list.update()
+            ], spacing=0)
+        ]
+
+    @profiled("CollaboratorsScreen._load_collaborators")
+    def _load_collaborators(self):
+        """Recarrega a primeira página da lista de colaboradores."""
+        self.collaborators_table.reload()
 
     def _clear_form(self):
         """Limpa os campos do formulário."""
@@ -169,8 +174,7 @@ class CollaboratorsScreen:
                 # Atualização
                 if self.password_field.value:
                     # Só atualiza a senha se foi fornecida uma nova
-                    hashed = bcrypt.hashpw(self.password_field.value.encode('utf-8'), bcrypt.gensalt())
-                    data['password_hash'] = hashed
+                    data['password'] = hash_password(self.password_field.value)
                     
                 self.db.execute_query("""
                     UPDATE users
@@ -179,21 +183,21 @@ class CollaboratorsScreen:
                         username = %(username)s,
                         hourly_rate = %(hourly_rate)s,
                         status = %(status)s
-                        """ + (", password_hash = %(password_hash)s" if 'password_hash' in data else "") + """
+                        """ + (", password = %(password)s, session_version = session_version + 1"
+                               if 'password' in data else "") + """
                     WHERE id = %(id)s
                 """, {**data, 'id': self.selected_collaborator['id']})
                 
                 message = "Colaborador atualizado com sucesso!"
             else:
                 # Novo cadastro
-                hashed = bcrypt.hashpw(self.password_field.value.encode('utf-8'), bcrypt.gensalt())
-                data['password_hash'] = hashed
+                data['password'] = hash_password(self.password_field.value)
                 data['created_at'] = datetime.now()
                 
                 self.db.execute_query("""
-                    INSERT INTO users (full_name, email, username, password_hash, 
+                    INSERT INTO users (full_name, email, username, password, 
                                      hourly_rate, status, role, created_at)
-                    VALUES (%(full_name)s, %(email)s, %(username)s, %(password_hash)s,
+                    VALUES (%(full_name)s, %(email)s, %(username)s, %(password)s,
                            %(hourly_rate)s, %(status)s, %(role)s, %(created_at)s)
                 """, data)
                 
@@ -295,6 +299,7 @@ class CollaboratorsScreen:
                     ft.SnackBar(content=ft.Text(f"Erro ao excluir: {str(error)}"))
                 )
 
+    @profiled("CollaboratorsScreen.build")
     def build(self, page: ft.Page):
         """Constrói a tela de gerenciamento de colaboradores."""
         self.content = ft.Column(
@@ -349,14 +354,15 @@ class CollaboratorsScreen:
                     )
                 ),
                 ft.Container(height=20),
-                self.collaborators_list
+                ft.Row([
+                    self.collaborators_table.search_field("Buscar por nome, usuário ou e-mail"),
+                    self.status_filter
+                ]),
+                self.collaborators_table.build()
             ],
             scroll=ft.ScrollMode.AUTO,
             spacing=10,
             expand=True
         )
         
-        # Carrega a lista inicial de colaboradores
-        self._load_collaborators()
-        
         return self.content
\ No newline at end of file
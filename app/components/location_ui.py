@@ -1,5 +1,6 @@
 import flet as ft
 from datetime import datetime
+from components.virtual_table import VirtualTable
 
 class LocationCard:
     def __init__(self, lat=None, lon=None, details=None, last_update=None):
@@ -64,44 +65,41 @@ class LocationCard:
         )
         
 class LocationHistoryTable:
-    def __init__(self, history_data):
-        self.history_data = history_data or []
+    COLUMNS = [
+        {'key': 'timestamp', 'label': "Data/Hora", 'width': 150},
+        {'key': 'location', 'label': "Local", 'expand': True},
+        {'key': 'project_name', 'label': "Projeto", 'width': 180},
+        {'key': 'event_type', 'label': "Tipo", 'width': 100},
+    ]
+
+    def __init__(self, fetch_page, page_size=50):
+        # fetch_page(offset, limit, sort_key, descending, filters) -> registros
+        self.fetch_page = fetch_page
+        self.page_size = page_size
         
-    def build(self):
-        """Constrói a tabela de histórico de localizações"""
-        if not self.history_data:
-            return ft.Text("Nenhum histórico de localização disponível.")
-            
-        columns = [
-            ft.DataColumn(ft.Text("Data/Hora")),
-            ft.DataColumn(ft.Text("Local")),
-            ft.DataColumn(ft.Text("Projeto")),
-            ft.DataColumn(ft.Text("Tipo"))
+    def _build_cells(self, entry):
+        timestamp = entry['timestamp']
+        if not isinstance(timestamp, datetime):
+            timestamp = datetime.strptime(str(timestamp), '%Y-%m-%d %H:%M:%S')
+        location = f"{entry['city']}, {entry['region']}" if entry.get('city') and entry.get('region') else \
+                  f"{entry['latitude']:.6f}, {entry['longitude']:.6f}"
+                  
+        event_type = "Check-in" if abs((timestamp - entry['check_in']).total_seconds()) < 300 else "Check-out"
+        
+        return [
+            ft.Text(timestamp.strftime('%d/%m/%Y %H:%M')),
+            ft.Text(location),
+            ft.Text(entry.get('project_name') or 'N/A'),
+            ft.Text(event_type)
         ]
         
-        rows = []
-        for entry in self.history_data:
-            timestamp = datetime.strptime(str(entry['timestamp']), '%Y-%m-%d %H:%M:%S')
-            location = f"{entry['city']}, {entry['region']}" if entry.get('city') and entry.get('region') else \
-                      f"{entry['latitude']:.6f}, {entry['longitude']:.6f}"
-                      
-            event_type = "Check-in" if abs((timestamp - entry['check_in']).total_seconds()) < 300 else "Check-out"
-            
-            rows.append(
-                ft.DataRow([
-                    ft.DataCell(ft.Text(timestamp.strftime('%d/%m/%Y %H:%M'))),
-                    ft.DataCell(ft.Text(location)),
-                    ft.DataCell(ft.Text(entry.get('project_name', 'N/A'))),
-                    ft.DataCell(ft.Text(event_type))
-                ])
-            )
-            
-        return ft.DataTable(
-            columns=columns,
-            rows=rows,
-            border=ft.border.all(1, ft.Colors.GREY_400),
-            border_radius=10,
-            vertical_lines=ft.border.BorderSide(1, ft.Colors.GREY_400),
-            horizontal_lines=ft.border.BorderSide(1, ft.Colors.GREY_400),
-            column_spacing=50
-        )
\ No newline at end of file
+    def build(self):
+        """Constrói a tabela de histórico de localizações (carregada por páginas)"""
+        return VirtualTable(
+            columns=self.COLUMNS,
+            fetch_page=self.fetch_page,
+            build_cells=self._build_cells,
+            page_size=self.page_size,
+            height=350,
+            empty_message="Nenhum histórico de localização disponível."
+        ).build()
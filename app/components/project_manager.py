@@ -72,6 +72,7 @@ class ProjectManager:
         self.user = user
         self.selected_project = None
         self.current_tasks = []
+        self.task_cards = {}  # id da tarefa -> ft.Card exibido no quadro
         
         # Dialog de nova tarefa
         self.task_name_field = ft.TextField(
@@ -143,15 +144,15 @@ class ProjectManager:
         
         if result:
             self.close_dialog(e)
-            self.load_tasks()  # Recarrega as tarefas
+            self.patch_task(result)  # Acrescenta só o novo cartão
         else:
             self.task_error_text.value = "Erro ao criar tarefa"
             self.page.dialog.update()
             
     def handle_task_status_change(self, task_id, new_status):
-        result = self.db.update_task_status(task_id, new_status)
-        if result:
-            self.load_tasks()
+        task = self.db.update_task_status(task_id, new_status)
+        if task:
+            self.patch_task(task)
             
     def show_task_details(self, task):
         entries = self.db.get_task_time_entries(task['id'])
@@ -196,8 +197,55 @@ class ProjectManager:
         
     def load_tasks(self):
         if self.selected_project:
-            self.current_tasks = self.db.get_project_tasks(self.selected_project['id'])
+            self.current_tasks = self.db.get_project_tasks(self.selected_project['id']) or []
+            self.render_tasks()
+            
+    def build_task_card(self, task):
+        return TaskCard(
+            task,
+            on_status_change=self.handle_task_status_change,
+            on_select=self.show_task_details
+        ).build()
+            
+    def render_tasks(self):
+        """Reconstrói o quadro inteiro (apenas ao trocar de projeto)"""
+        if not self.current_tasks:
+            self.task_cards = {}
+            self.tasks_view.controls = [
+                ft.Container(
+                    content=ft.Column([
+                        ft.Icon(ft.Icons.TASK, size=40, color=ft.Colors.GREY_400),
+                        ft.Text("Nenhuma tarefa encontrada", color=ft.Colors.GREY_400)
+                    ], alignment=ft.MainAxisAlignment.CENTER),
+                    alignment=ft.alignment.center
+                )
+            ]
+        else:
+            self.task_cards = {task['id']: self.build_task_card(task) for task in self.current_tasks}
+            self.tasks_view.controls = list(self.task_cards.values())
+        if self.tasks_view.page:
+            self.tasks_view.update()
+            
+    def patch_task(self, task):
+        """Atualiza só o cartão da tarefa alterada (ou acrescenta o de uma tarefa nova)"""
+        if not self.selected_project or task['project_id'] != self.selected_project['id']:
+            return
+        card = self.task_cards.get(task['id'])
+        if card is None:
+            # Tarefas mais recentes primeiro, como em get_project_tasks
+            self.current_tasks.insert(0, task)
+            if len(self.task_cards) == 0:
+                self.render_tasks()
+                return
+            card = self.build_task_card(task)
+            self.task_cards[task['id']] = card
+            self.tasks_view.controls.insert(0, card)
             self.tasks_view.update()
+            return
+            
+        self.current_tasks = [task if t['id'] == task['id'] else t for t in self.current_tasks]
+        card.content = self.build_task_card(task).content
+        card.update()
             
     def build(self, page):
         self.page = page
@@ -237,29 +285,6 @@ class ProjectManager:
             run_spacing=10,
         )
         
-        def update_tasks_view():
-            if not self.current_tasks:
-                self.tasks_view.controls = [
-                    ft.Container(
-                        content=ft.Column([
-                            ft.Icon(ft.Icons.TASK, size=40, color=ft.Colors.GREY_400),
-                            ft.Text("Nenhuma tarefa encontrada", color=ft.Colors.GREY_400)
-                        ], alignment=ft.MainAxisAlignment.CENTER),
-                        alignment=ft.alignment.center
-                    )
-                ]
-            else:
-                self.tasks_view.controls = [
-                    TaskCard(
-                        task,
-                        on_status_change=self.handle_task_status_change,
-                        on_select=self.show_task_details
-                    ).build()
-                    for task in self.current_tasks
-                ]
-        
-        self.tasks_view.update = update_tasks_view
-        
         def on_project_selected(project):
             self.selected_project = project
             new_task_btn.disabled = False
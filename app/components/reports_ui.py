@@ -2,10 +2,12 @@
 
 import flet as ft
 from datetime import datetime, timedelta
-import pandas as pd
+import csv
 import tempfile
 import os
+import shutil
 from reports import ReportGenerator
+from profiling import profiled
 
 class ReportsScreen:
     def __init__(self, user, db, on_back):
@@ -84,6 +86,7 @@ class ReportsScreen:
             self.end_date_field.update()
             self._load_reports_data()
 
+    @profiled("ReportsScreen._load_reports_data")
     def _load_reports_data(self):
         self.content.controls = [ft.Row([ft.ProgressRing()], alignment=ft.MainAxisAlignment.CENTER)]
         if self.content.page:
@@ -102,10 +105,11 @@ class ReportsScreen:
         self.content.controls = []
         
         if productivity_data:
-            total_hours = sum(float(d.get('total_hours', 0) or 0) for d in productivity_data)
-            valid_activity = [d for d in productivity_data if d.get('avg_activity') is not None]
-            avg_activity = sum(float(d.get('avg_activity', 0) or 0) for d in valid_activity) / len(valid_activity) if valid_activity else 0
-            completed_tasks = sum(int(d.get('completed_tasks', 0) or 0) for d in productivity_data)
+            # Registros do relatório já vêm com DECIMAL convertido para float (Database.fetch_records)
+            total_hours = sum(d.total_hours or 0 for d in productivity_data)
+            valid_activity = [d.avg_activity for d in productivity_data if d.avg_activity is not None]
+            avg_activity = sum(valid_activity) / len(valid_activity) if valid_activity else 0
+            completed_tasks = sum(d.completed_tasks or 0 for d in productivity_data)
 
             metrics_row = ft.Row([
                 self.create_metric_card("Horas Totais", f"{total_hours:.1f}h", ft.Icons.TIMER, ft.colors.BLUE),
@@ -161,47 +165,50 @@ class ReportsScreen:
         user_id = None if self.user.get('role') == 'admin' else self.user['id']
         project_id = None if not self.project_dropdown or self.project_dropdown.value == "todos" else int(self.project_dropdown.value)
         
-        # Get the data
-        data = self.report_generator.generate_productivity_report(
+        # Lê o relatório em blocos direto para o CSV, sem carregá-lo inteiro em memória
+        chunks = self.report_generator.generate_productivity_report(
             user_id=user_id,
             project_id=project_id,
             start_date=self.start_date,
-            end_date=self.end_date
+            end_date=self.end_date,
+            stream=True
         )
-        
-        if not data:
-            self.content.page.show_snack_bar(
-                ft.SnackBar(content=ft.Text("Não há dados para exportar no período selecionado."))
-            )
+
+        rows = 0
+        with tempfile.NamedTemporaryFile('w', delete=False, suffix='.csv', newline='', encoding='utf-8-sig') as tmp:
+            writer = csv.writer(tmp)
+            try:
+                for chunk in chunks:
+                    if not rows:
+                        writer.writerow(chunk.columns)
+                    writer.writerows(chunk)
+                    rows += len(chunk)
+            except Exception as error:
+                print(f"Erro ao exportar relatório: {error}")
+                rows = -1
+
+        if rows <= 0:
+            os.unlink(tmp.name)
+            message = ("Não há dados para exportar no período selecionado." if rows == 0
+                       else "Erro ao ler o relatório do banco de dados.")
+            self.content.page.show_snack_bar(ft.SnackBar(content=ft.Text(message)))
             return
-            
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp:
-            df.to_csv(tmp.name, index=False, encoding='utf-8-sig')
-            
-            # Configure the file picker
-            self.file_picker.save_file(
-                dialog_title="Salvar Relatório",
-                file_name=f"relatorio_{self.start_date.strftime('%Y%m%d')}_{self.end_date.strftime('%Y%m%d')}.csv",
-                initial_directory=os.path.expanduser("~\\Documents"),
-                allowed_extensions=["csv"],
-                on_result=lambda e: self._save_exported_file(e, tmp.name) if e.path else None
-            )
-            
+
+        # Configure the file picker
+        self.file_picker.save_file(
+            dialog_title="Salvar Relatório",
+            file_name=f"relatorio_{self.start_date.strftime('%Y%m%d')}_{self.end_date.strftime('%Y%m%d')}.csv",
+            initial_directory=os.path.expanduser("~\\Documents"),
+            allowed_extensions=["csv"],
+            on_result=lambda e: self._save_exported_file(e, tmp.name) if e.path else None
+        )
+
     def _save_exported_file(self, e, temp_file_path):
         """Save the exported file to the user's chosen location."""
         try:
-            # Read the temporary file
-            with open(temp_file_path, 'rb') as src:
-                data = src.read()
-                
-            # Write to the destination
-            with open(e.path, 'wb') as dst:
-                dst.write(data)
-                
+            # Copia o arquivo temporário em blocos para o destino escolhido
+            shutil.copyfile(temp_file_path, e.path)
+
             self.content.page.show_snack_bar(
                 ft.SnackBar(content=ft.Text("Relatório exportado com sucesso!"))
             )
@@ -216,6 +223,7 @@ class ReportsScreen:
             except:
                 pass
         
+    @profiled("ReportsScreen.build")
     def build(self, page: ft.Page):
         """Constrói a tela de relatórios."""
         # Adiciona os controles necessários ao overlay da página
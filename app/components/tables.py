@@ -1,4 +1,5 @@
 import flet as ft
+from components.virtual_table import VirtualTable
 
 class HistoryTable:
     def __init__(self, data):
@@ -53,11 +54,100 @@ class HistoryTable:
         )
 
 class UsersTable:
+    COLUMNS = [
+        {'key': 'full_name', 'label': "Colaborador", 'expand': True, 'sortable': True},
+        {'key': 'status', 'label': "Status", 'width': 110, 'sortable': True},
+        {'key': 'check_in', 'label': "Entrada", 'width': 80},
+        {'key': 'total_hours', 'label': "Total", 'width': 70},
+        {'key': 'break_hours', 'label': "Pausas", 'width': 70},
+        {'key': 'project_name', 'label': "Projeto", 'width': 140},
+    ]
+    STATUS_ORDER = {"Online": 0, "Em Pausa": 1, "Finalizado": 2, "Offline": 3}
+
     def __init__(self, data):
-        self.data = data
+        # Os dados vêm do registro de presença (memória); a tabela só pagina a exibição
+        self.data = {user['id']: user for user in data}
+        self.table = None
+        
+    def _status(self, user):
+        if user['check_in'] and not user['check_out']:
+            if user.get('is_on_break'):
+                return "Em Pausa", ft.Colors.ORANGE
+            return "Online", ft.Colors.GREEN
+        if user['check_in'] and user['check_out']:
+            return "Finalizado", ft.Colors.BLUE
+        return "Offline", ft.Colors.GREY
+        
+    def _build_cells(self, user):
+        """Constrói as células de uma linha de usuário"""
+        name = user['full_name'] or '--'
+        status, status_color = self._status(user)
+        
+        if status in ("Online", "Em Pausa"):
+            entry_time = user['check_in'].strftime('%H:%M')
+            project = user.get('project_name') or '--'
+        elif status == "Finalizado":
+            entry_time = user['check_in'].strftime('%H:%M')
+            project = "--"
+        else:
+            entry_time = "--:--"
+            project = "--"
+            
+        hours = f"{user['total_hours']:.2f}h" if user.get('total_hours') else "--"
+        break_hours = f"{user['break_hours']:.2f}h" if user.get('break_hours') else "--"
+        
+        return [
+            ft.Text(name, size=12),
+            ft.Container(
+                content=ft.Text(status, size=11, color=ft.Colors.WHITE),
+                bgcolor=status_color,
+                padding=ft.padding.symmetric(horizontal=8, vertical=4),
+                border_radius=20
+            ),
+            ft.Text(entry_time, size=12),
+            ft.Text(hours, size=12),
+            ft.Text(break_hours, size=12, color=ft.Colors.ORANGE),
+            ft.Text(project, size=12)
+        ]
+        
+    def _fetch_page(self, offset, limit, sort_key, descending, filters):
+        def name_key(user):
+            return ((user['full_name'] or '').lower(), user['id'])
+        if sort_key == 'status':
+            key = lambda user: (self.STATUS_ORDER[self._status(user)[0]], name_key(user))
+        else:
+            key = name_key
+        users = sorted(self.data.values(), key=key, reverse=descending)
+        return users[offset:offset + limit]
+        
+    def apply_changes(self, changes):
+        """Atualiza apenas as linhas dos usuários alterados.
+        
+        Retorna False se a tabela ainda não foi construída (o chamador deve
+        reconstruí-la).
+        """
+        if self.table is None:
+            return False
+            
+        structure_changed = False
+        for user in changes:
+            if user.get('removed'):
+                if self.data.pop(user['id'], None):
+                    structure_changed = True
+                continue
+            if user['id'] not in self.data or self.table.sort_key == 'status':
+                structure_changed = True
+            self.data[user['id']] = user
+            if not structure_changed:
+                self.table.update_record(user)
+                
+        if structure_changed:
+            # Recarrega apenas as linhas já exibidas, mantendo a ordenação
+            self.table.refresh()
+        return True
         
     def build(self):
-        """Constrói tabela de usuários (admin)"""
+        """Constrói tabela de usuários (admin), exibida por páginas"""
         if not self.data:
             return ft.Container(
                 content=ft.Text("Nenhum usuário encontrado", 
@@ -65,64 +155,11 @@ class UsersTable:
                 padding=20
             )
             
-        rows = []
-        for user in self.data:
-            name = user['full_name'] or '--'
-            
-            if user['check_in'] and not user['check_out']:
-                if user.get('is_on_break'):
-                    status = "Em Pausa"
-                    status_color = ft.Colors.ORANGE
-                else:
-                    status = "Online"
-                    status_color = ft.Colors.GREEN
-                entry_time = user['check_in'].strftime('%H:%M')
-                project = user.get('project_name', '--')
-            elif user['check_in'] and user['check_out']:
-                status = "Finalizado"
-                status_color = ft.Colors.BLUE
-                entry_time = user['check_in'].strftime('%H:%M')
-                project = "--"
-            else:
-                status = "Offline"
-                status_color = ft.Colors.GREY
-                entry_time = "--:--"
-                project = "--"
-                
-            hours = f"{user['total_hours']:.2f}h" if user['total_hours'] else "--"
-            break_hours = f"{user['break_hours']:.2f}h" if user.get('break_hours') else "--"
-            
-            rows.append(ft.DataRow([
-                ft.DataCell(ft.Text(name, size=12)),
-                ft.DataCell(ft.Container(
-                    content=ft.Text(status, size=11, color=ft.Colors.WHITE),
-                    bgcolor=status_color,
-                    padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                    border_radius=20
-                )),
-                ft.DataCell(ft.Text(entry_time, size=12)),
-                ft.DataCell(ft.Text(hours, size=12)),
-                ft.DataCell(ft.Text(break_hours, size=12, color=ft.Colors.ORANGE)),
-                ft.DataCell(ft.Text(project, size=12))
-            ]))
-            
-        return ft.Container(
-            content=ft.DataTable(
-                columns=[
-                    ft.DataColumn(ft.Text("Colaborador", weight=ft.FontWeight.BOLD)),
-                    ft.DataColumn(ft.Text("Status", weight=ft.FontWeight.BOLD)),
-                    ft.DataColumn(ft.Text("Entrada", weight=ft.FontWeight.BOLD)),
-                    ft.DataColumn(ft.Text("Total", weight=ft.FontWeight.BOLD)),
-                    ft.DataColumn(ft.Text("Pausas", weight=ft.FontWeight.BOLD)),
-                    ft.DataColumn(ft.Text("Projeto", weight=ft.FontWeight.BOLD))
-                ],
-                rows=rows,
-                border=ft.border.all(1, ft.Colors.OUTLINE_VARIANT),
-                border_radius=10,
-                show_checkbox_column=False
-            ),
-            height=400,
-            border=ft.border.all(1, ft.Colors.OUTLINE_VARIANT),
-            border_radius=10,
-            padding=10
-        )
\ No newline at end of file
+        self.table = VirtualTable(
+            columns=self.COLUMNS,
+            fetch_page=self._fetch_page,
+            build_cells=self._build_cells,
+            sort_key='full_name',
+            height=400
+        )
+        return self.table.build()
@@ -0,0 +1,229 @@
+import threading
+import flet as ft
+
+class VirtualTable:
+    """Tabela paginada sob demanda, com ordenação e filtros feitos no servidor.
+
+    As linhas ficam em um ``ft.ListView`` com altura fixa por item, que o
+    cliente renderiza de forma virtualizada (só as linhas visíveis). Os
+    registros são buscados em páginas de ``page_size`` conforme a rolagem se
+    aproxima do fim, então abrir a tela envia apenas a primeira página.
+
+    ``fetch_page(offset, limit, sort_key, descending, filters)`` deve retornar
+    uma lista de dicionários; ``build_cells(record)`` retorna um controle por
+    coluna. Cada coluna é um dicionário com ``key``, ``label`` e,
+    opcionalmente, ``width``, ``expand`` e ``sortable``.
+    """
+
+    def __init__(self, columns, fetch_page, build_cells, page_size=50, row_height=48,
+                 height=500, sort_key=None, descending=False, row_key='id',
+                 empty_message="Nenhum registro encontrado"):
+        self.columns = columns
+        self.fetch_page = fetch_page
+        self.build_cells = build_cells
+        self.page_size = page_size
+        self.row_height = row_height
+        self.height = height
+        self.sort_key = sort_key
+        self.descending = descending
+        self.row_key = row_key
+        self.empty_message = empty_message
+        self.filters = {}
+
+        self.records = []
+        self.rows_by_key = {}
+        self.has_more = True
+        self._lock = threading.Lock()
+        self._search_timer = None
+
+        self.header = ft.Row(spacing=0)
+        self.list_view = ft.ListView(
+            expand=True,
+            item_extent=row_height,
+            on_scroll=self._on_scroll,
+            on_scroll_interval=100
+        )
+        self.footer = ft.Row([], alignment=ft.MainAxisAlignment.CENTER)
+        self.container = None
+
+    # --- Dados ---
+
+    def _fetch(self, offset, limit):
+        return self.fetch_page(offset, limit, self.sort_key, self.descending, dict(self.filters)) or []
+
+    def _load_first_page(self, limit=None):
+        limit = max(limit or 0, self.page_size)
+        with self._lock:
+            records = self._fetch(0, limit)
+            self.records = list(records)
+            self.rows_by_key = {}
+            self.list_view.controls = [self._build_row(record) for record in self.records]
+            self.has_more = len(records) >= limit
+        self._refresh_footer()
+
+    def load_more(self, e=None):
+        """Busca a próxima página e acrescenta as linhas ao final."""
+        if not self._lock.acquire(blocking=False):
+            return  # Já existe uma busca em andamento
+        try:
+            if not self.has_more:
+                return
+            records = self._fetch(len(self.records), self.page_size)
+            self.has_more = len(records) >= self.page_size
+            self.records.extend(records)
+            self.list_view.controls.extend(self._build_row(record) for record in records)
+        finally:
+            self._lock.release()
+        self._refresh_footer()
+        self._update()
+
+    def reload(self):
+        """Recarrega a partir da primeira página (após mudar ordenação ou filtros)."""
+        self._load_first_page()
+        self._render_header()
+        self._update()
+
+    def refresh(self):
+        """Busca de novo todos os registros já carregados, mantendo a rolagem."""
+        self._load_first_page(len(self.records))
+        self._update()
+
+    def set_sort(self, key):
+        """Ordena pela coluna; clicar de novo na mesma coluna inverte a ordem."""
+        if self.sort_key == key:
+            self.descending = not self.descending
+        else:
+            self.sort_key = key
+            self.descending = False
+        self.reload()
+
+    def set_filters(self, **filters):
+        """Aplica filtros no servidor; valores None ou vazios removem o filtro."""
+        for key, value in filters.items():
+            if value in (None, ''):
+                self.filters.pop(key, None)
+            else:
+                self.filters[key] = value
+        self.reload()
+
+    def search_field(self, label="Buscar", filter_key='search', delay=0.3, width=300):
+        """Campo de busca que filtra no servidor enquanto o usuário digita.
+
+        A consulta só é feita após ``delay`` segundos sem novas teclas.
+        """
+        def on_change(e):
+            value = (e.control.value or '').strip()
+            if self._search_timer:
+                self._search_timer.cancel()
+            self._search_timer = threading.Timer(delay, lambda: self.set_filters(**{filter_key: value}))
+            self._search_timer.daemon = True
+            self._search_timer.start()
+
+        return ft.TextField(
+            label=label,
+            prefix_icon=ft.Icons.SEARCH,
+            width=width,
+            text_size=14,
+            on_change=on_change,
+            on_submit=lambda e: self.set_filters(**{filter_key: (e.control.value or '').strip()})
+        )
+
+    def update_record(self, record):
+        """Atualiza a linha de um registro já carregado; retorna False se não estiver na tela."""
+        key = record[self.row_key]
+        row = self.rows_by_key.get(key)
+        if row is None:
+            return False
+        for index, current in enumerate(self.records):
+            if current[self.row_key] == key:
+                self.records[index] = record
+                break
+        row.data = record
+        row.content.controls = self._build_cell_containers(record)
+        if row.page:
+            row.update()
+        return True
+
+    # --- Construção ---
+
+    def _build_cell_containers(self, record):
+        return [
+            ft.Container(
+                content=cell,
+                width=column.get('width'),
+                expand=column.get('expand', False),
+                padding=ft.padding.symmetric(horizontal=10)
+            )
+            for column, cell in zip(self.columns, self.build_cells(record))
+        ]
+
+    def _build_row(self, record):
+        row = ft.Container(
+            content=ft.Row(self._build_cell_containers(record), spacing=0),
+            height=self.row_height,
+            data=record,
+            border=ft.border.only(bottom=ft.border.BorderSide(1, ft.Colors.OUTLINE_VARIANT))
+        )
+        self.rows_by_key[record[self.row_key]] = row
+        return row
+
+    def _render_header(self):
+        controls = []
+        for column in self.columns:
+            label = column['label']
+            if column.get('sortable') and column['key'] == self.sort_key:
+                label += " ▼" if self.descending else " ▲"
+            text = ft.Text(label, weight=ft.FontWeight.BOLD, size=13)
+            controls.append(ft.Container(
+                content=text,
+                width=column.get('width'),
+                expand=column.get('expand', False),
+                padding=ft.padding.symmetric(horizontal=10),
+                on_click=(lambda e, key=column['key']: self.set_sort(key)) if column.get('sortable') else None
+            ))
+        self.header.controls = controls
+
+    def _refresh_footer(self):
+        if not self.records:
+            self.footer.controls = [ft.Text(self.empty_message, size=12)]
+        elif self.has_more:
+            self.footer.controls = [
+                ft.Text(f"{len(self.records)} carregados", size=12),
+                ft.TextButton("Carregar mais", on_click=self.load_more)
+            ]
+        else:
+            self.footer.controls = [ft.Text(f"{len(self.records)} registros", size=12)]
+
+    def _on_scroll(self, e):
+        # Busca a próxima página quando faltam poucas linhas para o fim
+        try:
+            near_end = float(e.pixels) >= float(e.max_scroll_extent) - self.row_height * 10
+        except (AttributeError, TypeError, ValueError):
+            return
+        if near_end and self.has_more:
+            self.load_more()
+
+    def _update(self):
+        if self.container is not None and self.container.page:
+            self.container.update()
+
+    def build(self):
+        """Constrói a tabela e carrega a primeira página."""
+        self._render_header()
+        self._load_first_page()
+        self.container = ft.Container(
+            content=ft.Column([
+                ft.Container(
+                    content=self.header,
+                    height=self.row_height,
+                    border=ft.border.only(bottom=ft.border.BorderSide(2, ft.Colors.OUTLINE))
+                ),
+                self.list_view,
+                self.footer
+            ], spacing=0),
+            height=self.height,
+            border=ft.border.all(1, ft.Colors.OUTLINE_VARIANT),
+            border_radius=10,
+            padding=10
+        )
+        return self.container
@@ -0,0 +1,50 @@
+"""Verificação e reconstrução dos contadores de tarefas e projetos.
+
+Horas, colaboradores e tarefas por status ficam gravados em ``tasks`` e
+``projects`` e são atualizados no check-out, na aprovação de registros
+manuais e na mudança de status das tarefas. Este utilitário compara esses
+valores com a agregação de ``timetrack``/``tasks`` e, se pedido, os recalcula.
+
+Uso:
+    python counter_check.py                  # lista divergências (saída 1 se houver)
+    python counter_check.py --rebuild        # recalcula todos os contadores
+    python counter_check.py --project 3 --project 7 --rebuild
+"""
+
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--project', type=int, action='append', help="restringe a um projeto (pode repetir)")
+    parser.add_argument('--rebuild', action='store_true', help="recalcula os contadores após a verificação")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from db import Database
+
+    db = Database()
+    drift = db.check_counters(args.project)
+    if drift is None:
+        print("Não foi possível verificar os contadores.")
+        return 2
+
+    for item in drift:
+        print(f"{item['table']}#{item['id']} {item['column']}: "
+              f"gravado {item['stored']}, esperado {item['expected']}")
+    print(f"{len(drift)} divergência(s) encontrada(s)")
+
+    if args.rebuild:
+        if not db.rebuild_counters(args.project):
+            print("Erro ao recalcular os contadores.")
+            return 2
+        print("Contadores recalculados")
+        return 0
+    return 1 if drift else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
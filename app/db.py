@@ -1,43 +1,256 @@
 # Arquivo: db.py (VERSÃO CORRIGIDA E SEGURA PARA ATUALIZAÇÃO)
 
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
+from mysql.connector.constants import FieldType
 import os
-from datetime import datetime, date
-import bcrypt
+import re
+import sys
+import socket
+import threading
+import time
+import weakref
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+from auth import hash_password
+from metrics import registry, ROW_BUCKETS
+import profiling
+
+# Consultas acima deste tempo (ms) são registradas no log; 0 desativa
+SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '500'))
+# Conexões mantidas abertas por processo (0 desativa o pool)
+DB_POOL_SIZE = min(int(os.getenv('DB_POOL_SIZE', '5')), pooling.CNX_POOL_MAXSIZE)
+# Prepared statements mantidos por conexão do pool (0 desativa o cache)
+STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '32'))
+
+QUERY_SECONDS = registry.histogram('db_query_seconds', 'Tempo de execução das consultas por método chamador')
+ACQUIRE_SECONDS = registry.histogram('db_connection_acquire_seconds', 'Tempo para obter uma conexão')
+QUERY_ROWS = registry.histogram('db_query_rows', 'Linhas retornadas ou afetadas por consulta', buckets=ROW_BUCKETS)
+QUERY_ERRORS = registry.counter('db_query_errors_total', 'Consultas que falharam por método chamador')
+STATEMENT_CACHE = registry.counter('db_statement_cache_total', 'Uso do cache de prepared statements (hit, miss, evict, reset)')
+POOL_EXHAUSTED = registry.counter('db_pool_exhausted_total', 'Conexões abertas fora do pool por falta de conexão livre')
+
+_EXECUTE_METHODS = {'execute_query', 'execute_many', 'execute_transaction', 'execute_update', 'fetch_records', 'stream_query'}
+
+def _caller_name():
+    """Nome do método que chamou execute_* (ex.: 'db.get_all_users_status')."""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_name in _EXECUTE_METHODS:
+        frame = frame.f_back
+    if frame is None:
+        return 'unknown'
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+def _redact(params):
+    """Substitui os valores dos parâmetros pelos seus tipos (não vazam dados no log)."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in params.items()}
+    return [_redact(value) if isinstance(value, (list, tuple)) else f"<{type(value).__name__}>"
+            for value in params]
+
+def _record_query(caller, query, params, acquire_seconds, query_seconds, rows, error):
+    """Registra as métricas de uma chamada e o log de consulta lenta."""
+    ACQUIRE_SECONDS.observe(acquire_seconds, caller=caller)
+    QUERY_SECONDS.observe(query_seconds, caller=caller)
+    QUERY_ROWS.observe(rows, caller=caller)
+    if error:
+        QUERY_ERRORS.inc(caller=caller)
+    if profiling.ENABLED:
+        duration = acquire_seconds + query_seconds
+        profiling.profiler.record('fetch', caller, time.perf_counter() - duration, duration, rows=rows)
+
+    total_ms = (acquire_seconds + query_seconds) * 1000
+    if SLOW_QUERY_MS > 0 and total_ms >= SLOW_QUERY_MS:
+        sql = re.sub(r'\s+', ' ', query).strip()
+        print(f"Consulta lenta ({caller}): {total_ms:.1f} ms "
+              f"(conexão {acquire_seconds * 1000:.1f} ms, {rows} linhas): {sql} params={_redact(params)}")
+
+def _rows_table(rows, columns):
+    """Tabela derivada (SELECT ... UNION ALL SELECT ...) com as linhas informadas.
+
+    Permite gravar várias linhas com INSERT ... SELECT juntando outras tabelas
+    em um único comando. Retorna (sql, params).
+    """
+    first = 'SELECT ' + ', '.join(f"%s AS {column}" for column in columns)
+    other = 'SELECT ' + ', '.join(['%s'] * len(columns))
+    sql = ' UNION ALL '.join([first] + [other] * (len(rows) - 1))
+    return sql, [value for row in rows for value in row]
+
+def _record_getitem(self, key):
+    if isinstance(key, str):
+        return getattr(self, key)
+    return tuple.__getitem__(self, key)
+
+def _record_get(self, key, default=None):
+    return getattr(self, key, default)
+
+@lru_cache(maxsize=256)
+def record_type(columns):
+    """Classe de registro (namedtuple sem __dict__) para as colunas de um resultado.
+
+    Os registros aceitam ``r.coluna``, ``r['coluna']`` e ``r.get('coluna')``,
+    como os dicionários usados no restante do código, mas guardam só os
+    valores: os nomes ficam uma única vez na classe.
+    """
+    base = namedtuple('Record', columns)
+    return type('Record', (base,), {
+        '__slots__': (), '__getitem__': _record_getitem, 'get': _record_get
+    })
+
+class Records(list):
+    """Lista de registros de uma consulta com os nomes das colunas (``columns``)."""
+
+    def __init__(self, rows=(), columns=()):
+        super().__init__(rows)
+        self.columns = tuple(columns)
+
+# Tipos DECIMAL chegam como Decimal; nos registros viram float na leitura
+_DECIMAL_TYPES = {FieldType.DECIMAL, FieldType.NEWDECIMAL}
 
 # Mover a importação de AuthManager para o topo se não causar importação circular
 # Se causar, mantenha dentro de create_default_admin
 # from auth import AuthManager 
 
 class Database:
-    def __init__(self):
+    # Reconstrói o agregado horário a partir de activity_logs
+    ACTIVITY_ROLLUP_SELECT = """
+        SELECT
+            al.timetrack_id,
+            t.user_id,
+            DATE_FORMAT(al.timestamp, '%Y-%m-%d %H:00:00') as hour_bucket,
+            SUM(al.activity_level),
+            COUNT(*),
+            MAX(al.activity_level),
+            MIN(al.activity_level)
+        FROM activity_logs al
+        JOIN timetrack t ON al.timetrack_id = t.id
+    """
+
+    def __init__(self, background=False, bootstrap=None):
         self.host = os.getenv('DB_HOST', 'localhost')
         self.user = os.getenv('DB_USER', 'root')
         self.password = os.getenv('DB_PASSWORD', '')
         self.database = os.getenv('DB_NAME', 'timetrack_db')
         self.connection = None
-        
-        # Rotina de inicialização segura
-        self.create_database_if_not_exists()
-        self.create_tables()
-        self._update_schema() # NOVO: Roda a "migração" de forma segura
-        self.create_default_admin()
-        self.create_default_projects()
+        self._ready = threading.Event()
+        self._bootstrap_thread = None
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        # Cursores preparados por conexão física do pool (ver _prepared_cursor)
+        self._statement_caches = weakref.WeakKeyDictionary()
+        self._statement_lock = threading.Lock()
+
+        # Workers da versão web não repetem a migração já feita pelo processo principal
+        if bootstrap is None:
+            bootstrap = os.getenv('DB_SKIP_BOOTSTRAP', '').lower() not in ('1', 'true', 'yes')
+        if not bootstrap:
+            self._ready.set()
+        # Com background=True a criação/migração do banco roda em uma thread e
+        # as consultas aguardam o seu término (ver wait_ready)
+        elif background:
+            self._bootstrap_thread = threading.Thread(
+                target=self._bootstrap, name='db-bootstrap', daemon=True
+            )
+            self._bootstrap_thread.start()
+        else:
+            self._bootstrap()
+
+    def _bootstrap(self):
+        """Rotina de inicialização segura (DDL, migrações e dados padrão)"""
+        try:
+            self.create_database_if_not_exists()
+            self.create_tables()
+            self._update_schema() # NOVO: Roda a "migração" de forma segura
+            self.create_default_admin()
+            self.create_default_projects()
+        except Exception as e:
+            print(f"Erro na inicialização do banco de dados: {e}")
+        finally:
+            self._ready.set()
+
+    def wait_ready(self, timeout=None):
+        """Aguarda a inicialização do banco; retorna False se o timeout expirar."""
+        if (self._ready.is_set() or self._bootstrap_thread is None
+                or threading.current_thread() is self._bootstrap_thread):
+            return True
+        return self._ready.wait(timeout)
 
     def connect(self):
         """Estabelece conexão com o banco de dados"""
+        self.connection = self._open_connection()
+        return self.connection is not None
+
+    def _get_pool(self):
+        """Pool de conexões do processo atual.
+
+        Um processo filho (fork) não reaproveita os sockets do pai: o pool é
+        recriado quando o PID muda.
+        """
+        pid = os.getpid()
+        if self._pool_pid != pid:
+            # A trava herdada do pai pode ter sido copiada já adquirida
+            self._pool_lock = threading.Lock()
+            self._pool = None
+            self._pool_pid = pid
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = pooling.MySQLConnectionPool(
+                    pool_name=f"timetrack-{pid}-{id(self)}",
+                    pool_size=DB_POOL_SIZE,
+                    # O reset da sessão ao devolver a conexão descartaria os prepared statements
+                    pool_reset_session=STATEMENT_CACHE_SIZE <= 0,
+                    host=self.host,
+                    user=self.user,
+                    password=self.password,
+                    database=self.database
+                )
+            return self._pool
+
+    def _open_connection(self):
+        """Obtém uma conexão própria de quem chamou (do pool do processo, se houver).
+
+        Os métodos de consulta usam conexões locais em vez de self.connection
+        para que a mesma instância possa ser usada por várias threads. Fechar
+        a conexão a devolve ao pool.
+        """
+        self.wait_ready()
         try:
-            self.connection = mysql.connector.connect(
+            if DB_POOL_SIZE > 0:
+                try:
+                    return self._get_pool().get_connection()
+                except pooling.PoolError:
+                    # Pool esgotado: abre uma conexão avulsa em vez de falhar
+                    POOL_EXHAUSTED.inc()
+            return mysql.connector.connect(
                 host=self.host,
                 user=self.user,
                 password=self.password,
                 database=self.database
             )
-            return True
         except Error as e:
             print(f"Erro ao conectar com MySQL: {e}")
-            return False
+            return None
+
+    @staticmethod
+    def _release_connection(connection):
+        """Devolve a conexão ao pool sem transação aberta.
+
+        Sem autocommit, um SELECT abre uma transação (e um snapshot REPEATABLE
+        READ). Com o reset de sessão do pool desligado pelo cache de prepared
+        statements, ela seguiria aberta para o próximo uso da conexão, que
+        leria dados antigos; o rollback só é enviado se houver transação.
+        """
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Error as e:
+            print(f"Erro ao encerrar a transação da conexão: {e}")
+        connection.close()
 
     def create_database_if_not_exists(self):
         # ... seu código original aqui, está perfeito ...
@@ -64,7 +277,10 @@ class Database:
             username VARCHAR(50) UNIQUE NOT NULL,
             password VARCHAR(255) NOT NULL,
             full_name VARCHAR(100) NOT NULL,
+            email VARCHAR(150) NULL,
             role ENUM('admin', 'colaborador') NOT NULL,
+            status ENUM('active', 'inactive') NOT NULL DEFAULT 'active',
+            session_version INT NOT NULL DEFAULT 0,
             hourly_rate DECIMAL(10,2) NULL,
             location_tracking_consent BOOLEAN DEFAULT FALSE,
             activity_tracking_consent BOOLEAN DEFAULT FALSE,
@@ -78,6 +294,12 @@ class Database:
             description TEXT NULL,
             hourly_rate DECIMAL(10,2) NULL,
             is_active BOOLEAN DEFAULT TRUE,
+            total_hours DECIMAL(12,2) NOT NULL DEFAULT 0,
+            total_users INT NOT NULL DEFAULT 0,
+            total_entries INT NOT NULL DEFAULT 0,
+            pending_tasks INT NOT NULL DEFAULT 0,
+            in_progress_tasks INT NOT NULL DEFAULT 0,
+            completed_tasks INT NOT NULL DEFAULT 0,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )"""
         
@@ -88,6 +310,8 @@ class Database:
             name VARCHAR(200) NOT NULL,
             description TEXT NULL,
             status ENUM('pending', 'in_progress', 'completed') DEFAULT 'pending',
+            total_hours_spent DECIMAL(10,2) NOT NULL DEFAULT 0,
+            total_users INT NOT NULL DEFAULT 0,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
         )"""
@@ -107,7 +331,10 @@ class Database:
             manual_entry BOOLEAN DEFAULT FALSE,
             manual_entry_reason TEXT NULL,
             approved_by INT NULL,
+            import_key VARCHAR(64) NULL,
+            auto_closed BOOLEAN NOT NULL DEFAULT FALSE,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_timetrack_import_key (import_key),
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
             FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE SET NULL,
             FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE SET NULL,
@@ -122,6 +349,7 @@ class Database:
             end_time DATETIME NULL,
             break_type ENUM('lunch', 'rest', 'other') NOT NULL,
             total_minutes INT NULL,
+            auto_closed BOOLEAN NOT NULL DEFAULT FALSE,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (timetrack_id) REFERENCES timetrack(id) ON DELETE CASCADE
         )"""
@@ -151,6 +379,92 @@ class Database:
             FOREIGN KEY (timetrack_id) REFERENCES timetrack(id) ON DELETE CASCADE
         )"""
         
+        # Agregado horário de atividade, mantido a cada registro em activity_logs
+        activity_hourly_table = """
+        CREATE TABLE IF NOT EXISTS activity_hourly (
+            timetrack_id INT NOT NULL,
+            user_id INT NOT NULL,
+            hour_bucket DATETIME NOT NULL,
+            activity_sum BIGINT NOT NULL DEFAULT 0,
+            activity_count INT NOT NULL DEFAULT 0,
+            activity_max INT NOT NULL DEFAULT 0,
+            activity_min INT NOT NULL DEFAULT 100,
+            PRIMARY KEY (timetrack_id, hour_bucket),
+            INDEX idx_activity_hourly_user (user_id, hour_bucket),
+            FOREIGN KEY (timetrack_id) REFERENCES timetrack(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )"""
+        
+        task_assignments_table = """
+        CREATE TABLE IF NOT EXISTS task_assignments (
+            task_id INT NOT NULL,
+            user_id INT NOT NULL,
+            assigned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (task_id, user_id),
+            FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )"""
+        
+        # Horas por tarefa/projeto e colaborador, mantidas a cada check-out e aprovação
+        task_user_hours_table = """
+        CREATE TABLE IF NOT EXISTS task_user_hours (
+            task_id INT NOT NULL,
+            user_id INT NOT NULL,
+            total_hours DECIMAL(10,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (task_id, user_id),
+            FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )"""
+        
+        project_user_hours_table = """
+        CREATE TABLE IF NOT EXISTS project_user_hours (
+            project_id INT NOT NULL,
+            user_id INT NOT NULL,
+            total_hours DECIMAL(12,2) NOT NULL DEFAULT 0,
+            total_entries INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (project_id, user_id),
+            FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )"""
+        
+        # Estado ao vivo de cada sessão aberta (uma linha por timetrack aberto)
+        session_heartbeat_table = """
+        CREATE TABLE IF NOT EXISTS session_heartbeat (
+            timetrack_id INT PRIMARY KEY,
+            user_id INT NOT NULL,
+            last_seen DATETIME NOT NULL,
+            activity_level INT NULL,
+            on_break BOOLEAN NOT NULL DEFAULT FALSE,
+            break_id INT NULL,
+            INDEX idx_session_heartbeat_user (user_id),
+            INDEX idx_session_heartbeat_last_seen (last_seen),
+            FOREIGN KEY (timetrack_id) REFERENCES timetrack(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )"""
+        
+        # Histórico de execução dos jobs do agendador (scheduler.py)
+        job_runs_table = """
+        CREATE TABLE IF NOT EXISTS job_runs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            job_name VARCHAR(100) NOT NULL,
+            host VARCHAR(100) NULL,
+            started_at DATETIME NOT NULL,
+            duration_ms INT NOT NULL,
+            status ENUM('success', 'error') NOT NULL,
+            rows_affected INT NULL,
+            message TEXT NULL,
+            INDEX idx_job_runs_name_started (job_name, started_at)
+        )"""
+
+        # Estado compartilhado entre os workers da versão web (state_store.py)
+        shared_state_table = """
+        CREATE TABLE IF NOT EXISTS shared_state (
+            state_key VARCHAR(191) PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at DATETIME NULL,
+            INDEX idx_shared_state_expires (expires_at)
+        )"""
+        
         try:
             # --- INÍCIO DA CORREÇÃO ---
             # Executar a criação de todas as tabelas na ordem correta de dependência
@@ -162,6 +476,13 @@ class Database:
             cursor.execute(breaks_table) # Depende de timetrack
             cursor.execute(location_logs_table) # Depende de timetrack
             cursor.execute(activity_logs_table) # Depende de timetrack
+            cursor.execute(activity_hourly_table) # Depende de timetrack e users
+            cursor.execute(task_assignments_table) # Depende de tasks e users
+            cursor.execute(task_user_hours_table) # Depende de tasks e users
+            cursor.execute(project_user_hours_table) # Depende de projects e users
+            cursor.execute(session_heartbeat_table) # Depende de timetrack e users
+            cursor.execute(job_runs_table)
+            cursor.execute(shared_state_table)
 
             # --- FIM DA CORREÇÃO ---
             
@@ -171,7 +492,7 @@ class Database:
             print(f"Erro ao criar tabelas: {e}")
         finally:
             cursor.close()
-            self.connection.close()
+            self._release_connection(self.connection)
     
     # NOVO: Função de "migração" que roda uma vez
     def _update_schema(self):
@@ -233,6 +554,145 @@ class Database:
                 """)
                 print("Projects table updated with new columns")
 
+            # E-mail e status usados na tela de colaboradores
+            cursor.execute(f"""
+                SELECT COUNT(*) 
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = '{self.database}' 
+                AND TABLE_NAME = 'users' 
+                AND COLUMN_NAME = 'email'
+            """)
+            if cursor.fetchone()[0] == 0:
+                cursor.execute("""
+                    ALTER TABLE users
+                    ADD COLUMN email VARCHAR(150) NULL AFTER full_name,
+                    ADD COLUMN status ENUM('active', 'inactive') NOT NULL DEFAULT 'active' AFTER role
+                """)
+                print("Users table updated with email/status columns")
+
+            # Versão das sessões: incrementada na troca de senha, invalida os tokens emitidos
+            cursor.execute(f"""
+                SELECT COUNT(*) 
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = '{self.database}' 
+                AND TABLE_NAME = 'users' 
+                AND COLUMN_NAME = 'session_version'
+            """)
+            if cursor.fetchone()[0] == 0:
+                cursor.execute("ALTER TABLE users ADD COLUMN session_version INT NOT NULL DEFAULT 0 AFTER status")
+                print("Users table updated with session_version column")
+
+            # Chave de idempotência da importação de folhas de ponto
+            cursor.execute(f"""
+                SELECT COUNT(*) 
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = '{self.database}' 
+                AND TABLE_NAME = 'timetrack' 
+                AND COLUMN_NAME = 'import_key'
+            """)
+            if cursor.fetchone()[0] == 0:
+                cursor.execute("ALTER TABLE timetrack ADD COLUMN import_key VARCHAR(64) NULL AFTER approved_by")
+                print("Timetrack table updated with import_key column")
+
+            # Sessões e pausas encerradas automaticamente (ficam marcadas para revisão)
+            cursor.execute(f"""
+                SELECT COUNT(*) 
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = '{self.database}' 
+                AND TABLE_NAME = 'timetrack' 
+                AND COLUMN_NAME = 'auto_closed'
+            """)
+            if cursor.fetchone()[0] == 0:
+                cursor.execute("ALTER TABLE timetrack ADD COLUMN auto_closed BOOLEAN NOT NULL DEFAULT FALSE AFTER import_key")
+                cursor.execute("ALTER TABLE breaks ADD COLUMN auto_closed BOOLEAN NOT NULL DEFAULT FALSE AFTER total_minutes")
+                print("Timetrack/breaks tables updated with auto_closed column")
+
+            # Contadores de horas por tarefa e por projeto (antes agregados de timetrack a cada leitura)
+            rebuild_counters = False
+            cursor.execute(f"""
+                SELECT COUNT(*) 
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = '{self.database}' 
+                AND TABLE_NAME = 'tasks' 
+                AND COLUMN_NAME = 'total_hours_spent'
+            """)
+            if cursor.fetchone()[0] == 0:
+                cursor.execute("""
+                    ALTER TABLE tasks
+                    ADD COLUMN total_hours_spent DECIMAL(10,2) NOT NULL DEFAULT 0 AFTER status,
+                    ADD COLUMN total_users INT NOT NULL DEFAULT 0 AFTER total_hours_spent
+                """)
+                rebuild_counters = True
+                print("Tasks table updated with hour counters")
+
+            cursor.execute(f"""
+                SELECT COUNT(*) 
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = '{self.database}' 
+                AND TABLE_NAME = 'projects' 
+                AND COLUMN_NAME = 'total_entries'
+            """)
+            if cursor.fetchone()[0] == 0:
+                cursor.execute("""
+                    ALTER TABLE projects
+                    ADD COLUMN total_hours DECIMAL(12,2) NOT NULL DEFAULT 0 AFTER is_active,
+                    ADD COLUMN total_users INT NOT NULL DEFAULT 0 AFTER total_hours,
+                    ADD COLUMN total_entries INT NOT NULL DEFAULT 0 AFTER total_users,
+                    ADD COLUMN pending_tasks INT NOT NULL DEFAULT 0 AFTER total_entries,
+                    ADD COLUMN in_progress_tasks INT NOT NULL DEFAULT 0 AFTER pending_tasks,
+                    ADD COLUMN completed_tasks INT NOT NULL DEFAULT 0 AFTER in_progress_tasks
+                """)
+                rebuild_counters = True
+                print("Projects table updated with hour/task counters")
+
+            if rebuild_counters:
+                for statement, params in self._counter_rebuild_statements():
+                    cursor.execute(statement, params)
+
+            # Índices para consultas por período (folha de pagamento e relatórios)
+            self._ensure_index(cursor, 'timetrack', 'idx_timetrack_date_user', '(date, user_id)')
+            # Listagens paginadas (colaboradores por nome e aprovações pendentes por data)
+            self._ensure_index(cursor, 'users', 'idx_users_role_name', '(role, full_name)')
+            # Busca de usuários: prefixo por coluna e palavras em qualquer posição
+            self._ensure_index(cursor, 'users', 'idx_users_email', '(email)')
+            self._ensure_index(cursor, 'users', 'ft_users_search', '(full_name, username, email)', 'FULLTEXT')
+            self._ensure_index(cursor, 'timetrack', 'idx_timetrack_pending', '(manual_entry, approved_by, date)')
+            self._ensure_index(cursor, 'timetrack', 'uq_timetrack_import_key', '(import_key)', 'UNIQUE')
+            # Poda por data de telemetria antiga (scheduler.py)
+            self._ensure_index(cursor, 'activity_logs', 'idx_activity_logs_timestamp', '(timestamp)')
+            self._ensure_index(cursor, 'location_logs', 'idx_location_logs_timestamp', '(timestamp)')
+            # Sessões e pausas abertas (NULL primeiro no índice) e última atividade por sessão
+            self._ensure_index(cursor, 'timetrack', 'idx_timetrack_open', '(check_out, check_in)')
+            self._ensure_index(cursor, 'breaks', 'idx_breaks_open', '(end_time, start_time)')
+            self._ensure_index(cursor, 'activity_logs', 'idx_activity_logs_session', '(timetrack_id, timestamp)')
+
+            # Popula o agregado horário de atividade na primeira execução
+            cursor.execute("SELECT EXISTS(SELECT 1 FROM activity_hourly)")
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(f"""
+                    INSERT INTO activity_hourly (
+                        timetrack_id, user_id, hour_bucket,
+                        activity_sum, activity_count, activity_max, activity_min
+                    )
+                    {self.ACTIVITY_ROLLUP_SELECT}
+                    GROUP BY al.timetrack_id, t.user_id, hour_bucket
+                """)
+                if cursor.rowcount > 0:
+                    print("Agregado horário de atividade populado")
+
+            # Sessões abertas antes da tabela de heartbeat existir
+            cursor.execute("""
+                INSERT IGNORE INTO session_heartbeat (timetrack_id, user_id, last_seen, on_break, break_id)
+                SELECT t.id, t.user_id,
+                       GREATEST(t.check_in, COALESCE(
+                           (SELECT MAX(al.timestamp) FROM activity_logs al WHERE al.timetrack_id = t.id),
+                           t.check_in)),
+                       b.id IS NOT NULL, b.id
+                FROM timetrack t
+                LEFT JOIN breaks b ON b.timetrack_id = t.id AND b.end_time IS NULL
+                WHERE t.check_out IS NULL
+            """)
+
             self.connection.commit()
             print("Schema atualizado com sucesso!")
 
@@ -240,7 +700,20 @@ class Database:
             print(f"Erro ao atualizar o schema: {e}")
         finally:
             cursor.close()
-            self.connection.close()
+            self._release_connection(self.connection)
+
+    def _ensure_index(self, cursor, table, index_name, columns, kind=''):
+        """Cria um índice (kind='UNIQUE'/'FULLTEXT' opcional) caso ele ainda não exista."""
+        cursor.execute("""
+            SELECT COUNT(*)
+            FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE TABLE_SCHEMA = %s
+            AND TABLE_NAME = %s
+            AND INDEX_NAME = %s
+        """, (self.database, table, index_name))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"CREATE {kind} INDEX {index_name} ON {table} {columns}")
+            print(f"Índice {index_name} criado em {table}")
 
     def create_default_admin(self):
         # ... seu código original aqui, está perfeito ...
@@ -248,15 +721,15 @@ class Database:
             cursor = self.connection.cursor()
             cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'")
             if cursor.fetchone()[0] == 0:
-                password = bcrypt.hashpw("admin123".encode('utf-8'), bcrypt.gensalt())
+                password = hash_password("admin123")
                 cursor.execute(
                     "INSERT INTO users (username, password, full_name, role) VALUES (%s, %s, %s, %s)",
-                    ("admin", password.decode('utf-8'), "Administrador", "admin")
+                    ("admin", password, "Administrador", "admin")
                 )
                 self.connection.commit()
                 print("Usuário admin padrão criado - Login: admin | Senha: admin123")
             cursor.close()
-            self.connection.close()
+            self._release_connection(self.connection)
 
     def create_default_projects(self):
         # ... código para adicionar projetos que sugeri antes ...
@@ -269,71 +742,551 @@ class Database:
                 self.connection.commit()
                 print("Projetos padrão criados.")
             cursor.close()
-            self.connection.close()
+            self._release_connection(self.connection)
 
-    def execute_query(self, query, params=None):
-        # ... seu código original aqui, está perfeito ...
-        if not self.connect(): return None
-        
-        cursor = self.connection.cursor(dictionary=True)
+    def _prepared_cursor(self, connection, query):
+        """Cursor preparado para ``query``, reaproveitado na mesma conexão do pool.
+
+        O servidor analisa o comando uma única vez por conexão; as próximas
+        execuções enviam só os parâmetros. Cada conexão física guarda até
+        STATEMENT_CACHE_SIZE comandos (os menos usados são descartados).
+        Retorna (query, cursor, em_cache). Conexões avulsas (fora do pool)
+        usam um cursor comum, que deve ser fechado por quem chamou: preparar
+        um comando para uma única execução custaria mais que enviá-lo.
+        """
+        physical = getattr(connection, '_cnx', None)
+        if physical is None or STATEMENT_CACHE_SIZE <= 0:
+            return query, connection.cursor(dictionary=True), False
+
+        with self._statement_lock:
+            thread_id, cache = self._statement_caches.get(physical, (None, None))
+            if cache is None or thread_id != physical.connection_id:
+                # Conexão nova ou reconectada pelo pool: os statements do servidor se perderam
+                if cache:
+                    STATEMENT_CACHE.inc(len(cache), result='reset')
+                cache = OrderedDict()
+                self._statement_caches[physical] = (physical.connection_id, cache)
+
+        entry = cache.get(query)
+        if entry is not None:
+            cache.move_to_end(query)
+            STATEMENT_CACHE.inc(result='hit')
+            # O cursor só reaproveita o statement se receber o mesmo objeto de texto
+            return entry[0], entry[1], True
+
+        STATEMENT_CACHE.inc(result='miss')
+        cursor = connection.cursor(prepared=True, dictionary=True)
+        cache[query] = (query, cursor)
+        if len(cache) > STATEMENT_CACHE_SIZE:
+            _old_query, (_text, old_cursor) = cache.popitem(last=False)
+            old_cursor.close()
+            STATEMENT_CACHE.inc(result='evict')
+        return query, cursor, True
+
+    def _discard_statements(self, connection):
+        """Esquece os cursores preparados de uma conexão (após erro)."""
+        physical = getattr(connection, '_cnx', None)
+        with self._statement_lock:
+            entry = self._statement_caches.pop(physical, None) if physical is not None else None
+        for _text, cursor in (entry[1].values() if entry else ()):
+            try:
+                cursor.close()
+            except Error:
+                pass
+
+    def execute_query(self, query, params=None, prepared=False):
+        """Executa uma consulta: SELECT retorna as linhas; os demais, o lastrowid.
+
+        Com prepared=True usa um prepared statement do cache da conexão
+        (comandos de texto fixo executados com muita frequência).
+        """
+        caller = _caller_name()
+        started = time.perf_counter()
+        connection = self._open_connection()
+        acquired = time.perf_counter()
+        if connection is None:
+            _record_query(caller, query, params, acquired - started, 0.0, 0, error=True)
+            return None
+
+        cached = False
+        if prepared:
+            statement, cursor, cached = self._prepared_cursor(connection, query)
+        else:
+            statement, cursor = query, connection.cursor(dictionary=True)
+        rows, error = 0, False
         try:
-            cursor.execute(query, params)
+            cursor.execute(statement, params)
             if query.strip().lower().startswith('select'):
                 result = cursor.fetchall()
+                rows = len(result)
             else:
-                self.connection.commit()
+                connection.commit()
                 result = cursor.lastrowid
+                rows = max(cursor.rowcount, 0)
             return result
         except Error as e:
-            print(f"Erro na query: {e}")
+            error = True
+            if cached:
+                self._discard_statements(connection)
+            print(f"Erro na query ({caller}): {e}")
+            return None
+        finally:
+            if not cached:
+                cursor.close()
+            self._release_connection(connection)
+            _record_query(caller, query, params, acquired - started,
+                          time.perf_counter() - acquired, rows, error)
+
+    def execute_many(self, query, seq_params):
+        """Executa o mesmo comando para vários conjuntos de parâmetros (inserção em lote).
+
+        Retorna o número de linhas afetadas, ou None em caso de erro.
+        """
+        caller = _caller_name()
+        started = time.perf_counter()
+        connection = self._open_connection()
+        acquired = time.perf_counter()
+        if connection is None:
+            _record_query(caller, query, None, acquired - started, 0.0, 0, error=True)
+            return None
+
+        cursor = connection.cursor()
+        rows, error = 0, False
+        try:
+            cursor.executemany(query, seq_params)
+            connection.commit()
+            rows = max(cursor.rowcount, 0)
+            return cursor.rowcount
+        except Error as e:
+            error = True
+            connection.rollback()
+            print(f"Erro na query em lote ({caller}): {e}")
             return None
         finally:
             cursor.close()
-            self.connection.close()
-    
+            self._release_connection(connection)
+            _record_query(caller, query, None, acquired - started,
+                          time.perf_counter() - acquired, rows, error)
+
+    def execute_update(self, query, params=None):
+        """Executa um UPDATE/DELETE e retorna o número de linhas afetadas (None em caso de erro)."""
+        return self.execute_many(query, [params or ()])
+
+    def execute_transaction(self, statements, returning='lastrowid', prepared=False):
+        """Executa uma lista de (query, params) em uma única transação.
+
+        Retorna o lastrowid do primeiro comando (ou, com returning='rowcount',
+        as linhas afetadas pelo último), ou None em caso de erro (todos os
+        comandos são desfeitos). Com prepared=True os comandos usam o cache
+        de prepared statements da conexão.
+        """
+        caller = _caller_name()
+        query = '; '.join(statement for statement, _params in statements)
+        started = time.perf_counter()
+        connection = self._open_connection()
+        acquired = time.perf_counter()
+        if connection is None:
+            _record_query(caller, query, None, acquired - started, 0.0, 0, error=True)
+            return None
+
+        cursor = None if prepared else connection.cursor()
+        cached = False
+        rows, error = 0, False
+        try:
+            result = None
+            for index, (statement, params) in enumerate(statements):
+                if prepared:
+                    if cursor is not None and not cached:
+                        cursor.close()
+                    statement, cursor, cached = self._prepared_cursor(connection, statement)
+                cursor.execute(statement, params)
+                rows += max(cursor.rowcount, 0)
+                if index == 0 and returning == 'lastrowid':
+                    result = cursor.lastrowid
+            if returning == 'rowcount':
+                result = max(cursor.rowcount, 0)
+            connection.commit()
+            return result
+        except Error as e:
+            error = True
+            connection.rollback()
+            if cached:
+                self._discard_statements(connection)
+            print(f"Erro na transação ({caller}): {e}")
+            return None
+        finally:
+            if cursor is not None and not cached:
+                cursor.close()
+            self._release_connection(connection)
+            _record_query(caller, query, [params for _statement, params in statements],
+                          acquired - started, time.perf_counter() - acquired, rows, error)
+
+    @staticmethod
+    def _record_reader(cursor):
+        """Função que converte um bloco de linhas do cursor em registros (ver record_type)."""
+        columns = tuple(column[0] for column in cursor.description)
+        make = record_type(columns)._make
+        decimals = [index for index, column in enumerate(cursor.description)
+                    if column[1] in _DECIMAL_TYPES]
+
+        def read(chunk):
+            if not decimals:
+                return Records(map(make, chunk), columns)
+            records = Records(columns=columns)
+            for row in chunk:
+                row = list(row)
+                for index in decimals:
+                    if row[index] is not None:
+                        row[index] = float(row[index])
+                records.append(make(row))
+            return records
+
+        return read
+
+    def fetch_records(self, query, params=None, chunk_size=5000):
+        """Executa um SELECT e retorna Records (registros leves) em vez de dicionários.
+
+        Indicado para resultados grandes (relatórios, exportação): cada linha
+        é uma tupla nomeada e as colunas DECIMAL são convertidas para float
+        uma única vez, na leitura. Retorna None em caso de erro.
+        """
+        caller = _caller_name()
+        started = time.perf_counter()
+        connection = self._open_connection()
+        acquired = time.perf_counter()
+        if connection is None:
+            _record_query(caller, query, params, acquired - started, 0.0, 0, error=True)
+            return None
+
+        cursor = connection.cursor()
+        rows, error = 0, False
+        try:
+            cursor.execute(query, params)
+            read = self._record_reader(cursor)
+            result = read(())
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                result.extend(read(chunk))
+            rows = len(result)
+            return result
+        except Error as e:
+            error = True
+            print(f"Erro na query ({caller}): {e}")
+            return None
+        finally:
+            cursor.close()
+            self._release_connection(connection)
+            _record_query(caller, query, params, acquired - started,
+                          time.perf_counter() - acquired, rows, error)
+
+    def stream_query(self, query, params=None, chunk_size=5000):
+        """Gera o resultado de um SELECT em blocos de até ``chunk_size`` registros.
+
+        O cursor não é bufferizado: as linhas são lidas do servidor conforme
+        a iteração avança, e só um bloco fica em memória. A conexão é obtida
+        na primeira iteração e devolvida ao pool ao fim (ou ao fechar o
+        gerador); entre um bloco e outro o consumidor não deve demorar além
+        do net_write_timeout do servidor. Cada bloco é um Records, como em
+        fetch_records.
+
+        Diferente dos demais métodos, erros do banco são propagados: um
+        resultado interrompido não pode ser confundido com um completo.
+        """
+        caller = _caller_name()
+        started = time.perf_counter()
+        connection = self._open_connection()
+        acquired = time.perf_counter()
+        if connection is None:
+            _record_query(caller, query, params, acquired - started, 0.0, 0, error=True)
+            raise Error(msg="Sem conexão com o banco de dados")
+
+        cursor = connection.cursor()
+        rows, error, finished = 0, False, False
+        try:
+            cursor.execute(query, params)
+            read = self._record_reader(cursor)
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    finished = True
+                    break
+                rows += len(chunk)
+                yield read(chunk)
+        except Error as e:
+            error = True
+            print(f"Erro na query ({caller}): {e}")
+            raise
+        finally:
+            try:
+                if not finished and not error:
+                    # Iteração interrompida: descarta o restante antes de devolver a conexão
+                    while cursor.fetchmany(chunk_size):
+                        pass
+                cursor.close()
+            except Error as e:
+                print(f"Erro ao descartar o resultado ({caller}): {e}")
+            self._release_connection(connection)
+            _record_query(caller, query, params, acquired - started,
+                          time.perf_counter() - acquired, rows, error)
+
+    # Registros que entram nos contadores: fechados e, se manuais, aprovados
+    COUNTED_ENTRY = "t.total_hours IS NOT NULL AND (t.manual_entry = FALSE OR t.approved_by IS NOT NULL)"
+
+    def _counter_delta_statements(self, where, params):
+        """Soma aos contadores os registros de timetrack (alias t) que atendem a ``where``.
+
+        As horas por colaborador são acumuladas em task_user_hours e
+        project_user_hours; os totais das tarefas e projetos afetados são
+        recalculados a partir delas (poucas linhas por tarefa/projeto).
+        """
+        params = tuple(params)
+        return [
+            (f"""
+                INSERT INTO task_user_hours (task_id, user_id, total_hours)
+                SELECT t.task_id, t.user_id, SUM(t.total_hours)
+                FROM timetrack t
+                WHERE {where} AND t.task_id IS NOT NULL
+                GROUP BY t.task_id, t.user_id
+                ON DUPLICATE KEY UPDATE total_hours = task_user_hours.total_hours + VALUES(total_hours)
+            """, params),
+            (f"""
+                INSERT INTO project_user_hours (project_id, user_id, total_hours, total_entries)
+                SELECT t.project_id, t.user_id, SUM(t.total_hours), COUNT(*)
+                FROM timetrack t
+                WHERE {where} AND t.project_id IS NOT NULL
+                GROUP BY t.project_id, t.user_id
+                ON DUPLICATE KEY UPDATE
+                    total_hours = project_user_hours.total_hours + VALUES(total_hours),
+                    total_entries = project_user_hours.total_entries + VALUES(total_entries)
+            """, params),
+            (f"""
+                UPDATE tasks tk
+                JOIN (
+                    SELECT task_id, SUM(total_hours) as hours, COUNT(*) as users
+                    FROM task_user_hours
+                    WHERE task_id IN (SELECT t.task_id FROM timetrack t WHERE {where})
+                    GROUP BY task_id
+                ) s ON s.task_id = tk.id
+                SET tk.total_hours_spent = s.hours, tk.total_users = s.users
+            """, params),
+            (f"""
+                UPDATE projects p
+                JOIN (
+                    SELECT project_id, SUM(total_hours) as hours, COUNT(*) as users,
+                           SUM(total_entries) as entries
+                    FROM project_user_hours
+                    WHERE project_id IN (SELECT t.project_id FROM timetrack t WHERE {where})
+                    GROUP BY project_id
+                ) s ON s.project_id = p.id
+                SET p.total_hours = s.hours, p.total_users = s.users, p.total_entries = s.entries
+            """, params),
+        ]
+
+    def _counter_rebuild_statements(self, project_ids=None):
+        """Comandos que recalculam todos os contadores (ou só os dos projetos informados)"""
+        project_filter = task_filter = task_project_filter = ""
+        params = ()
+        if project_ids is not None:
+            placeholders = ', '.join(['%s'] * len(project_ids))
+            project_filter = f" AND project_id IN ({placeholders})"
+            task_filter = f" AND task_id IN (SELECT id FROM tasks WHERE project_id IN ({placeholders}))"
+            task_project_filter = f" AND tk.project_id IN ({placeholders})"
+            params = tuple(project_ids)
+        return [
+            (f"DELETE FROM task_user_hours WHERE 1 = 1{task_filter}", params),
+            (f"""
+                INSERT INTO task_user_hours (task_id, user_id, total_hours)
+                SELECT t.task_id, t.user_id, SUM(t.total_hours)
+                FROM timetrack t
+                WHERE {self.COUNTED_ENTRY} AND t.task_id IS NOT NULL{task_filter}
+                GROUP BY t.task_id, t.user_id
+            """, params),
+            (f"""
+                UPDATE tasks tk
+                LEFT JOIN (
+                    SELECT task_id, SUM(total_hours) as hours, COUNT(*) as users
+                    FROM task_user_hours
+                    GROUP BY task_id
+                ) s ON s.task_id = tk.id
+                SET tk.total_hours_spent = COALESCE(s.hours, 0),
+                    tk.total_users = COALESCE(s.users, 0)
+                WHERE 1 = 1{task_project_filter}
+            """, params),
+            (f"DELETE FROM project_user_hours WHERE 1 = 1{project_filter}", params),
+            (f"""
+                INSERT INTO project_user_hours (project_id, user_id, total_hours, total_entries)
+                SELECT t.project_id, t.user_id, SUM(t.total_hours), COUNT(*)
+                FROM timetrack t
+                WHERE {self.COUNTED_ENTRY} AND t.project_id IS NOT NULL{project_filter}
+                GROUP BY t.project_id, t.user_id
+            """, params),
+            (f"""
+                UPDATE projects p
+                LEFT JOIN (
+                    SELECT project_id, SUM(total_hours) as hours, COUNT(*) as users,
+                           SUM(total_entries) as entries
+                    FROM project_user_hours
+                    GROUP BY project_id
+                ) h ON h.project_id = p.id
+                LEFT JOIN (
+                    SELECT project_id,
+                           SUM(status = 'pending') as pending,
+                           SUM(status = 'in_progress') as in_progress,
+                           SUM(status = 'completed') as completed
+                    FROM tasks
+                    GROUP BY project_id
+                ) s ON s.project_id = p.id
+                SET p.total_hours = COALESCE(h.hours, 0),
+                    p.total_users = COALESCE(h.users, 0),
+                    p.total_entries = COALESCE(h.entries, 0),
+                    p.pending_tasks = COALESCE(s.pending, 0),
+                    p.in_progress_tasks = COALESCE(s.in_progress, 0),
+                    p.completed_tasks = COALESCE(s.completed, 0)
+                WHERE 1 = 1{project_filter.replace('project_id', 'p.id')}
+            """, params),
+        ]
+
+    def rebuild_counters(self, project_ids=None):
+        """Recalcula a partir de timetrack e tasks os contadores das tarefas e projetos"""
+        if project_ids is not None:
+            project_ids = sorted({int(project_id) for project_id in project_ids})
+            if not project_ids:
+                return True
+        return self.execute_transaction(self._counter_rebuild_statements(project_ids)) is not None
+
+    def check_counters(self, project_ids=None):
+        """Compara os contadores gravados com a agregação de timetrack/tasks.
+
+        Retorna uma lista de divergências (tabela, id, projeto, coluna, gravado,
+        esperado); lista vazia significa contadores consistentes.
+        """
+        project_filter, params = "", ()
+        if project_ids:
+            project_filter = f" AND {{column}} IN ({', '.join(['%s'] * len(project_ids))})"
+            params = tuple(project_ids)
+
+        task_rows = self.execute_query(f"""
+            SELECT tk.id, tk.project_id,
+                   tk.total_hours_spent, COALESCE(x.hours, 0) as expected_hours,
+                   tk.total_users, COALESCE(x.users, 0) as expected_users
+            FROM tasks tk
+            LEFT JOIN (
+                SELECT t.task_id, SUM(t.total_hours) as hours, COUNT(DISTINCT t.user_id) as users
+                FROM timetrack t
+                WHERE {self.COUNTED_ENTRY} AND t.task_id IS NOT NULL
+                GROUP BY t.task_id
+            ) x ON x.task_id = tk.id
+            WHERE (tk.total_hours_spent <> COALESCE(x.hours, 0) OR tk.total_users <> COALESCE(x.users, 0))
+            {project_filter.format(column='tk.project_id')}
+        """, params)
+        project_rows = self.execute_query(f"""
+            SELECT p.id, p.id as project_id,
+                   p.total_hours, COALESCE(x.hours, 0) as expected_hours,
+                   p.total_users, COALESCE(x.users, 0) as expected_users,
+                   p.total_entries, COALESCE(x.entries, 0) as expected_entries,
+                   p.pending_tasks, COALESCE(s.pending, 0) as expected_pending,
+                   p.in_progress_tasks, COALESCE(s.in_progress, 0) as expected_in_progress,
+                   p.completed_tasks, COALESCE(s.completed, 0) as expected_completed
+            FROM projects p
+            LEFT JOIN (
+                SELECT t.project_id, SUM(t.total_hours) as hours,
+                       COUNT(DISTINCT t.user_id) as users, COUNT(*) as entries
+                FROM timetrack t
+                WHERE {self.COUNTED_ENTRY} AND t.project_id IS NOT NULL
+                GROUP BY t.project_id
+            ) x ON x.project_id = p.id
+            LEFT JOIN (
+                SELECT project_id,
+                       SUM(status = 'pending') as pending,
+                       SUM(status = 'in_progress') as in_progress,
+                       SUM(status = 'completed') as completed
+                FROM tasks
+                GROUP BY project_id
+            ) s ON s.project_id = p.id
+            WHERE 1 = 1{project_filter.format(column='p.id')}
+        """, params)
+        if task_rows is None or project_rows is None:
+            return None
+
+        drift = []
+        checks = {
+            'tasks': (task_rows, {'total_hours_spent': 'expected_hours', 'total_users': 'expected_users'}),
+            'projects': (project_rows, {
+                'total_hours': 'expected_hours', 'total_users': 'expected_users',
+                'total_entries': 'expected_entries', 'pending_tasks': 'expected_pending',
+                'in_progress_tasks': 'expected_in_progress', 'completed_tasks': 'expected_completed',
+            }),
+        }
+        for table, (rows, columns) in checks.items():
+            for row in rows:
+                for column, expected in columns.items():
+                    if row[column] != row[expected]:
+                        drift.append({'table': table, 'id': row['id'], 'project_id': row['project_id'],
+                                      'column': column,
+                                      'stored': row[column], 'expected': row[expected]})
+        return drift
+
     # NOVO: Método específico para buscar projetos
     def get_active_projects(self):
         query = """
             SELECT p.*, 
-                   COUNT(t.id) as total_tasks,
-                   SUM(CASE WHEN t.status = 'completed' THEN 1 ELSE 0 END) as completed_tasks
+                   p.pending_tasks + p.in_progress_tasks + p.completed_tasks as total_tasks
             FROM projects p
-            LEFT JOIN tasks t ON p.id = t.project_id
             WHERE p.is_active = TRUE
-            GROUP BY p.id, p.name
             ORDER BY p.name
         """
         return self.execute_query(query)
 
     def get_project_tasks(self, project_id):
-        """Retorna todas as tarefas de um projeto"""
+        """Retorna todas as tarefas de um projeto (com horas e colaboradores mantidos por contador)"""
         query = """
-            SELECT t.*,
-                   SUM(tt.total_hours) as total_hours_spent,
-                   COUNT(DISTINCT tt.user_id) as total_users
-            FROM tasks t
-            LEFT JOIN timetrack tt ON t.id = tt.task_id
-            WHERE t.project_id = %s
-            GROUP BY t.id
-            ORDER BY t.created_at DESC
+            SELECT * FROM tasks
+            WHERE project_id = %s
+            ORDER BY created_at DESC
         """
         return self.execute_query(query, (project_id,))
 
+    def get_task(self, task_id):
+        """Retorna uma tarefa, ou None se não existir"""
+        result = self.execute_query("SELECT * FROM tasks WHERE id = %s", (task_id,))
+        return result[0] if result else None
+
     def add_task(self, project_id, name, description=None):
-        """Adiciona uma nova tarefa ao projeto"""
+        """Adiciona uma nova tarefa ao projeto e retorna a linha criada"""
         query = """
             INSERT INTO tasks (project_id, name, description, status)
             VALUES (%s, %s, %s, 'pending')
         """
-        return self.execute_query(query, (project_id, name, description))
+        task_id = self.execute_transaction([
+            (query, (project_id, name, description)),
+            ("UPDATE projects SET pending_tasks = pending_tasks + 1 WHERE id = %s", (project_id,))
+        ])
+        return self.get_task(task_id) if task_id else None
 
     def update_task_status(self, task_id, status):
-        """Atualiza o status de uma tarefa"""
+        """Atualiza o status de uma tarefa e retorna a linha atualizada"""
         if status not in ['pending', 'in_progress', 'completed']:
             return False
             
+        # Move a tarefa entre os contadores de status do projeto, na mesma transação
+        counters_query = """
+            UPDATE projects p
+            JOIN tasks t ON t.project_id = p.id
+            SET p.pending_tasks = p.pending_tasks + (%s = 'pending') - (t.status = 'pending'),
+                p.in_progress_tasks = p.in_progress_tasks + (%s = 'in_progress') - (t.status = 'in_progress'),
+                p.completed_tasks = p.completed_tasks + (%s = 'completed') - (t.status = 'completed')
+            WHERE t.id = %s AND t.status <> %s
+        """
         query = "UPDATE tasks SET status = %s WHERE id = %s"
-        return self.execute_query(query, (status, task_id))
+        result = self.execute_transaction([
+            (counters_query, (status, status, status, task_id, status)),
+            (query, (status, task_id))
+        ])
+        if result is None:
+            return None
+        return self.get_task(task_id)
 
     def get_task_time_entries(self, task_id):
         """Retorna todos os registros de tempo para uma tarefa"""
@@ -351,16 +1304,10 @@ class Database:
         query = """
             SELECT 
                 p.*,
-                COUNT(DISTINCT t.id) as total_tasks,
-                COUNT(DISTINCT CASE WHEN t.status = 'completed' THEN t.id END) as completed_tasks,
-                COUNT(DISTINCT tt.user_id) as total_users,
-                SUM(tt.total_hours) as total_hours,
-                AVG(tt.total_hours) as avg_hours_per_entry
+                p.pending_tasks + p.in_progress_tasks + p.completed_tasks as total_tasks,
+                p.total_hours / NULLIF(p.total_entries, 0) as avg_hours_per_entry
             FROM projects p
-            LEFT JOIN tasks t ON p.id = t.project_id
-            LEFT JOIN timetrack tt ON p.id = tt.project_id
             WHERE p.id = %s
-            GROUP BY p.id
         """
         return self.execute_query(query, (project_id,))
 
@@ -377,13 +1324,12 @@ class Database:
         """Retorna todas as tarefas atribuídas a um usuário"""
         query = """
             SELECT t.*, p.name as project_name,
-                   SUM(tt.total_hours) as hours_spent
+                   COALESCE(tuh.total_hours, 0) as hours_spent
             FROM tasks t
             JOIN projects p ON t.project_id = p.id
             JOIN task_assignments ta ON t.id = ta.task_id
-            LEFT JOIN timetrack tt ON t.id = tt.task_id AND tt.user_id = ta.user_id
+            LEFT JOIN task_user_hours tuh ON tuh.task_id = t.id AND tuh.user_id = ta.user_id
             WHERE ta.user_id = %s
-            GROUP BY t.id, p.name
             ORDER BY t.status, t.created_at DESC
         """
         return self.execute_query(query, (user_id,))
@@ -398,25 +1344,46 @@ class Database:
             WHERE t.user_id = %s AND t.date = %s
             ORDER BY t.check_in DESC LIMIT 1
         """
-        return self.execute_query(query, (user_id, date.today()))
+        return self.execute_query(query, (user_id, date.today()), prepared=True)
 
     # ALTERADO para aceitar project_id
-    def check_in_user(self, user_id, project_id):
+    def check_in_user(self, user_id, project_id, task_id=None):
         now = datetime.now()
-        query = "INSERT INTO timetrack (user_id, project_id, check_in, date) VALUES (%s, %s, %s, %s)"
-        return self.execute_query(query, (user_id, project_id, now, now.date()))
+        query = "INSERT INTO timetrack (user_id, project_id, task_id, check_in, date) VALUES (%s, %s, %s, %s, %s)"
+        heartbeat_query = """
+            INSERT INTO session_heartbeat (timetrack_id, user_id, last_seen)
+            VALUES (LAST_INSERT_ID(), %s, %s)
+        """
+        return self.execute_transaction([
+            (query, (user_id, project_id, task_id, now, now.date())),
+            (heartbeat_query, (user_id, now))
+        ])
 
     def check_out_user(self, timetrack_id):
         now = datetime.now()
-        query_select = "SELECT check_in FROM timetrack WHERE id = %s"
+        query_select = "SELECT user_id, task_id, check_in, check_out FROM timetrack WHERE id = %s"
         result = self.execute_query(query_select, (timetrack_id,))
         
-        if result:
-            check_in_time = result[0]['check_in']
-            total_hours = (now - check_in_time).total_seconds() / 3600
+        if result and result[0]['check_out'] is None:
+            entry = result[0]
+            total_hours = round((now - entry['check_in']).total_seconds() / 3600, 2)
             
-            query_update = "UPDATE timetrack SET check_out = %s, total_hours = %s WHERE id = %s"
-            return self.execute_query(query_update, (now, total_hours, timetrack_id))
+            # Só o primeiro de dois check-outs simultâneos (ou de um check-out e da
+            # varredura de sessões abandonadas) encerra o registro; o outro espera
+            # o bloqueio da linha, não altera nada e não soma as horas de novo
+            statements = [(
+                "UPDATE timetrack SET check_out = %s, total_hours = %s WHERE id = %s AND check_out IS NULL",
+                (now, total_hours, timetrack_id)
+            ), (
+                "SET @checked_out = ROW_COUNT()", ()
+            ), (
+                "DELETE FROM session_heartbeat WHERE timetrack_id = %s", (timetrack_id,)
+            )]
+            # Contadores da tarefa e do projeto atualizados na mesma transação do check-out
+            statements += self._counter_delta_statements(
+                f"t.id = %s AND @checked_out > 0 AND {self.COUNTED_ENTRY}", (timetrack_id,)
+            )
+            return self.execute_transaction(statements) is not None
         return False
 
     def get_user_history(self, user_id, days=30):
@@ -428,18 +1395,23 @@ class Database:
             WHERE t.user_id = %s AND t.date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
             ORDER BY t.check_in DESC
         """
-        return self.execute_query(query, (user_id, days))
+        return self.fetch_records(query, (user_id, days))
 
     def get_all_users_status(self):
         # ALTERADO para incluir o nome do projeto atual
         query = """
-            SELECT u.id, u.username, u.full_name, t.check_in, t.check_out, p.name as project_name
+            SELECT u.id, u.username, u.full_name,
+                   t.id as timetrack_id, t.check_in, t.check_out, t.total_hours,
+                   p.name as project_name,
+                   COALESCE(h.on_break, FALSE) as is_on_break,
+                   h.last_seen, h.activity_level
             FROM users u
             LEFT JOIN (
                 SELECT *, ROW_NUMBER() OVER(PARTITION BY user_id ORDER BY check_in DESC) as rn
                 FROM timetrack WHERE date = CURDATE()
             ) t ON u.id = t.user_id AND t.rn = 1
             LEFT JOIN projects p ON t.project_id = p.id
+            LEFT JOIN session_heartbeat h ON h.timetrack_id = t.id
             WHERE u.role = 'colaborador'
             ORDER BY u.full_name
         """
@@ -465,38 +1437,161 @@ class Database:
         
         if user_id:
             query = base_query + " AND t.user_id = %s GROUP BY t.date, p.name, u.full_name ORDER BY t.date"
-            return self.execute_query(query, (user_id,))
+            return self.fetch_records(query, (user_id,))
         else:
             query = base_query + " GROUP BY u.full_name, p.name, t.date ORDER BY u.full_name, t.date"
-            return self.execute_query(query)
+            return self.fetch_records(query)
 
     # Métodos para controle de pausas
     def start_break(self, timetrack_id, break_type='rest'):
-        """Inicia uma pausa no registro de ponto"""
+        """Inicia uma pausa no registro de ponto.
+
+        Sessões já encerradas não recebem pausa nem heartbeat (retorna 0).
+        """
+        now = datetime.now()
         query = """
             INSERT INTO breaks (timetrack_id, start_time, break_type)
-            VALUES (%s, NOW(), %s)
+            SELECT id, %s, %s FROM timetrack WHERE id = %s AND check_out IS NULL
+        """
+        heartbeat_query = """
+            INSERT INTO session_heartbeat (timetrack_id, user_id, last_seen, on_break, break_id)
+            SELECT id, user_id, %s, TRUE, LAST_INSERT_ID() FROM timetrack
+            WHERE id = %s AND check_out IS NULL
+            ON DUPLICATE KEY UPDATE
+                last_seen = VALUES(last_seen), on_break = TRUE, break_id = VALUES(break_id)
         """
-        return self.execute_query(query, (timetrack_id, break_type))
+        return self.execute_transaction([
+            (query, (now, break_type, timetrack_id)),
+            (heartbeat_query, (now, timetrack_id))
+        ])
 
     def end_break(self, break_id):
         """Finaliza uma pausa e calcula o tempo total"""
         now = datetime.now()
-        query_select = "SELECT start_time FROM breaks WHERE id = %s"
+        query_select = "SELECT start_time, end_time FROM breaks WHERE id = %s"
         result = self.execute_query(query_select, (break_id,))
         
-        if result:
+        if result and result[0]['end_time'] is None:
             start_time = result[0]['start_time']
             total_minutes = int((now - start_time).total_seconds() / 60)
             
+            # Uma segunda chamada (ou a varredura de sessões) não sobrescreve o fim já gravado
             query_update = """
                 UPDATE breaks 
                 SET end_time = %s, total_minutes = %s 
-                WHERE id = %s
+                WHERE id = %s AND end_time IS NULL
+            """
+            heartbeat_query = """
+                UPDATE session_heartbeat
+                SET on_break = FALSE, break_id = NULL, last_seen = %s
+                WHERE break_id = %s
             """
-            return self.execute_query(query_update, (now, total_minutes, break_id))
+            return self.execute_transaction([
+                (query_update, (now, total_minutes, break_id)),
+                (heartbeat_query, (now, break_id))
+            ]) is not None
         return False
 
+    def close_stale_sessions(self, stale_hours=12, limit=500):
+        """Encerra sessões abertas sem sinal de vida há mais de ``stale_hours``.
+
+        O último sinal da sessão em session_heartbeat (atividade ou pausa; o
+        check-in, se não houver) é usado como horário de saída; pausas abertas da sessão são encerradas no
+        mesmo horário. Sessões e pausas ficam com auto_closed = TRUE para
+        revisão. Retorna quantas sessões foram encerradas.
+        """
+        cutoff = datetime.now() - timedelta(hours=stale_hours)
+        query = """
+            SELECT t.id, t.check_in, h.last_seen as last_activity
+            FROM timetrack t
+            LEFT JOIN session_heartbeat h ON h.timetrack_id = t.id
+            WHERE t.check_out IS NULL AND t.check_in < %s
+            AND (h.last_seen IS NULL OR h.last_seen < %s)
+            ORDER BY t.check_in
+            LIMIT %s
+        """
+        stale = self.execute_query(query, (cutoff, cutoff, limit))
+        if stale is None:
+            return None
+
+        closed = 0
+        for session in stale:
+            end = max(session['last_activity'] or session['check_in'], session['check_in'])
+            total_hours = round((end - session['check_in']).total_seconds() / 3600, 2)
+            statements = [(
+                """
+                UPDATE timetrack SET check_out = %s, total_hours = %s, auto_closed = TRUE
+                WHERE id = %s AND check_out IS NULL
+                """,
+                (end, total_hours, session['id'])
+            ), (
+                """
+                UPDATE breaks
+                SET end_time = GREATEST(start_time, %s),
+                    total_minutes = TIMESTAMPDIFF(MINUTE, start_time, GREATEST(start_time, %s)),
+                    auto_closed = TRUE
+                WHERE timetrack_id = %s AND end_time IS NULL
+                """,
+                (end, end, session['id'])
+            ), (
+                "DELETE FROM session_heartbeat WHERE timetrack_id = %s", (session['id'],)
+            )]
+            statements += self._counter_delta_statements(
+                f"t.id = %s AND t.auto_closed = TRUE AND {self.COUNTED_ENTRY}", (session['id'],)
+            )
+            if self.execute_transaction(statements) is not None:
+                closed += 1
+        return closed
+
+    def close_orphan_breaks(self):
+        """Encerra pausas abertas de sessões já encerradas (no horário do check-out)"""
+        query = """
+            UPDATE breaks b
+            JOIN timetrack t ON b.timetrack_id = t.id
+            SET b.end_time = GREATEST(b.start_time, t.check_out),
+                b.total_minutes = TIMESTAMPDIFF(MINUTE, b.start_time, GREATEST(b.start_time, t.check_out)),
+                b.auto_closed = TRUE
+            WHERE b.end_time IS NULL AND t.check_out IS NOT NULL
+        """
+        return self.execute_update(query)
+
+    def get_auto_closed_sessions(self, offset=0, limit=50):
+        """Sessões encerradas automaticamente, para revisão do administrador"""
+        query = """
+            SELECT t.*, u.full_name, p.name as project_name
+            FROM timetrack t
+            JOIN users u ON t.user_id = u.id
+            LEFT JOIN projects p ON t.project_id = p.id
+            WHERE t.auto_closed = TRUE
+            ORDER BY t.check_in DESC
+            LIMIT %s OFFSET %s
+        """
+        return self.execute_query(query, (limit, offset))
+
+    def get_session_heartbeat(self, timetrack_id):
+        """Estado ao vivo de uma sessão aberta (último sinal, atividade e pausa)"""
+        result = self.execute_query("SELECT * FROM session_heartbeat WHERE timetrack_id = %s", (timetrack_id,),
+                                    prepared=True)
+        return result[0] if result else None
+
+    def get_live_sessions(self, active_within_seconds=300):
+        """Sessões abertas com o estado ao vivo de cada colaborador.
+
+        ``is_live`` indica sinal recebido nos últimos ``active_within_seconds``.
+        Lê apenas session_heartbeat (uma linha por sessão aberta), sem varrer
+        a telemetria.
+        """
+        query = """
+            SELECT h.*, u.full_name, t.check_in, t.project_id, p.name as project_name,
+                   h.last_seen >= NOW() - INTERVAL %s SECOND as is_live
+            FROM session_heartbeat h
+            JOIN users u ON h.user_id = u.id
+            JOIN timetrack t ON h.timetrack_id = t.id
+            LEFT JOIN projects p ON t.project_id = p.id
+            ORDER BY u.full_name
+        """
+        return self.execute_query(query, (active_within_seconds,))
+
     def get_active_break(self, timetrack_id):
         """Retorna a pausa ativa para um registro de ponto, se houver"""
         query = """
@@ -506,28 +1601,152 @@ class Database:
             ORDER BY start_time DESC 
             LIMIT 1
         """
-        return self.execute_query(query, (timetrack_id,))
+        return self.execute_query(query, (timetrack_id,), prepared=True)
 
     # Métodos para registro de atividade
     def update_activity_level(self, timetrack_id, activity_level):
-        """Atualiza o nível de atividade do usuário"""
-        query = """
+        """Atualiza o nível de atividade do usuário, o agregado horário e o heartbeat da sessão"""
+        now = datetime.now()
+        log_query = """
             INSERT INTO activity_logs (timetrack_id, timestamp, activity_level)
-            VALUES (%s, NOW(), %s)
+            VALUES (%s, %s, %s)
         """
-        return self.execute_query(query, (timetrack_id, activity_level))
+        rollup_query = """
+            INSERT INTO activity_hourly (
+                timetrack_id, user_id, hour_bucket,
+                activity_sum, activity_count, activity_max, activity_min
+            )
+            SELECT id, user_id, DATE_FORMAT(%s, '%Y-%m-%d %H:00:00'), %s, 1, %s, %s
+            FROM timetrack WHERE id = %s
+            ON DUPLICATE KEY UPDATE
+                activity_sum = activity_sum + VALUES(activity_sum),
+                activity_count = activity_count + VALUES(activity_count),
+                activity_max = GREATEST(activity_max, VALUES(activity_max)),
+                activity_min = LEAST(activity_min, VALUES(activity_min))
+        """
+        heartbeat_query = """
+            INSERT INTO session_heartbeat (timetrack_id, user_id, last_seen, activity_level)
+            SELECT id, user_id, %s, %s FROM timetrack WHERE id = %s AND check_out IS NULL
+            ON DUPLICATE KEY UPDATE
+                last_seen = VALUES(last_seen), activity_level = VALUES(activity_level)
+        """
+        return self.execute_transaction([
+            (log_query, (timetrack_id, now, activity_level)),
+            (rollup_query, (now, activity_level, activity_level, activity_level, timetrack_id)),
+            (heartbeat_query, (now, activity_level, timetrack_id))
+        ], prepared=True)
+
+    def log_activity_batch(self, samples):
+        """Grava leituras de atividade em lote: (timetrack_id, timestamp, activity_level).
+
+        Usado pelo agente de ingestão: uma transação com um comando de várias
+        linhas para activity_logs, o agregado horário e o heartbeat (última
+        leitura de cada sessão aberta). Leituras de sessões inexistentes são
+        ignoradas (junção com timetrack), sem desfazer o lote. Retorna o número
+        de leituras gravadas, ou None em caso de erro.
+        """
+        if not samples:
+            return 0
+
+        log_rows, log_params = _rows_table(samples, ('tt', 'ts', 'lvl'))
+        log_query = f"""
+            INSERT INTO activity_logs (timetrack_id, timestamp, activity_level)
+            SELECT s.tt, s.ts, s.lvl
+            FROM ({log_rows}) s
+            JOIN timetrack t ON t.id = s.tt
+        """
+
+        buckets, latest = {}, {}
+        for timetrack_id, timestamp, level in samples:
+            key = (timetrack_id, timestamp.replace(minute=0, second=0, microsecond=0))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [level, 1, level, level]
+            else:
+                bucket[0] += level
+                bucket[1] += 1
+                bucket[2] = max(bucket[2], level)
+                bucket[3] = min(bucket[3], level)
+            if timetrack_id not in latest or timestamp >= latest[timetrack_id][0]:
+                latest[timetrack_id] = (timestamp, level)
+
+        # Colunas da tabela derivada com nomes distintos dos de destino (evita ambiguidade no UPDATE)
+        rollup_rows, rollup_params = _rows_table(
+            [key + tuple(bucket) for key, bucket in buckets.items()],
+            ('tt', 'bucket', 'total', 'readings', 'peak', 'low')
+        )
+        rollup_query = f"""
+            INSERT INTO activity_hourly (
+                timetrack_id, user_id, hour_bucket,
+                activity_sum, activity_count, activity_max, activity_min
+            )
+            SELECT s.tt, t.user_id, s.bucket, s.total, s.readings, s.peak, s.low
+            FROM ({rollup_rows}) s
+            JOIN timetrack t ON t.id = s.tt
+            ON DUPLICATE KEY UPDATE
+                activity_sum = activity_sum + VALUES(activity_sum),
+                activity_count = activity_count + VALUES(activity_count),
+                activity_max = GREATEST(activity_max, VALUES(activity_max)),
+                activity_min = LEAST(activity_min, VALUES(activity_min))
+        """
+        heartbeat_rows, heartbeat_params = _rows_table(
+            [(timetrack_id, seen, level) for timetrack_id, (seen, level) in latest.items()],
+            ('tt', 'seen', 'lvl')
+        )
+        heartbeat_query = f"""
+            INSERT INTO session_heartbeat (timetrack_id, user_id, last_seen, activity_level)
+            SELECT t.id, t.user_id, s.seen, s.lvl
+            FROM ({heartbeat_rows}) s
+            JOIN timetrack t ON t.id = s.tt
+            WHERE t.check_out IS NULL
+            ON DUPLICATE KEY UPDATE
+                activity_level = IF(VALUES(last_seen) >= last_seen, VALUES(activity_level), activity_level),
+                last_seen = GREATEST(last_seen, VALUES(last_seen))
+        """
+        # Uma leitura por chamada (DirectSink, o caminho do desktop) gera sempre o
+        # mesmo texto e usa o cache de prepared statements; lotes do agente variam
+        # de tamanho e não compensariam preparar
+        return self.execute_transaction([
+            (rollup_query, tuple(rollup_params)),
+            (heartbeat_query, tuple(heartbeat_params)),
+            (log_query, tuple(log_params))
+        ], returning='rowcount', prepared=len(samples) == 1)
+
+    def rebuild_activity_rollup(self, timetrack_id=None):
+        """Recalcula o agregado horário a partir de activity_logs"""
+        delete_query = "DELETE FROM activity_hourly"
+        insert_query = f"""
+            INSERT INTO activity_hourly (
+                timetrack_id, user_id, hour_bucket,
+                activity_sum, activity_count, activity_max, activity_min
+            )
+            {self.ACTIVITY_ROLLUP_SELECT}
+        """
+        params = ()
+
+        if timetrack_id:
+            delete_query += " WHERE timetrack_id = %s"
+            insert_query += " WHERE al.timetrack_id = %s"
+            params = (timetrack_id,)
+
+        insert_query += " GROUP BY al.timetrack_id, t.user_id, hour_bucket"
+        return self.execute_transaction([
+            (delete_query, params),
+            (insert_query, params)
+        ])
         
     def get_activity_history(self, timetrack_id):
-        """Retorna o histórico de atividade para visualização em gráfico"""
+        """Retorna o histórico de atividade (média por hora) para visualização em gráfico"""
         query = """
             SELECT 
-                DATE_FORMAT(timestamp, '%H:%i') as time,
-                activity_level,
-                UNIX_TIMESTAMP(timestamp) as timestamp_unix
-            FROM activity_logs
+                DATE_FORMAT(hour_bucket, '%H:%i') as time,
+                hour_bucket as timestamp,
+                activity_sum / activity_count as activity_level,
+                UNIX_TIMESTAMP(hour_bucket) as timestamp_unix
+            FROM activity_hourly
             WHERE timetrack_id = %s
-            AND timestamp >= DATE_SUB(NOW(), INTERVAL 4 HOUR)
-            ORDER BY timestamp
+            AND hour_bucket >= DATE_FORMAT(DATE_SUB(NOW(), INTERVAL 4 HOUR), '%Y-%m-%d %H:00:00')
+            ORDER BY hour_bucket
         """
         return self.execute_query(query, (timetrack_id,))
         
@@ -535,11 +1754,11 @@ class Database:
         """Retorna estatísticas da atividade para um registro de ponto"""
         query = """
             SELECT 
-                AVG(activity_level) as avg_activity,
-                MAX(activity_level) as max_activity,
-                MIN(activity_level) as min_activity,
-                COUNT(*) as total_readings
-            FROM activity_logs
+                SUM(activity_sum) / SUM(activity_count) as avg_activity,
+                MAX(activity_max) as max_activity,
+                MIN(activity_min) as min_activity,
+                COALESCE(SUM(activity_count), 0) as total_readings
+            FROM activity_hourly
             WHERE timetrack_id = %s
         """
         return self.execute_query(query, (timetrack_id,))
@@ -553,7 +1772,7 @@ class Database:
             FROM activity_logs al
             JOIN timetrack t ON al.timetrack_id = t.id
             WHERE t.user_id = %s 
-            AND DATE(al.timestamp) = CURDATE()
+            AND al.timestamp >= CURDATE() AND al.timestamp < CURDATE() + INTERVAL 1 DAY
             ORDER BY al.timestamp DESC
         """
         return self.execute_query(query, (user_id,))
@@ -577,25 +1796,100 @@ class Database:
 
     def approve_manual_entry(self, timetrack_id, approver_id):
         """Aprova um registro manual de ponto"""
-        query = """
-            UPDATE timetrack 
-            SET approved_by = %s
-            WHERE id = %s AND manual_entry = TRUE
-        """
-        return self.execute_query(query, (approver_id, timetrack_id))
+        return self.approve_manual_entries(approver_id, ids=[timetrack_id])
 
-    def get_pending_approvals(self):
-        """Retorna todos os registros manuais pendentes de aprovação"""
-        query = """
+    # Colunas aceitas na ordenação das listagens paginadas (evita SQL injection)
+    APPROVAL_SORT_COLUMNS = {
+        'date': 't.date', 'full_name': 'u.full_name',
+        'project_name': 'p.name', 'total_hours': 't.total_hours'
+    }
+    USER_SORT_COLUMNS = {
+        'full_name': 'u.full_name', 'username': 'u.username', 'email': 'u.email',
+        'hourly_rate': 'u.hourly_rate', 'status': 'u.status'
+    }
+
+    def _pending_approvals_filters(self, user_id=None, project_id=None, start_date=None, end_date=None):
+        """Monta o WHERE dos registros manuais pendentes"""
+        conditions = ["t.manual_entry = TRUE", "t.approved_by IS NULL"]
+        params = []
+        if user_id:
+            conditions.append("t.user_id = %s")
+            params.append(user_id)
+        if project_id:
+            conditions.append("t.project_id = %s")
+            params.append(project_id)
+        if start_date:
+            conditions.append("t.date >= %s")
+            params.append(start_date)
+        if end_date:
+            conditions.append("t.date <= %s")
+            params.append(end_date)
+        return " AND ".join(conditions), params
+
+    def get_pending_approvals(self, offset=None, limit=None, sort='date', descending=True,
+                              user_id=None, project_id=None, start_date=None, end_date=None):
+        """Retorna os registros manuais pendentes de aprovação (opcionalmente paginados)"""
+        where, params = self._pending_approvals_filters(user_id, project_id, start_date, end_date)
+        order = self.APPROVAL_SORT_COLUMNS.get(sort, 't.date')
+        direction = "DESC" if descending else "ASC"
+        query = f"""
             SELECT t.*, u.full_name, p.name as project_name
             FROM timetrack t
             JOIN users u ON t.user_id = u.id
             LEFT JOIN projects p ON t.project_id = p.id
-            WHERE t.manual_entry = TRUE 
-            AND t.approved_by IS NULL
-            ORDER BY t.date DESC
+            WHERE {where}
+            ORDER BY {order} {direction}, t.id {direction}
         """
-        return self.execute_query(query)
+        if limit:
+            query += " LIMIT %s OFFSET %s"
+            params += [limit, offset or 0]
+        return self.execute_query(query, tuple(params))
+
+    def _bulk_pending_filters(self, ids, filters, all_pending=False):
+        """WHERE dos métodos em lote: ids explícitos e/ou filtros (usuário, projeto, datas)"""
+        where, params = self._pending_approvals_filters(**filters)
+        if ids is not None:
+            ids = [int(timetrack_id) for timetrack_id in ids]
+            if not ids:
+                return None, None
+            where += f" AND t.id IN ({', '.join(['%s'] * len(ids))})"
+            params += ids
+        elif not all_pending and not any(filters.values()):
+            raise ValueError("Informe ids ou ao menos um filtro para a operação em lote")
+        return where, params
+
+    def approve_manual_entries(self, approver_id, ids=None, all_pending=False, **filters):
+        """Aprova em um único UPDATE os registros manuais pendentes selecionados.
+
+        Aceita uma lista de ids e/ou filtros (user_id, project_id, start_date,
+        end_date); sem ids nem filtros é preciso ``all_pending=True``.
+        Retorna quantos registros foram aprovados.
+        """
+        where, params = self._bulk_pending_filters(ids, filters, all_pending)
+        if where is None:
+            return 0
+        # As horas entram nos contadores antes de os registros deixarem de ser pendentes
+        statements = self._counter_delta_statements(f"{where} AND t.total_hours IS NOT NULL", params)
+        query = f"UPDATE timetrack t SET t.approved_by = %s WHERE {where}"
+        statements.append((query, tuple([approver_id] + params)))
+        return self.execute_transaction(statements, returning='rowcount')
+
+    def reject_manual_entries(self, ids=None, **filters):
+        """Rejeita (remove) em um único DELETE os registros manuais pendentes selecionados.
+
+        Registros já aprovados nunca são removidos. Retorna quantos foram rejeitados.
+        """
+        where, params = self._bulk_pending_filters(ids, filters)
+        if where is None:
+            return 0
+        query = f"DELETE t FROM timetrack t WHERE {where}"
+        return self.execute_update(query, tuple(params))
+
+    def count_pending_approvals(self, **filters):
+        """Retorna a quantidade de registros manuais pendentes (opcionalmente filtrados)"""
+        where, params = self._pending_approvals_filters(**filters)
+        result = self.execute_query(f"SELECT COUNT(*) as total FROM timetrack t WHERE {where}", tuple(params))
+        return result[0]['total'] if result else 0
         
     # Métodos para gerenciamento de localização
     def log_location(self, timetrack_id, lat, lon, details=None):
@@ -616,8 +1910,36 @@ class Database:
             details.get('country') if details else None,
             details.get('timezone') if details else None
         ]
-        return self.execute_query(query, tuple(params))
+        return self.execute_query(query, tuple(params), prepared=True)
         
+    def log_location_batch(self, samples):
+        """Grava localizações em lote: (timetrack_id, timestamp, lat, lon, details).
+
+        Localizações de sessões inexistentes são ignoradas (junção com
+        timetrack). Retorna o número de linhas gravadas, ou None em caso de erro.
+        """
+        if not samples:
+            return 0
+
+        rows = []
+        for timetrack_id, timestamp, lat, lon, details in samples:
+            details = details or {}
+            rows.append((timetrack_id, timestamp, lat, lon, details.get('city'),
+                         details.get('region'), details.get('country'), details.get('timezone')))
+        location_rows, params = _rows_table(rows, ('tt', 'ts', 'lat', 'lon', 'city', 'region', 'country', 'tz'))
+        query = f"""
+            INSERT INTO location_logs (
+                timetrack_id, timestamp, latitude, longitude,
+                city, region, country, timezone
+            )
+            SELECT s.tt, s.ts, s.lat, s.lon, s.city, s.region, s.country, s.tz
+            FROM ({location_rows}) s
+            JOIN timetrack t ON t.id = s.tt
+        """
+        # Como em log_activity_batch: só a gravação de uma amostra é preparada
+        return self.execute_transaction([(query, tuple(params))], returning='rowcount',
+                                        prepared=len(samples) == 1)
+
     def update_timetrack_location(self, timetrack_id, lat, lon):
         """Atualiza a localização de um registro de ponto específico"""
         query = """
@@ -627,8 +1949,13 @@ class Database:
         """
         return self.execute_query(query, (lat, lon, timetrack_id))
         
-    def get_location_history(self, user_id, start_date=None, end_date=None):
-        """Retorna o histórico de localizações de um usuário"""
+    def get_location_history(self, user_id, start_date=None, end_date=None, offset=None, limit=None,
+                             stream=False):
+        """Retorna o histórico de localizações de um usuário (opcionalmente paginado).
+
+        Com stream=True retorna um gerador de blocos de registros (stream_query),
+        para percorrer períodos longos sem carregar tudo em memória.
+        """
         base_query = """
             SELECT 
                 l.*,
@@ -650,9 +1977,85 @@ class Database:
             base_query += " AND l.timestamp <= %s"
             params.append(end_date)
             
-        base_query += " ORDER BY l.timestamp DESC"
+        base_query += " ORDER BY l.timestamp DESC, l.id DESC"
+        if limit:
+            base_query += " LIMIT %s OFFSET %s"
+            params += [limit, offset or 0]
+        if stream:
+            return self.stream_query(base_query, tuple(params))
         return self.execute_query(base_query, tuple(params))
         
+    # Tamanho mínimo de palavra indexada pelo FULLTEXT do InnoDB (innodb_ft_min_token_size)
+    FULLTEXT_MIN_TOKEN = int(os.getenv('DB_FULLTEXT_MIN_TOKEN', '3'))
+
+    def search_users(self, term, offset=0, limit=50, match='contains', role='colaborador',
+                     status=None, sort=None, descending=False):
+        """Busca usuários por nome, usuário ou e-mail.
+
+        match='prefix' compara o início de cada coluna (índices B-tree);
+        match='contains' também encontra palavras em qualquer posição do
+        texto, como sobrenomes ou o domínio do e-mail (índice FULLTEXT).
+        Sem sort, os resultados que começam com o termo vêm primeiro.
+        """
+        term = (term or '').strip()
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        prefix = "(u.full_name LIKE %s OR u.username LIKE %s OR u.email LIKE %s)"
+
+        conditions = ["u.role = %s"]
+        params = [role]
+        if status:
+            conditions.append("u.status = %s")
+            params.append(status)
+
+        words = [word for word in re.findall(r'\w+', term) if len(word) >= self.FULLTEXT_MIN_TOKEN]
+        if match == 'contains' and words:
+            conditions.append(f"({prefix} OR MATCH(u.full_name, u.username, u.email) AGAINST (%s IN BOOLEAN MODE))")
+            params += [escaped] * 3 + [' '.join(f"+{word}*" for word in words)]
+        elif term:
+            conditions.append(prefix)
+            params += [escaped] * 3
+
+        direction = "DESC" if descending else "ASC"
+        if sort in self.USER_SORT_COLUMNS:
+            order = f"{self.USER_SORT_COLUMNS[sort]} {direction}, u.id {direction}"
+        else:
+            order = "(u.full_name LIKE %s OR u.username LIKE %s) DESC, u.full_name, u.id"
+            params += [escaped] * 2
+
+        query = f"""
+            SELECT u.id, u.username, u.full_name, u.email, u.status, u.hourly_rate,
+                   u.location_tracking_consent, u.activity_tracking_consent
+            FROM users u
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {order}
+            LIMIT %s OFFSET %s
+        """
+        params += [limit, offset]
+        return self.execute_query(query, tuple(params))
+
+    def get_collaborators(self, offset=0, limit=50, sort='full_name', descending=False, status=None,
+                          search=None):
+        """Retorna uma página de colaboradores, com ordenação, filtro e busca no servidor"""
+        if search:
+            return self.search_users(search, offset=offset, limit=limit, status=status,
+                                     sort=sort, descending=descending)
+
+        order = self.USER_SORT_COLUMNS.get(sort, 'u.full_name')
+        direction = "DESC" if descending else "ASC"
+        query = """
+            SELECT u.id, u.username, u.full_name, u.email, u.status, u.hourly_rate,
+                   u.location_tracking_consent, u.activity_tracking_consent
+            FROM users u
+            WHERE u.role = 'colaborador'
+        """
+        params = []
+        if status:
+            query += " AND u.status = %s"
+            params.append(status)
+        query += f" ORDER BY {order} {direction}, u.id {direction} LIMIT %s OFFSET %s"
+        params += [limit, offset]
+        return self.execute_query(query, tuple(params))
+
     def update_user_consent(self, user_id, activity_consent=None, location_consent=None):
         """Atualiza as configurações de consentimento do usuário"""
         updates = []
@@ -689,28 +2092,144 @@ class Database:
         
     def get_project_detailed_stats(self, project_id, start_date=None, end_date=None):
         """Retorna estatísticas detalhadas do projeto incluindo custos e progresso."""
-        query = """
+        period_filter, period_params = "", []
+        if start_date and end_date:
+            period_filter = " AND t.date BETWEEN %s AND %s"
+            period_params = [start_date, end_date]
+            
+        # Tarefas vêm dos contadores; horas também, exceto quando há um período
+        if period_filter:
+            hours_columns = """
+                (SELECT COUNT(DISTINCT t.user_id) FROM timetrack t
+                 WHERE t.project_id = p.id{filter}) as total_users,
+                (SELECT SUM(t.total_hours) FROM timetrack t
+                 WHERE t.project_id = p.id{filter}) as total_hours,
+                (SELECT AVG(t.total_hours) FROM timetrack t
+                 WHERE t.project_id = p.id{filter}) as avg_daily_hours,
+            """.format(filter=period_filter)
+            params = period_params * 3
+        else:
+            hours_columns = """
+                p.total_users,
+                p.total_hours,
+                p.total_hours / NULLIF(p.total_entries, 0) as avg_daily_hours,
+            """
+            params = []
+            
+        query = f"""
             SELECT 
-                p.*,
-                COUNT(DISTINCT t.user_id) as total_users,
-                SUM(t.total_hours) as total_hours,
-                AVG(t.total_hours) as avg_daily_hours,
-                AVG(al.activity_level) as avg_activity,
-                COUNT(DISTINCT tsk.id) as total_tasks,
-                SUM(CASE WHEN tsk.status = 'completed' THEN 1 ELSE 0 END) as completed_tasks,
-                SUM(CASE WHEN tsk.status = 'in_progress' THEN 1 ELSE 0 END) as in_progress_tasks
+                p.id, p.name, p.description, p.hourly_rate, p.is_active, p.created_at,
+                {hours_columns}
+                (SELECT SUM(ah.activity_sum) / SUM(ah.activity_count)
+                 FROM activity_hourly ah
+                 JOIN timetrack t ON ah.timetrack_id = t.id
+                 WHERE t.project_id = p.id{period_filter}) as avg_activity,
+                p.pending_tasks + p.in_progress_tasks + p.completed_tasks as total_tasks,
+                p.completed_tasks,
+                p.in_progress_tasks
             FROM projects p
-            LEFT JOIN timetrack t ON p.id = t.project_id
-            LEFT JOIN activity_logs al ON t.id = al.timetrack_id
-            LEFT JOIN tasks tsk ON p.id = tsk.project_id
             WHERE p.id = %s
         """
-        params = [project_id]
+        params += period_params + [project_id]
         
-        if start_date and end_date:
-            query += " AND (t.date BETWEEN %s AND %s OR t.date IS NULL)"
-            params.extend([start_date, end_date])
-            
-        query += " GROUP BY p.id"
-        
-        return self.execute_query(query, tuple(params))
\ No newline at end of file
+        return self.execute_query(query, tuple(params))
+
+    # Métodos usados pelo agendador de tarefas (scheduler.py)
+    @contextmanager
+    def advisory_lock(self, name, timeout=0):
+        """Trava nomeada do MySQL (GET_LOCK) mantida enquanto o bloco executa.
+
+        Produz True se a trava foi obtida; False se outra instância a detém
+        (após ``timeout`` segundos) ou se não houver conexão.
+        """
+        connection = self._open_connection()
+        if connection is None:
+            yield False
+            return
+
+        # GET_LOCK vale para o servidor inteiro: o nome inclui o banco
+        lock_name = f"{self.database}:{name}"[:64]
+        cursor = connection.cursor()
+        acquired = False
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (lock_name, timeout))
+            acquired = cursor.fetchone()[0] == 1
+            yield acquired
+        finally:
+            if acquired:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (lock_name,))
+                cursor.fetchone()
+            cursor.close()
+            self._release_connection(connection)
+
+    def record_job_run(self, job_name, started_at, duration_ms, status, rows_affected=None, message=None):
+        """Registra uma execução de job no histórico"""
+        query = """
+            INSERT INTO job_runs (job_name, host, started_at, duration_ms, status, rows_affected, message)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        return self.execute_query(query, (
+            job_name, socket.gethostname(), started_at, int(duration_ms), status, rows_affected, message
+        ))
+
+    def get_job_runs(self, job_name=None, limit=50):
+        """Retorna as últimas execuções de jobs (opcionalmente de um job)"""
+        query = "SELECT * FROM job_runs"
+        params = []
+        if job_name:
+            query += " WHERE job_name = %s"
+            params.append(job_name)
+        query += " ORDER BY started_at DESC LIMIT %s"
+        params.append(limit)
+        return self.execute_query(query, tuple(params))
+
+    def _delete_in_batches(self, query, params, batch_size):
+        """Repete um DELETE ... LIMIT até não haver mais linhas (transações curtas)"""
+        total = 0
+        while True:
+            deleted = self.execute_update(f"{query} LIMIT {int(batch_size)}", params)
+            if deleted is None:
+                return None if total == 0 else total
+            total += deleted
+            if deleted < batch_size:
+                return total
+
+    def prune_activity_logs(self, retention_days, batch_size=5000):
+        """Remove leituras de atividade mais antigas que ``retention_days``.
+
+        O agregado activity_hourly é preservado; depois da poda,
+        rebuild_activity_rollup() só deve ser usado com timetrack_id.
+        """
+        before = datetime.now() - timedelta(days=retention_days)
+        return self._delete_in_batches(
+            "DELETE FROM activity_logs WHERE timestamp < %s", (before,), batch_size
+        )
+
+    def prune_location_logs(self, retention_days, batch_size=5000):
+        """Remove registros de localização mais antigos que ``retention_days``"""
+        before = datetime.now() - timedelta(days=retention_days)
+        return self._delete_in_batches(
+            "DELETE FROM location_logs WHERE timestamp < %s", (before,), batch_size
+        )
+
+    def prune_job_runs(self, retention_days, batch_size=5000):
+        """Remove o histórico de jobs mais antigo que ``retention_days``"""
+        before = datetime.now() - timedelta(days=retention_days)
+        return self._delete_in_batches(
+            "DELETE FROM job_runs WHERE started_at < %s", (before,), batch_size
+        )
+
+_database = None
+_database_lock = threading.Lock()
+
+def get_database():
+    """Retorna a instância de Database compartilhada pelas sessões do processo.
+
+    Cada sessão web roda em uma thread do mesmo worker; compartilhar a
+    instância mantém um único pool de conexões e uma única migração por processo.
+    """
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = Database(background=True)
+        return _database
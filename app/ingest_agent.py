@@ -0,0 +1,296 @@
+"""Agente de ingestão de telemetria (atividade e localização).
+
+Roda um por servidor ou filial. Os clientes enviam lotes compactos por HTTP
+(ver telemetry.HttpSink) em vez de abrir conexões com o banco; o agente
+agrega as amostras de todos os clientes por sessão e minuto (média do nível
+de atividade, última localização) e as grava a cada INGEST_FLUSH_SECONDS em
+poucas transações grandes. Só o agente precisa das credenciais do banco.
+
+Amostras malformadas (sessão, horário ou coordenadas fora da faixa) são
+descartadas já no recebimento. Se a gravação de um bloco falhar com o banco
+acessível, o bloco é gravado em partes menores e só as linhas que falham
+sozinhas são descartadas, para que uma amostra ruim não trave a ingestão;
+com o banco fora, as amostras continuam no buffer para a próxima tentativa
+(até INGEST_MAX_BUFFER minutos-sessão; as mais antigas são descartadas).
+Com INGEST_TOKEN definido, os clientes devem enviar
+``Authorization: Bearer <token>``.
+
+Endpoints:
+    POST /samples    {"a": [[timetrack_id, epoch, nível], ...],
+                      "l": [[timetrack_id, epoch, lat, lon, cidade, região, país, fuso], ...]}
+    GET  /health     estado do buffer
+
+Uso:
+    python ingest_agent.py --port 8765
+    python ingest_agent.py --host 0.0.0.0 --port 8765 --flush-seconds 60 --metrics-port 9101
+"""
+
+import argparse
+import hmac
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+from metrics import registry, start_metrics_server
+
+# Limite do corpo de um envio e de linhas por transação
+MAX_BODY_BYTES = 4 * 1024 * 1024
+WRITE_CHUNK = 2000
+
+# Faixas aceitas: ids INT, horários de 2000 até um dia à frente (relógios
+# adiantados) e tamanhos das colunas de location_logs
+MAX_TIMETRACK_ID = 2 ** 31 - 1
+MIN_EPOCH = 946684800
+MAX_CLOCK_SKEW = 86400
+DETAIL_LENGTHS = (('city', 100), ('region', 100), ('country', 100), ('timezone', 50))
+
+class IngestAgent:
+    """Agrega amostras por (sessão, minuto) e grava em lote."""
+
+    def __init__(self, db, flush_interval=60, max_buffer=200000):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._activity = {}
+        self._location = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.samples = registry.counter('ingest_samples_total', 'Amostras recebidas pelo agente por tipo')
+        self.dropped = registry.counter('ingest_dropped_total', 'Amostras descartadas (inválidas ou buffer cheio)')
+        self.written = registry.counter('ingest_rows_written_total', 'Linhas gravadas no banco por tipo')
+        self.flush_seconds = registry.histogram('ingest_flush_seconds', 'Duração das gravações em lote')
+
+    @staticmethod
+    def _minute(epoch):
+        return int(epoch) // 60 * 60
+
+    @staticmethod
+    def _valid(timetrack_id, epoch, now):
+        return 0 < timetrack_id <= MAX_TIMETRACK_ID and MIN_EPOCH <= epoch <= now + MAX_CLOCK_SKEW
+
+    @staticmethod
+    def _details(values):
+        """Cidade, região, país e fuso como texto, cortados ao tamanho das colunas."""
+        details = {}
+        for (name, length), value in zip(DETAIL_LENGTHS, values):
+            details[name] = None if value is None else str(value)[:length]
+        return details
+
+    def add(self, activity=(), location=()):
+        """Acumula um envio; retorna o número de amostras aceitas."""
+        accepted = 0
+        now = time.time()
+        with self._lock:
+            for sample in activity:
+                try:
+                    timetrack_id, epoch, level = int(sample[0]), float(sample[1]), int(sample[2])
+                except (TypeError, ValueError, IndexError, OverflowError):
+                    self.dropped.inc(kind='activity')
+                    continue
+                if not self._valid(timetrack_id, epoch, now):
+                    self.dropped.inc(kind='activity')
+                    continue
+                key = (timetrack_id, self._minute(epoch))
+                bucket = self._activity.get(key)
+                if bucket is None:
+                    if len(self._activity) >= self.max_buffer:
+                        self.dropped.inc(kind='activity')
+                        continue
+                    self._activity[key] = [max(0, min(100, level)), 1]
+                else:
+                    bucket[0] += max(0, min(100, level))
+                    bucket[1] += 1
+                accepted += 1
+            self.samples.inc(accepted, kind='activity')
+
+            located = 0
+            for sample in location:
+                try:
+                    timetrack_id, epoch = int(sample[0]), float(sample[1])
+                    lat, lon = float(sample[2]), float(sample[3])
+                    details = self._details(list(sample[4:8]))
+                except (TypeError, ValueError, IndexError):
+                    self.dropped.inc(kind='location')
+                    continue
+                # Comparações com NaN são falsas: coordenadas não numéricas também caem aqui
+                if not (self._valid(timetrack_id, epoch, now) and -90 <= lat <= 90 and -180 <= lon <= 180):
+                    self.dropped.inc(kind='location')
+                    continue
+                key = (timetrack_id, self._minute(epoch))
+                if key not in self._location and len(self._location) >= self.max_buffer:
+                    self.dropped.inc(kind='location')
+                    continue
+                # Uma localização por sessão e minuto: vale a mais recente
+                current = self._location.get(key)
+                if current is None or epoch >= current[0]:
+                    self._location[key] = (epoch, lat, lon, details)
+                located += 1
+            self.samples.inc(located, kind='location')
+        return accepted + located
+
+    def pending(self):
+        with self._lock:
+            return {'activity': len(self._activity), 'location': len(self._location)}
+
+    def flush(self):
+        """Grava o que está no buffer; devolve ao buffer o que falhar com o banco fora."""
+        with self._flush_lock:
+            with self._lock:
+                activity, self._activity = self._activity, {}
+                location, self._location = self._location, {}
+            if not activity and not location:
+                return 0
+
+            started = time.perf_counter()
+            written = self._write(
+                'activity', activity, self.db.log_activity_batch,
+                lambda item: (item[0][0], datetime.fromtimestamp(item[0][1]), round(item[1][0] / item[1][1]))
+            )
+            written += self._write(
+                'location', location, self.db.log_location_batch,
+                lambda item: (item[0][0], datetime.fromtimestamp(item[1][0]), *item[1][1:])
+            )
+            self.flush_seconds.observe(time.perf_counter() - started)
+            return written
+
+    def _write(self, kind, buffer, write, to_row):
+        """Grava um buffer em blocos, do minuto mais antigo ao mais recente."""
+        items = sorted(buffer.items(), key=lambda item: item[0][1])
+        written = 0
+        for start in range(0, len(items), WRITE_CHUNK):
+            chunk = items[start:start + WRITE_CHUNK]
+            result = write([to_row(item) for item in chunk])
+            if result is not None:
+                written += result
+                self.written.inc(result, kind=kind)
+                continue
+            if self.db.execute_query("SELECT 1") is None:
+                # Banco inacessível: tenta de novo no próximo ciclo
+                self._requeue(**{kind: dict(items[start:])})
+                break
+            written += self._write_split(kind, chunk, write, to_row)
+        return written
+
+    def _write_split(self, kind, chunk, write, to_row):
+        """Grava um bloco recusado em metades, descartando as linhas que falham sozinhas."""
+        if len(chunk) == 1:
+            print(f"Amostra de {kind} descartada (recusada pelo banco): {chunk[0]}")
+            self.dropped.inc(kind=kind)
+            return 0
+        written = 0
+        middle = len(chunk) // 2
+        for part in (chunk[:middle], chunk[middle:]):
+            result = write([to_row(item) for item in part])
+            if result is None:
+                written += self._write_split(kind, part, write, to_row)
+            else:
+                written += result
+                self.written.inc(result, kind=kind)
+        return written
+
+    def _requeue(self, activity=None, location=None):
+        """Devolve amostras não gravadas, mesclando com as recebidas nesse meio-tempo."""
+        with self._lock:
+            for key, (total, count) in (activity or {}).items():
+                bucket = self._activity.setdefault(key, [0, 0])
+                bucket[0] += total
+                bucket[1] += count
+            for key, value in (location or {}).items():
+                current = self._location.get(key)
+                if current is None or value[0] > current[0]:
+                    self._location[key] = value
+            # Buffer cheio: descarta os minutos mais antigos
+            for buffer, kind in ((self._activity, 'activity'), (self._location, 'location')):
+                excess = len(buffer) - self.max_buffer
+                if excess > 0:
+                    for key in sorted(buffer, key=lambda key: key[1])[:excess]:
+                        del buffer[key]
+                    self.dropped.inc(excess, kind=kind)
+
+    def run_forever(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+        # Grava o que restou antes de sair
+        self.flush()
+
+    def stop(self, *_args):
+        self.stop_event.set()
+
+def make_handler(agent, token=None):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/health':
+                self.send_error(404)
+                return
+            self._reply(200, {'status': 'ok', 'pending': agent.pending()})
+
+        def do_POST(self):
+            if self.path != '/samples':
+                self.send_error(404)
+                return
+            if token:
+                supplied = self.headers.get('Authorization', '')
+                if not hmac.compare_digest(supplied, f"Bearer {token}"):
+                    self._reply(401, {'error': 'não autorizado'})
+                    return
+            length = int(self.headers.get('Content-Length') or 0)
+            if length <= 0 or length > MAX_BODY_BYTES:
+                self._reply(413 if length > 0 else 400, {'error': 'corpo inválido'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(length))
+                accepted = agent.add(payload.get('a') or (), payload.get('l') or ())
+            except (ValueError, AttributeError):
+                self._reply(400, {'error': 'JSON inválido'})
+                return
+            self._reply(200, {'accepted': accepted})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.getenv('INGEST_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('INGEST_PORT', '8765')))
+    parser.add_argument('--flush-seconds', type=float, default=float(os.getenv('INGEST_FLUSH_SECONDS', '60')))
+    parser.add_argument('--max-buffer', type=int, default=int(os.getenv('INGEST_MAX_BUFFER', '200000')))
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('METRICS_PORT', '0')))
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from db import Database
+
+    agent = IngestAgent(Database(), flush_interval=args.flush_seconds, max_buffer=args.max_buffer)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(agent, os.getenv('INGEST_TOKEN')))
+    threading.Thread(target=server.serve_forever, daemon=True, name='ingest-http').start()
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+
+    signal.signal(signal.SIGINT, agent.stop)
+    signal.signal(signal.SIGTERM, agent.stop)
+    print(f"Agente de ingestão em http://{args.host}:{args.port} (gravação a cada {args.flush_seconds:.0f} s)")
+    agent.run_forever()
+    server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
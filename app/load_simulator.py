@@ -0,0 +1,329 @@
+"""Simulador de carga de batidas de ponto ("punch storm").
+
+Simula centenas de clientes simultâneos, em threads ou processos, executando
+um turno comprimido no tempo: check-in, leituras de atividade, localização,
+pausa e check-out. As chegadas seguem o padrão de início de turno (a maioria
+dos colaboradores bate o ponto em poucos minutos).
+
+Ao final reporta vazão, latências p50/p95/p99 por operação, taxa de erros e
+o número de conexões observadas no servidor MySQL.
+
+Uso:
+    python load_simulator.py --clients 300 --mode process --workers 4 --ramp-seconds 30
+
+Os colaboradores de carga ("load_user_N") são criados se não existirem; por
+segurança o nome do banco precisa conter "bench" ou "load".
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+OPERATIONS = (
+    'check_in_user', 'update_activity_level', 'log_location',
+    'start_break', 'end_break', 'check_out_user'
+)
+
+def arrival_offsets(clients, ramp_seconds, pattern, rnd):
+    """Instantes de chegada (segundos desde o início) de cada cliente."""
+    if pattern == 'uniform':
+        offsets = [rnd.uniform(0, ramp_seconds) for _ in range(clients)]
+    else:
+        # Início de turno: pico no meio da janela, com cauda de atrasados
+        offsets = [min(ramp_seconds, max(0.0, rnd.gauss(ramp_seconds / 2, ramp_seconds / 6)))
+                   for _ in range(clients)]
+    return sorted(offsets)
+
+def percentile(values, pct):
+    """Percentil por posição mais próxima (values já ordenado)."""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+class ShiftClient:
+    """Um colaborador simulado executando um turno comprimido."""
+
+    def __init__(self, db, user_id, project_id, config, rnd):
+        self.db = db
+        self.user_id = user_id
+        self.project_id = project_id
+        self.config = config
+        self.random = rnd
+        self.samples = []
+
+    def _call(self, operation, *args):
+        started = time.perf_counter()
+        try:
+            result = getattr(self.db, operation)(*args)
+            # Os métodos do Database retornam None (ou False) quando há erro
+            ok = result is not None and result is not False
+        except Exception:
+            result, ok = None, False
+        self.samples.append((operation, started, (time.perf_counter() - started) * 1000, ok))
+        return result
+
+    def _sleep(self, seconds):
+        time.sleep(max(0.0, self.random.uniform(0.5, 1.5) * seconds))
+
+    def run(self):
+        config = self.config
+        timetrack_id = self._call('check_in_user', self.user_id, self.project_id)
+        if not timetrack_id:
+            return self.samples
+
+        if config['location']:
+            self._call('log_location', timetrack_id, -23.55, -46.63, {'city': 'São Paulo'})
+
+        shift_end = time.monotonic() + config['shift_seconds']
+        break_at = time.monotonic() + config['shift_seconds'] * self.random.uniform(0.3, 0.6)
+        on_break = None
+
+        while time.monotonic() < shift_end:
+            self._sleep(config['activity_every'])
+            if on_break is None and time.monotonic() >= break_at:
+                on_break = self._call('start_break', timetrack_id, 'lunch')
+                self._sleep(config['break_seconds'])
+                if on_break:
+                    self._call('end_break', on_break)
+                continue
+            self._call('update_activity_level', timetrack_id, self.random.randint(0, 100))
+
+        if config['location']:
+            self._call('log_location', timetrack_id, -23.55, -46.63, {'city': 'São Paulo'})
+        self._call('check_out_user', timetrack_id)
+        return self.samples
+
+def run_clients(config, specs, started_at):
+    """Executa um grupo de clientes em threads; usado direto ou em cada processo.
+
+    specs: lista de (user_id, project_id, arrival_offset, seed).
+    Retorna as amostras (operação, instante relativo, latência em ms, ok).
+    """
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ['DB_NAME'] = config['db_name']
+    from db import Database
+
+    db = Database()
+
+    def client(spec):
+        user_id, project_id, offset, seed = spec
+        time.sleep(max(0.0, started_at + offset - time.time()))
+        samples = ShiftClient(db, user_id, project_id, config, random.Random(seed)).run()
+        # Converte perf_counter em segundos relativos ao início do teste
+        base = time.time() - time.perf_counter()
+        return [(op, base + t - started_at, ms, ok) for op, t, ms, ok in samples]
+
+    samples = []
+    with ThreadPoolExecutor(max_workers=max(1, len(specs))) as pool:
+        for client_samples in pool.map(client, specs):
+            samples.extend(client_samples)
+    return samples
+
+class ServerSampler(threading.Thread):
+    """Amostra periodicamente as conexões abertas no servidor."""
+
+    def __init__(self, db, interval=1.0):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_threads_connected = 0
+        self.series = []
+        self._stop_event = threading.Event()
+        # Conexão dedicada, para não inflar a contagem abrindo uma por amostra
+        self.connection = db._open_connection()
+        self._lock = threading.Lock()
+
+    def status(self, *names):
+        """Lê variáveis de SHOW GLOBAL STATUS (funciona em MySQL e MariaDB)."""
+        if self.connection is None:
+            return {}
+        placeholders = ', '.join(['%s'] * len(names))
+        with self._lock:
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(f"SHOW GLOBAL STATUS WHERE Variable_name IN ({placeholders})", names)
+                return {name.lower(): int(value) for name, value in cursor.fetchall()}
+            except Exception as e:
+                print(f"Erro ao ler status do servidor: {e}")
+                return {}
+            finally:
+                cursor.close()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            connected = self.status('Threads_connected').get('threads_connected')
+            if connected is not None:
+                self.series.append(connected)
+                self.peak_threads_connected = max(self.peak_threads_connected, connected)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        if self.connection is not None:
+            self.connection.close()
+
+def prepare_users(db, clients):
+    """Garante a existência dos colaboradores de carga e retorna seus ids."""
+    import bcrypt
+    password = bcrypt.hashpw(b"load123", bcrypt.gensalt(rounds=4)).decode('utf-8')
+    db.execute_many(
+        "INSERT IGNORE INTO users (username, password, full_name, role, activity_tracking_consent, "
+        "location_tracking_consent) VALUES (%s, %s, %s, 'colaborador', TRUE, TRUE)",
+        [(f"load_user_{i}", password, f"Carga {i:05d}") for i in range(clients)]
+    )
+    rows = db.execute_query(
+        "SELECT id FROM users WHERE username LIKE 'load_user_%%' ORDER BY id LIMIT %s", (clients,)
+    )
+    return [row['id'] for row in rows or []]
+
+def summarize(samples, elapsed, server_before, server_after, sampler):
+    by_operation = {}
+    for operation, _offset, ms, ok in samples:
+        item = by_operation.setdefault(operation, {'latencies': [], 'errors': 0})
+        item['latencies'].append(ms)
+        if not ok:
+            item['errors'] += 1
+
+    operations = {}
+    for operation in OPERATIONS:
+        item = by_operation.get(operation)
+        if not item:
+            continue
+        latencies = sorted(item['latencies'])
+        operations[operation] = {
+            'count': len(latencies),
+            'errors': item['errors'],
+            'error_rate': round(item['errors'] / len(latencies), 4),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(latencies[-1], 2),
+        }
+
+    total = len(samples)
+    errors = sum(1 for sample in samples if not sample[3])
+    # Vazão no pico: maior número de operações em uma janela de 1 segundo
+    per_second = {}
+    for _operation, offset, _ms, _ok in samples:
+        per_second[int(offset)] = per_second.get(int(offset), 0) + 1
+
+    return {
+        'total_operations': total,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else None,
+        'elapsed_seconds': round(elapsed, 2),
+        'throughput_ops': round(total / elapsed, 2) if elapsed else None,
+        'peak_ops_per_second': max(per_second.values()) if per_second else 0,
+        'operations': operations,
+        'server': {
+            'peak_threads_connected': sampler.peak_threads_connected,
+            'max_used_connections': server_after.get('max_used_connections'),
+            'connections_opened': (server_after.get('connections', 0) - server_before.get('connections', 0)),
+            'aborted_connects': (server_after.get('aborted_connects', 0) - server_before.get('aborted_connects', 0)),
+        },
+    }
+
+def print_report(report):
+    print(f"\nOperações: {report['total_operations']} em {report['elapsed_seconds']}s "
+          f"({report['throughput_ops']} ops/s, pico {report['peak_ops_per_second']} ops/s)")
+    print(f"Erros: {report['errors']} ({report['error_rate']:.2%})" if report['error_rate'] is not None else "Erros: -")
+    print(f"\n{'operação':<24}{'qtd':>8}{'erros':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'máx':>10}")
+    for operation, item in report['operations'].items():
+        print(f"{operation:<24}{item['count']:>8}{item['errors']:>8}{item['p50_ms']:>10}"
+              f"{item['p95_ms']:>10}{item['p99_ms']:>10}{item['max_ms']:>10}")
+    server = report['server']
+    print(f"\nConexões: pico Threads_connected={server['peak_threads_connected']}, "
+          f"Max_used_connections={server['max_used_connections']}, "
+          f"abertas={server['connections_opened']}, Aborted_connects={server['aborted_connects']}")
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--mode', choices=('thread', 'process'), default='thread')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help="processos no modo 'process'")
+    parser.add_argument('--arrival', choices=('shift-start', 'uniform'), default='shift-start')
+    parser.add_argument('--ramp-seconds', type=float, default=30, help="janela de chegada dos clientes")
+    parser.add_argument('--shift-seconds', type=float, default=60, help="duração do turno simulado")
+    parser.add_argument('--activity-every', type=float, default=5, help="segundos entre leituras de atividade")
+    parser.add_argument('--break-seconds', type=float, default=5)
+    parser.add_argument('--no-location', dest='location', action='store_false')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db-name', default='timetrack_bench')
+    parser.add_argument('--output', help="grava o relatório em JSON")
+    args = parser.parse_args(argv)
+
+    if 'bench' not in args.db_name and 'load' not in args.db_name:
+        parser.error("--db-name precisa conter 'bench' ou 'load'")
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ['DB_NAME'] = args.db_name
+    from db import Database
+
+    db = Database()
+    user_ids = prepare_users(db, args.clients)
+    projects = db.get_active_projects() or []
+    if len(user_ids) < args.clients or not projects:
+        print("Não foi possível preparar usuários/projetos de carga.")
+        return 1
+
+    rnd = random.Random(args.seed)
+    offsets = arrival_offsets(args.clients, args.ramp_seconds, args.arrival, rnd)
+    specs = [
+        (user_id, rnd.choice(projects)['id'], offset, args.seed + index)
+        for index, (user_id, offset) in enumerate(zip(user_ids, offsets))
+    ]
+    config = {
+        'db_name': args.db_name,
+        'shift_seconds': args.shift_seconds,
+        'activity_every': args.activity_every,
+        'break_seconds': args.break_seconds,
+        'location': args.location,
+    }
+
+    sampler = ServerSampler(db)
+    server_before = sampler.status('Connections', 'Aborted_connects')
+    sampler.start()
+
+    # Margem para os processos inicializarem antes da primeira chegada
+    started_at = time.time() + (3 if args.mode == 'process' else 0.5)
+    print(f"Simulando {args.clients} clientes ({args.mode}), chegada '{args.arrival}' em {args.ramp_seconds}s...")
+
+    samples = []
+    if args.mode == 'thread':
+        samples = run_clients(config, specs, started_at)
+    else:
+        groups = [specs[i::args.workers] for i in range(args.workers) if specs[i::args.workers]]
+        with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+            for group_samples in pool.map(run_clients, [config] * len(groups), groups,
+                                          [started_at] * len(groups)):
+                samples.extend(group_samples)
+
+    elapsed = time.time() - started_at
+    server_after = sampler.status('Max_used_connections', 'Connections', 'Aborted_connects')
+    sampler.stop()
+
+    report = summarize(samples, elapsed, server_before, server_after, sampler)
+    report.update({
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': {**config, 'clients': args.clients, 'mode': args.mode,
+                   'workers': args.workers, 'arrival': args.arrival, 'ramp_seconds': args.ramp_seconds},
+    })
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+        print(f"Relatório gravado em {args.output}")
+    return 1 if report['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
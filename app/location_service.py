@@ -1,4 +1,3 @@
-import requests
 import threading
 from datetime import datetime
 
@@ -13,6 +12,8 @@ class GeolocationService:
         Obtém a localização atual do usuário usando o IP Geolocation API.
         Retorna um tuple (latitude, longitude) ou None em caso de erro.
         """
+        import requests  # importado sob demanda para não atrasar a abertura do app
+
         try:
             # Usando ip-api.com (gratuito, sem necessidade de chave API)
             response = requests.get('http://ip-api.com/json/', timeout=5)
@@ -40,6 +41,8 @@ class GeolocationService:
         Obtém detalhes de uma localização específica.
         Retorna um dicionário com informações como cidade, estado, país, etc.
         """
+        import requests
+
         try:
             response = requests.get(
                 f'http://ip-api.com/json/{lat},{lon}',
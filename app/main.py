@@ -1,16 +1,39 @@
 import flet as ft
+import importlib
 import os
+import threading
 from dotenv import load_dotenv
-from db import Database
+
+# Carrega o .env antes dos módulos que leem configurações ao serem importados
+load_dotenv()
+
+from db import get_database
 from auth import AuthManager
+from metrics import start_metrics_server
+from profiling import install_flet_hooks
 from ui_login import LoginScreen
-from ui_dashboard import DashboardScreen
 
-load_dotenv()
+SESSION_STORAGE_KEY = "timetrack.session_token"
+
+# Módulos das telas pós-login (plotly, pandas etc.), carregados em segundo
+# plano enquanto a tela de login está aberta
+PREFETCH_MODULES = ("ui_dashboard", "components.reports_ui")
+
+def prefetch_modules():
+    def run():
+        for name in PREFETCH_MODULES:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"Erro ao pré-carregar {name}: {e}")
+
+    threading.Thread(target=run, name='prefetch-modules', daemon=True).start()
 
 class TimeTrackApp:
     def __init__(self):
-        self.db = Database()
+        # A criação/migração do banco roda em segundo plano; as consultas aguardam.
+        # As sessões do mesmo processo (versão web) compartilham a instância e o pool
+        self.db = get_database()
         self.auth = AuthManager(self.db)
         self.current_user = None
         self.dark_mode = True
@@ -32,8 +55,14 @@ class TimeTrackApp:
             use_material3=True
         )
         
-        # Iniciar com tela de login
-        self.show_login()
+        # Restaura a sessão salva no cliente, se houver; senão inicia com tela de login
+        token = page.client_storage.get(SESSION_STORAGE_KEY)
+        user = self.auth.restore_session(token) if token else None
+        if user:
+            self.show_dashboard(user)
+        else:
+            self.show_login()
+            prefetch_modules()
         
     def show_login(self):
         login_screen = LoginScreen(self.auth, self.on_login_success, self.toggle_theme)
@@ -42,12 +71,18 @@ class TimeTrackApp:
         self.page.update()
         
     def on_login_success(self, user):
+        self.page.client_storage.set(SESSION_STORAGE_KEY, self.auth.issue_session_token(user))
+        self.show_dashboard(user)
+        
+    def show_dashboard(self, user):
+        from ui_dashboard import DashboardScreen
+        
         self.current_user = user
         dashboard = DashboardScreen(
             user=user, 
             db=self.db, 
             auth=self.auth,
-            on_logout=self.show_login,
+            on_logout=self.logout,
             toggle_theme=self.toggle_theme,
             dark_mode=self.dark_mode
         )
@@ -55,6 +90,15 @@ class TimeTrackApp:
         self.page.add(dashboard.build(self.page))
         self.page.update()
         
+    def logout(self):
+        token = self.page.client_storage.get(SESSION_STORAGE_KEY)
+        if token:
+            self.auth.revoke_session(token)
+            self.page.client_storage.remove(SESSION_STORAGE_KEY)
+        self.auth.logout()
+        self.current_user = None
+        self.show_login()
+        
     def toggle_theme(self):
         self.dark_mode = not self.dark_mode
         self.page.theme_mode = ft.ThemeMode.DARK if self.dark_mode else ft.ThemeMode.LIGHT
@@ -65,4 +109,9 @@ def main(page: ft.Page):
     app.main(page)
 
 if __name__ == "__main__":
+    # Expõe /metrics (Prometheus) e /metrics.json quando METRICS_PORT estiver definido
+    if os.getenv('METRICS_PORT'):
+        start_metrics_server(int(os.getenv('METRICS_PORT')))
+    # Perfil de renderização das telas quando UI_PROFILE estiver definido
+    install_flet_hooks()
     ft.app(target=main)
\ No newline at end of file
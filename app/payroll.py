@@ -0,0 +1,134 @@
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+class PayrollEngine:
+    """Calcula folha de pagamento e faturamento a partir de timetrack e breaks.
+
+    Todo o cálculo é feito em uma única consulta agregada no MySQL, sem
+    iterar registro a registro no cliente. Regras aplicadas:
+
+    - Apenas registros finalizados (check_out preenchido) entram no cálculo.
+    - As pausas finalizadas são descontadas das horas de cada registro.
+    - Registros manuais pendentes de aprovação são reportados em
+      ``pending_hours`` e só geram valores com ``include_pending=True``.
+    - Folha (``payroll_amount``) usa a taxa do colaborador e, na falta
+      dela, a do projeto. Faturamento (``billing_amount``) usa a taxa do
+      projeto e, na falta dela, a do colaborador.
+    """
+
+    PERIODS = {
+        'day': "DATE_FORMAT(t.date, '%Y-%m-%d')",
+        'week': "DATE_FORMAT(t.date, '%x-W%v')",
+        'month': "DATE_FORMAT(t.date, '%Y-%m')",
+    }
+
+    def __init__(self, db):
+        self.db = db
+
+    def compute(self, start_date, end_date, period='month', user_id=None,
+                project_id=None, include_pending=False):
+        """Retorna as linhas por período, colaborador e projeto."""
+        if period not in self.PERIODS:
+            raise ValueError(f"Período inválido: {period}")
+
+        # Converte datetime para date se necessário
+        if hasattr(start_date, 'date'):
+            start_date = start_date.date()
+        if hasattr(end_date, 'date'):
+            end_date = end_date.date()
+
+        net_hours = "GREATEST(t.total_hours - COALESCE(b.break_minutes, 0) / 60, 0)"
+        payable = "TRUE" if include_pending else "(t.manual_entry = FALSE OR t.approved_by IS NOT NULL)"
+
+        query = f"""
+            SELECT
+                {self.PERIODS[period]} as period,
+                t.user_id,
+                u.full_name,
+                t.project_id,
+                p.name as project_name,
+                COUNT(*) as entries,
+                SUM(t.total_hours) as gross_hours,
+                SUM(COALESCE(b.break_minutes, 0)) / 60 as break_hours,
+                SUM({net_hours}) as net_hours,
+                SUM(CASE WHEN t.manual_entry = TRUE AND t.approved_by IS NULL
+                         THEN {net_hours} ELSE 0 END) as pending_hours,
+                COALESCE(u.hourly_rate, p.hourly_rate, 0) as pay_rate,
+                COALESCE(p.hourly_rate, u.hourly_rate, 0) as bill_rate,
+                ROUND(SUM(CASE WHEN {payable}
+                               THEN {net_hours} * COALESCE(u.hourly_rate, p.hourly_rate, 0)
+                               ELSE 0 END), 2) as payroll_amount,
+                ROUND(SUM(CASE WHEN {payable}
+                               THEN {net_hours} * COALESCE(p.hourly_rate, u.hourly_rate, 0)
+                               ELSE 0 END), 2) as billing_amount
+            FROM timetrack t
+            JOIN users u ON t.user_id = u.id
+            LEFT JOIN projects p ON t.project_id = p.id
+            LEFT JOIN (
+                SELECT b.timetrack_id, SUM(b.total_minutes) as break_minutes
+                FROM breaks b
+                JOIN timetrack tb ON b.timetrack_id = tb.id
+                WHERE tb.date BETWEEN %s AND %s
+                AND b.end_time IS NOT NULL
+                GROUP BY b.timetrack_id
+            ) b ON t.id = b.timetrack_id
+            WHERE t.date BETWEEN %s AND %s
+            AND t.check_out IS NOT NULL
+            AND t.total_hours IS NOT NULL
+        """
+        params = [start_date, end_date, start_date, end_date]
+
+        if user_id:
+            query += " AND t.user_id = %s"
+            params.append(user_id)
+
+        if project_id:
+            query += " AND t.project_id = %s"
+            params.append(project_id)
+
+        query += """
+            GROUP BY period, t.user_id, u.full_name, u.hourly_rate,
+                     t.project_id, p.name, p.hourly_rate
+            ORDER BY period, u.full_name, t.user_id, p.name, t.project_id
+        """
+
+        data = self.db.execute_query(query, tuple(params))
+        return data if data else []
+
+    def summarize(self, lines, key='user_id'):
+        """Totaliza as linhas por colaborador ('user_id') ou projeto ('project_id')."""
+        label = 'full_name' if key == 'user_id' else 'project_name'
+        fields = ('net_hours', 'pending_hours', 'payroll_amount', 'billing_amount')
+        totals = {}
+
+        for line in lines:
+            item = totals.setdefault(line[key], {
+                key: line[key],
+                label: line[label],
+                **{field: Decimal('0') for field in fields}
+            })
+            for field in fields:
+                item[field] += Decimal(line[field] or 0)
+
+        cents = Decimal('0.01')
+        for item in totals.values():
+            item['payroll_amount'] = item['payroll_amount'].quantize(cents, ROUND_HALF_UP)
+            item['billing_amount'] = item['billing_amount'].quantize(cents, ROUND_HALF_UP)
+
+        return list(totals.values())
+
+    def close_month(self, year, month, include_pending=False):
+        """Fechamento mensal: linhas detalhadas e totais por colaborador e projeto."""
+        start_date = date(year, month, 1)
+        next_month = (start_date + timedelta(days=32)).replace(day=1)
+        end_date = next_month - timedelta(days=1)
+
+        lines = self.compute(start_date, end_date, period='month', include_pending=include_pending)
+        return {
+            'period': start_date.strftime('%Y-%m'),
+            'start_date': start_date,
+            'end_date': end_date,
+            'lines': lines,
+            'by_user': self.summarize(lines, 'user_id'),
+            'by_project': self.summarize(lines, 'project_id'),
+        }
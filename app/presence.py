@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+
+from state_store import get_state_store
+
+# Chave do contador de versão da presença no armazenamento compartilhado
+VERSION_KEY = 'presence:version'
+
+class PresenceRegistry:
+    """Registro em memória do status dos colaboradores ("quem está online").
+
+    É atualizado pelos eventos de check-in, check-out e pausa e envia apenas
+    as linhas alteradas para as sessões inscritas (painéis de administração).
+    Uma reconciliação periódica com o banco corrige eventos perdidos, como
+    clientes que caíram. Com vários workers, cada alteração incrementa uma
+    versão no armazenamento compartilhado; os outros processos a consultam a
+    cada poucos segundos e reconciliam quando ela muda.
+    """
+
+    def __init__(self, db, reconcile_interval=None, store=None, poll_interval=None):
+        self.db = db
+        self.reconcile_interval = reconcile_interval or int(os.getenv('PRESENCE_RECONCILE_SECONDS', '60'))
+        self.store = store or get_state_store(db)
+        self.poll_interval = poll_interval or float(os.getenv('PRESENCE_POLL_SECONDS', '3'))
+        self._version = None
+        self._last_reconcile = time.monotonic()
+        self._status = {}
+        self._subscribers = []
+        self._loaded = False
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def snapshot(self):
+        """Retorna o status atual de todos os colaboradores, ordenado por nome."""
+        with self._lock:
+            if not self._loaded:
+                self._apply(self.db.get_all_users_status() or [])
+                self._loaded = True
+            return sorted(self._status.values(), key=lambda row: row['full_name'] or '')
+
+    def online_count(self):
+        """Retorna quantos colaboradores estão com o ponto aberto."""
+        return sum(1 for row in self.snapshot() if row.get('check_in') and not row.get('check_out'))
+
+    def subscribe(self, callback):
+        """Inscreve um callback que recebe a lista de linhas alteradas.
+
+        Retorna uma função que cancela a inscrição.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+            self._schedule_reconcile()
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+                if not self._subscribers and self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+
+        return unsubscribe
+
+    def set_status(self, user, timetrack=None, is_on_break=False):
+        """Atualiza o status de um colaborador a partir do seu registro de ponto atual."""
+        if user.get('role') != 'colaborador':
+            return
+
+        row = {
+            'id': user['id'],
+            'username': user['username'],
+            'full_name': user['full_name'],
+            'timetrack_id': timetrack['id'] if timetrack else None,
+            'check_in': timetrack['check_in'] if timetrack else None,
+            'check_out': timetrack['check_out'] if timetrack else None,
+            'total_hours': timetrack.get('total_hours') if timetrack else None,
+            'project_name': timetrack.get('project_name') if timetrack else None,
+            'is_on_break': bool(is_on_break)
+        }
+
+        with self._lock:
+            if not self._loaded:
+                self.snapshot()
+            changes = self._apply([row])
+
+        if changes and self.store.shared:
+            # Avisa os outros workers; a própria versão não dispara reconciliação aqui
+            version = self.store.incr(VERSION_KEY)
+            with self._lock:
+                if self._version is not None and version == self._version + 1:
+                    self._version = version
+        self._publish(changes)
+
+    def reconcile(self):
+        """Recarrega o status do banco e publica apenas as diferenças."""
+        rows = self.db.get_all_users_status()
+        if rows is None:
+            return
+
+        with self._lock:
+            self._last_reconcile = time.monotonic()
+            current_ids = {row['id'] for row in rows}
+            removed = [
+                {**self._status.pop(user_id), 'removed': True}
+                for user_id in list(self._status)
+                if user_id not in current_ids
+            ]
+            changes = self._apply(rows) + removed
+            self._loaded = True
+
+        self._publish(changes)
+
+    def _apply(self, rows):
+        """Mescla as linhas no registro e retorna as que mudaram."""
+        changes = []
+        for row in rows:
+            row = {**row, 'is_on_break': bool(row.get('is_on_break'))}
+            if self._status.get(row['id']) != row:
+                self._status[row['id']] = row
+                changes.append(row)
+        return changes
+
+    def _publish(self, changes):
+        if not changes:
+            return
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(changes)
+            except Exception as e:
+                # Sessão encerrada ou com erro: remove a inscrição
+                print(f"Erro ao notificar status de presença: {e}")
+                with self._lock:
+                    if callback in self._subscribers:
+                        self._subscribers.remove(callback)
+
+    def _schedule_reconcile(self):
+        if self._timer or not self._subscribers:
+            return
+
+        def run():
+            with self._lock:
+                self._timer = None
+            try:
+                if self._should_reconcile():
+                    self.reconcile()
+            except Exception as e:
+                print(f"Erro na reconciliação de presença: {e}")
+            with self._lock:
+                self._schedule_reconcile()
+
+        interval = self.poll_interval if self.store.shared else self.reconcile_interval
+        self._timer = threading.Timer(interval, run)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _should_reconcile(self):
+        """Reconcilia no intervalo completo ou quando outro worker alterou a presença."""
+        if not self.store.shared or time.monotonic() - self._last_reconcile >= self.reconcile_interval:
+            return True
+        version = self.store.get(VERSION_KEY)
+        with self._lock:
+            changed = self._version is not None and version != self._version
+            self._version = version
+        return changed
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_presence_registry(db):
+    """Retorna o registro de presença compartilhado pelo processo."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PresenceRegistry(db)
+        return _registry
@@ -0,0 +1,195 @@
+"""Perfil de renderização das telas Flet (opcional).
+
+Ativado com ``UI_PROFILE=<arquivo.json>``. Cada tela decorada com
+``@profiled`` vira um intervalo no trace, com as consultas ao banco
+("fetch") e os envios ao cliente ("update") aninhados. O tempo restante do
+intervalo é construção de controles em Python ("build").
+
+O arquivo segue o formato Chrome Trace Event e pode ser aberto em
+chrome://tracing, https://ui.perfetto.dev ou https://www.speedscope.app.
+Com o perfil desativado os decoradores devolvem a função original.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+TRACE_PATH = os.getenv('UI_PROFILE')
+ENABLED = bool(TRACE_PATH)
+MAX_EVENTS = int(os.getenv('UI_PROFILE_MAX_EVENTS', '200000'))
+
+class Profiler:
+    def __init__(self, path, max_events=MAX_EVENTS):
+        self.path = path
+        self.max_events = max_events
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self.events = []
+        self.summary = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _emit(self, name, category, start, duration, args):
+        event = {
+            'name': name, 'cat': category, 'ph': 'X',
+            'ts': round((start - self.origin) * 1e6, 1),
+            'dur': round(duration * 1e6, 1),
+            'pid': self.pid, 'tid': threading.get_ident(),
+            'args': args,
+        }
+        with self._lock:
+            if len(self.events) < self.max_events:
+                self.events.append(event)
+
+    def _propagate(self, category, duration, controls=0):
+        """Soma o tempo de fetch/update nas telas abertas desta thread."""
+        for span in self._stack():
+            if span['cat'] == 'screen':
+                span['totals'][category] += duration
+                span['totals']['controls'] += controls
+                if category == 'update':
+                    span['totals']['updates'] += 1
+
+    def span(self, name, category='screen'):
+        return _Span(self, name, category)
+
+    def annotate(self, **args):
+        """Acrescenta argumentos ao intervalo aberto mais interno."""
+        stack = self._stack()
+        if stack:
+            stack[-1]['args'].update(args)
+
+    def record(self, category, name, start, duration, **args):
+        """Registra um intervalo já medido (ex.: uma consulta ao banco)."""
+        self._emit(name, category, start, duration, args)
+        self._propagate(category, duration)
+
+    def _close_screen(self, name, totals, duration):
+        build = max(0.0, duration - totals['fetch'] - totals['update'])
+        with self._lock:
+            item = self.summary.setdefault(name, {
+                'calls': 0, 'total_ms': 0.0, 'fetch_ms': 0.0, 'build_ms': 0.0,
+                'update_ms': 0.0, 'updates': 0, 'controls': 0
+            })
+            item['calls'] += 1
+            item['total_ms'] += duration * 1000
+            item['fetch_ms'] += totals['fetch'] * 1000
+            item['build_ms'] += build * 1000
+            item['update_ms'] += totals['update'] * 1000
+            item['updates'] += totals['updates']
+            item['controls'] += totals['controls']
+        return {
+            'fetch_ms': round(totals['fetch'] * 1000, 3),
+            'build_ms': round(build * 1000, 3),
+            'update_ms': round(totals['update'] * 1000, 3),
+            'updates': totals['updates'],
+            'controls_sent': totals['controls'],
+        }
+
+    def write(self):
+        with self._lock:
+            events = list(self.events)
+            summary = {name: {key: round(value, 3) if isinstance(value, float) else value
+                              for key, value in item.items()}
+                       for name, item in self.summary.items()}
+        with open(self.path, 'w', encoding='utf-8') as output:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                       'otherData': {'summary': summary}}, output)
+        return summary
+
+class _Span:
+    def __init__(self, profiler, name, category):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        self.frame = {
+            'cat': self.category, 'args': {},
+            'totals': {'fetch': 0.0, 'update': 0.0, 'updates': 0, 'controls': 0},
+        }
+        self.profiler._stack().append(self.frame)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        profiler = self.profiler
+        profiler._stack().pop()
+        args = self.frame['args']
+        if self.category == 'screen':
+            args.update(profiler._close_screen(self.name, self.frame['totals'], duration))
+        else:
+            profiler._propagate(self.category, duration, args.get('controls_sent', 0))
+        if exc_type:
+            args['error'] = exc_type.__name__
+        profiler._emit(self.name, self.category, self.start, duration, args)
+        return False
+
+profiler = Profiler(TRACE_PATH) if ENABLED else None
+
+def profiled(name):
+    """Decorador que mede uma construção/atualização de tela."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiler.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def install_flet_hooks():
+    """Mede cada envio de atualização ao cliente e conta os controles enviados."""
+    if not ENABLED:
+        return
+
+    import flet as ft
+
+    prepare_update = getattr(ft.Page, '_Page__prepare_update', None)
+    send_update = getattr(ft.Page, '_Page__update', None)
+    if prepare_update is None or send_update is None:
+        print("Aviso: versão do Flet sem os ganchos esperados; envios não serão medidos.")
+        return
+
+    @functools.wraps(prepare_update)
+    def counting_prepare_update(self, *controls):
+        commands, added_controls, removed_controls = prepare_update(self, *controls)
+        profiler.annotate(
+            commands=len(commands),
+            controls_sent=len(added_controls) + len(commands),
+            controls_added=len(added_controls),
+            controls_removed=len(removed_controls),
+        )
+        return commands, added_controls, removed_controls
+
+    @functools.wraps(send_update)
+    def timed_update(self, *controls):
+        target = type(controls[0]).__name__ if controls else 'Page'
+        with profiler.span(f"update {target}", 'update'):
+            return send_update(self, *controls)
+
+    ft.Page._Page__prepare_update = counting_prepare_update
+    ft.Page._Page__update = timed_update
+
+    def write_trace():
+        summary = profiler.write()
+        print(f"Perfil de UI gravado em {profiler.path}")
+        for name, item in sorted(summary.items(), key=lambda kv: -kv[1]['total_ms']):
+            print(f"  {name}: {item['calls']}x, total {item['total_ms']:.1f} ms "
+                  f"(fetch {item['fetch_ms']:.1f}, build {item['build_ms']:.1f}, "
+                  f"update {item['update_ms']:.1f}; {item['updates']} envios, "
+                  f"{item['controls']} controles)")
+
+    atexit.register(write_trace)
@@ -1,14 +1,21 @@
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import datetime, timedelta, time
 
 class ReportGenerator:
     def __init__(self, db):
         self.db = db
 
-    def generate_productivity_report(self, user_id=None, project_id=None, start_date=None, end_date=None):
-        """Gera relatório detalhado de produtividade."""
+    def generate_productivity_report(self, user_id=None, project_id=None, start_date=None, end_date=None,
+                                     stream=False):
+        """Gera relatório detalhado de produtividade.
+
+        Com stream=True retorna um gerador de blocos de registros, lidos do
+        banco conforme a iteração (exportação de períodos longos).
+        """
         if not start_date:
             start_date = datetime.now() - timedelta(days=30)
         if not end_date:
@@ -50,7 +57,9 @@ class ReportGenerator:
 
         query += " GROUP BY t.date, u.full_name, p.name ORDER BY t.date"
 
-        data = self.db.execute_query(query, tuple(params))
+        if stream:
+            return self.db.stream_query(query, tuple(params))
+        data = self.db.fetch_records(query, tuple(params))
         return data if data else []
 
     def generate_activity_heatmap(self, user_id, start_date=None, end_date=None):
@@ -60,20 +69,159 @@ class ReportGenerator:
         if not end_date:
             end_date = datetime.now()
 
+        # Lê do agregado horário (activity_hourly), mantido a cada registro de atividade
         query = """
             SELECT 
-                DATE(al.timestamp) as date,
-                HOUR(al.timestamp) as hour,
-                AVG(al.activity_level) as activity_level
-            FROM activity_logs al
-            JOIN timetrack t ON al.timetrack_id = t.id
-            WHERE t.user_id = %s
-            AND al.timestamp BETWEEN %s AND %s
-            GROUP BY DATE(al.timestamp), HOUR(al.timestamp)
-            ORDER BY date, hour
+                DATE(ah.hour_bucket) as date,
+                HOUR(ah.hour_bucket) as hour,
+                SUM(ah.activity_sum) / SUM(ah.activity_count) as activity_level
+            FROM activity_hourly ah
+            WHERE ah.user_id = %s
+            AND ah.hour_bucket BETWEEN %s AND %s
+            GROUP BY ah.hour_bucket
+            ORDER BY ah.hour_bucket
         """
         
-        data = self.db.execute_query(query, (user_id, start_date, end_date))
+        data = self.db.fetch_records(query, (user_id, start_date, end_date))
+        return data if data else []
+
+    def _team_filters(self, user_ids, project_id, user_column, project_column):
+        """Monta os filtros de equipe (lista de usuários e/ou projeto)."""
+        clauses = []
+        params = []
+
+        if user_ids:
+            placeholders = ', '.join(['%s'] * len(user_ids))
+            clauses.append(f" AND {user_column} IN ({placeholders})")
+            params.extend(user_ids)
+
+        if project_id:
+            clauses.append(f" AND {project_column} = %s")
+            params.append(project_id)
+
+        return ''.join(clauses), params
+
+    def generate_team_heatmap(self, user_ids=None, project_id=None, start_date=None, end_date=None):
+        """Gera o heatmap de atividade de vários usuários em uma única consulta.
+
+        A equipe é definida por uma lista de usuários e/ou pelo projeto em que
+        trabalharam. Retorna um dicionário com ``users``, ``dates``, ``hours``
+        e ``values``, um array numpy (usuário × dia × hora) com NaN onde não
+        há leituras.
+        """
+        if not start_date:
+            start_date = datetime.now() - timedelta(days=7)
+        if not end_date:
+            end_date = datetime.now()
+
+        # Datas sem horário cobrem o dia inteiro
+        if not isinstance(start_date, datetime):
+            start_date = datetime.combine(start_date, time.min)
+        if not isinstance(end_date, datetime):
+            end_date = datetime.combine(end_date, time.max)
+
+        filters, filter_params = self._team_filters(user_ids, project_id, 'ah.user_id', 't.project_id')
+        query = f"""
+            SELECT 
+                ah.user_id,
+                u.full_name,
+                DATE(ah.hour_bucket) as date,
+                HOUR(ah.hour_bucket) as hour,
+                SUM(ah.activity_sum) / SUM(ah.activity_count) as activity_level
+            FROM activity_hourly ah
+            JOIN users u ON ah.user_id = u.id
+            {'JOIN timetrack t ON ah.timetrack_id = t.id' if project_id else ''}
+            WHERE ah.hour_bucket BETWEEN %s AND %s
+            {filters}
+            GROUP BY ah.user_id, u.full_name, ah.hour_bucket
+            ORDER BY u.full_name, ah.user_id, ah.hour_bucket
+        """
+
+        data = self.db.fetch_records(query, (start_date, end_date, *filter_params)) or []
+
+        dates = pd.date_range(start_date.date(), end_date.date(), freq='D')
+        hours = list(range(24))
+
+        if not data:
+            return {'users': [], 'dates': list(dates.date), 'hours': hours,
+                    'values': np.full((0, len(dates), 24), np.nan)}
+
+        df = pd.DataFrame(data)
+        users = df[['user_id', 'full_name']].drop_duplicates('user_id')
+        user_index = pd.Index(users['user_id'])
+
+        values = np.full((len(users), len(dates), 24), np.nan)
+        values[
+            user_index.get_indexer(df['user_id']),
+            dates.get_indexer(pd.to_datetime(df['date'])),
+            df['hour'].to_numpy(dtype=int)
+        ] = df['activity_level'].astype(float).to_numpy()
+
+        return {
+            'users': users.to_dict('records'),
+            'dates': list(dates.date),
+            'hours': hours,
+            'values': values
+        }
+
+    def generate_team_productivity(self, user_ids=None, project_id=None, start_date=None, end_date=None):
+        """Gera o resumo de produtividade de todos os membros da equipe em uma única consulta."""
+        if not start_date:
+            start_date = datetime.now() - timedelta(days=30)
+        if not end_date:
+            end_date = datetime.now()
+
+        # Converte datetime para date se necessário
+        if hasattr(start_date, 'date'):
+            start_date = start_date.date()
+        if hasattr(end_date, 'date'):
+            end_date = end_date.date()
+
+        filters, filter_params = self._team_filters(user_ids, project_id, 'u.id', 't.project_id')
+        # A média de atividade considera apenas as sessões do projeto filtrado
+        activity_filter, activity_params = self._team_filters(None, project_id, None, 'ta.project_id')
+        activity_join = "JOIN timetrack ta ON ta.id = ah.timetrack_id" if activity_filter else ""
+        query = f"""
+            SELECT 
+                u.id as user_id,
+                u.full_name,
+                COUNT(DISTINCT t.date) as days_present,
+                SUM(t.total_hours) as total_hours,
+                SUM(COALESCE(b.break_minutes, 0)) / 60 as total_break_hours,
+                SUM(t.total_hours) - SUM(COALESCE(b.break_minutes, 0)) / 60 as effective_hours,
+                COUNT(DISTINCT CASE WHEN t.manual_entry = 1 THEN t.id END) as manual_entries,
+                a.avg_activity
+            FROM users u
+            JOIN timetrack t ON u.id = t.user_id
+            LEFT JOIN (
+                SELECT b.timetrack_id, SUM(b.total_minutes) as break_minutes
+                FROM breaks b
+                JOIN timetrack tb ON b.timetrack_id = tb.id
+                WHERE tb.date BETWEEN %s AND %s
+                GROUP BY b.timetrack_id
+            ) b ON t.id = b.timetrack_id
+            LEFT JOIN (
+                SELECT ah.user_id, SUM(ah.activity_sum) / SUM(ah.activity_count) as avg_activity
+                FROM activity_hourly ah
+                {activity_join}
+                WHERE ah.hour_bucket BETWEEN %s AND %s
+                {activity_filter}
+                GROUP BY ah.user_id
+            ) a ON u.id = a.user_id
+            WHERE t.date BETWEEN %s AND %s
+            {filters}
+            GROUP BY u.id, u.full_name, a.avg_activity
+            ORDER BY u.full_name
+        """
+        params = (
+            start_date, end_date,
+            datetime.combine(start_date, time.min), datetime.combine(end_date, time.max),
+            *activity_params,
+            start_date, end_date,
+            *filter_params
+        )
+
+        data = self.db.fetch_records(query, params)
         return data if data else []
 
     def generate_project_summary(self, project_id, start_date=None, end_date=None):
@@ -108,16 +256,15 @@ class ReportGenerator:
             GROUP BY p.id, p.name, p.description
         """
         
-        project_data = self.db.execute_query(query, (project_id, start_date, end_date))
-        
+        project_data = self.db.fetch_records(query, (project_id, start_date, end_date))
+        if not project_data:
+            return None
+
         # Obtém detalhes de custos e faturamento
-        if project_data and len(project_data) > 0:
-            total_hours = float(project_data[0]['total_hours'] or 0)
-            hourly_rate = self.db.get_project_hourly_rate(project_id)
-            
-            project_data[0]['estimated_cost'] = total_hours * hourly_rate if hourly_rate else 0
-            
-        return project_data[0] if project_data else None
+        summary = project_data[0]._asdict()
+        hourly_rate = self.db.get_project_hourly_rate(project_id)
+        summary['estimated_cost'] = (summary['total_hours'] or 0) * hourly_rate if hourly_rate else 0
+        return summary
 
     def generate_presence_summary(self, start_date=None, end_date=None):
         """Gera um resumo de presença dos usuários."""
@@ -150,7 +297,7 @@ class ReportGenerator:
             ORDER BY u.full_name
         """
         
-        return self.db.execute_query(query, (start_date, end_date))
+        return self.db.fetch_records(query, (start_date, end_date))
 
     def plot_activity_heatmap(self, data):
         """Cria um heatmap de atividade usando Plotly."""
@@ -178,6 +325,44 @@ class ReportGenerator:
         
         return fig.to_html(include_plotlyjs=True, full_html=False)
 
+    def plot_team_heatmap(self, heatmap, cols=3):
+        """Cria heatmaps de atividade da equipe em pequenos múltiplos (um por usuário)."""
+        if not heatmap or not heatmap['users']:
+            return None
+
+        users = heatmap['users']
+        rows = (len(users) + cols - 1) // cols
+        dates = [d.strftime('%Y-%m-%d') for d in heatmap['dates']]
+
+        fig = make_subplots(
+            rows=rows,
+            cols=cols,
+            subplot_titles=[u['full_name'] for u in users],
+            shared_xaxes=True,
+            vertical_spacing=min(0.08, 1 / max(rows, 1) / 2)
+        )
+
+        for index, _user in enumerate(users):
+            fig.add_trace(
+                go.Heatmap(
+                    z=heatmap['values'][index],
+                    x=heatmap['hours'],
+                    y=dates,
+                    coloraxis='coloraxis',
+                    hoverongaps=False
+                ),
+                row=index // cols + 1,
+                col=index % cols + 1
+            )
+
+        fig.update_layout(
+            title='Heatmap de Atividade da Equipe',
+            coloraxis=dict(colorscale='Viridis', cmin=0, cmax=100),
+            height=max(300, 250 * rows)
+        )
+
+        return fig.to_html(include_plotlyjs=True, full_html=False)
+
     def plot_productivity_trends(self, data):
         """Cria gráficos de tendências de produtividade."""
         if not data:
@@ -0,0 +1,203 @@
+"""Agendador de jobs periódicos de manutenção (processo separado do cliente).
+
+Executa os jobs registrados em intervalos com variação aleatória (jitter),
+para que várias instâncias não disparem ao mesmo tempo. Cada execução obtém
+uma trava nomeada no MySQL (GET_LOCK): se outra instância já está rodando o
+mesmo job, esta apenas pula a vez. Toda execução fica registrada na tabela
+``job_runs`` com duração, linhas afetadas e erro, se houver.
+
+Jobs padrão: encerramento de sessões e pausas esquecidas abertas, poda de
+telemetria antiga (activity_logs, location_logs), poda do próprio histórico,
+limpeza do estado compartilhado expirado (STATE_STORE) e reconciliação dos
+contadores de tarefas/projetos. Retenções configuráveis por
+ACTIVITY_LOG_RETENTION_DAYS, LOCATION_LOG_RETENTION_DAYS e
+JOB_RUN_RETENTION_DAYS (0 desativa a poda); SESSION_STALE_HOURS define após
+quanto tempo sem atividade uma sessão aberta é encerrada.
+
+Uso:
+    python scheduler.py                      # roda continuamente
+    python scheduler.py --once               # executa todos os jobs uma vez e sai
+    python scheduler.py --job reconcile_counters --once
+    python scheduler.py --list               # jobs e últimas execuções
+"""
+
+import argparse
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from metrics import registry, start_metrics_server
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+class Job:
+    """Um job periódico: ``func(db)`` retorna o número de linhas afetadas (ou None)."""
+
+    def __init__(self, name, interval, func, jitter=0.1, run_on_start=False):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.jitter = jitter
+        self.run_on_start = run_on_start
+        self.next_run = None
+
+    def schedule_next(self, now, rnd, first=False):
+        if first and self.run_on_start:
+            delay = rnd.uniform(0, self.interval * self.jitter)
+        else:
+            delay = self.interval * (1 + rnd.uniform(-self.jitter, self.jitter))
+        self.next_run = now + delay
+
+class Scheduler:
+    def __init__(self, db, jobs, seed=None):
+        self.db = db
+        self.jobs = {job.name: job for job in jobs}
+        self.random = random.Random(seed)
+        self.stop_event = threading.Event()
+        self.job_seconds = registry.histogram('scheduler_job_seconds', 'Duração das execuções de jobs')
+        self.job_runs = registry.counter('scheduler_job_runs_total', 'Execuções de jobs por resultado')
+
+    def run_job(self, job):
+        """Executa um job sob a trava do banco; retorna o status registrado."""
+        with self.db.advisory_lock(f"job:{job.name}") as acquired:
+            if not acquired:
+                print(f"[{job.name}] em execução em outra instância; ignorado")
+                self.job_runs.inc(job=job.name, status='locked')
+                return 'locked'
+
+            started_at = datetime.now()
+            started = time.perf_counter()
+            rows, status, message = None, 'success', None
+            try:
+                rows = job.func(self.db)
+            except Exception as e:
+                status, message = 'error', f"{type(e).__name__}: {e}"
+            duration = time.perf_counter() - started
+
+        self.job_seconds.observe(duration, job=job.name)
+        self.job_runs.inc(job=job.name, status=status)
+        self.db.record_job_run(job.name, started_at, duration * 1000, status,
+                               rows if isinstance(rows, int) else None, message)
+        print(f"[{job.name}] {status} em {duration * 1000:.0f} ms"
+              + (f" ({rows} linhas)" if isinstance(rows, int) else "")
+              + (f": {message}" if message else ""))
+        return status
+
+    def run_once(self, names=None):
+        for name in names or self.jobs:
+            self.run_job(self.jobs[name])
+
+    def run_forever(self):
+        now = time.monotonic()
+        for job in self.jobs.values():
+            job.schedule_next(now, self.random, first=True)
+
+        while not self.stop_event.is_set():
+            job = min(self.jobs.values(), key=lambda j: j.next_run)
+            wait = job.next_run - time.monotonic()
+            if wait > 0 and self.stop_event.wait(wait):
+                break
+            self.run_job(job)
+            job.schedule_next(time.monotonic(), self.random)
+
+    def stop(self, *_args):
+        self.stop_event.set()
+
+def _retention(variable, default):
+    return int(os.getenv(variable, str(default)))
+
+def close_stale_sessions(db):
+    """Encerra sessões sem atividade recente e pausas órfãs."""
+    sessions = db.close_stale_sessions(stale_hours=float(os.getenv('SESSION_STALE_HOURS', '12')))
+    breaks = db.close_orphan_breaks()
+    if sessions is None or breaks is None:
+        raise RuntimeError("falha ao encerrar sessões/pausas abertas")
+    return sessions + breaks
+
+def prune_activity_logs(db):
+    days = _retention('ACTIVITY_LOG_RETENTION_DAYS', 90)
+    return db.prune_activity_logs(days) if days > 0 else 0
+
+def prune_location_logs(db):
+    days = _retention('LOCATION_LOG_RETENTION_DAYS', 365)
+    return db.prune_location_logs(days) if days > 0 else 0
+
+def prune_job_runs(db):
+    days = _retention('JOB_RUN_RETENTION_DAYS', 30)
+    return db.prune_job_runs(days) if days > 0 else 0
+
+def purge_shared_state(db):
+    """Remove do estado compartilhado as chaves expiradas (revogações de sessão)."""
+    from state_store import get_state_store
+    return get_state_store(db).purge_expired()
+
+def reconcile_counters(db):
+    """Recalcula os contadores dos projetos com divergência."""
+    drift = db.check_counters()
+    if drift is None:
+        raise RuntimeError("falha ao verificar os contadores")
+    if drift:
+        # Contadores de tarefa são recalculados junto com os do seu projeto
+        project_ids = {item['project_id'] for item in drift}
+        if not db.rebuild_counters(project_ids):
+            raise RuntimeError("falha ao recalcular os contadores")
+    return len(drift)
+
+DEFAULT_JOBS = (
+    Job('close_stale_sessions', 15 * MINUTE, close_stale_sessions, run_on_start=True),
+    Job('prune_activity_logs', DAY, prune_activity_logs),
+    Job('prune_location_logs', DAY, prune_location_logs),
+    Job('prune_job_runs', DAY, prune_job_runs),
+    Job('purge_shared_state', HOUR, purge_shared_state),
+    Job('reconcile_counters', HOUR, reconcile_counters, run_on_start=True),
+)
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--job', action='append', help="executa apenas este job (pode repetir)")
+    parser.add_argument('--once', action='store_true', help="executa os jobs uma vez e sai")
+    parser.add_argument('--list', action='store_true', help="lista os jobs e as últimas execuções")
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('METRICS_PORT', '0')))
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from db import Database
+
+    jobs = [job for job in DEFAULT_JOBS if not args.job or job.name in args.job]
+    unknown = set(args.job or ()) - {job.name for job in jobs}
+    if unknown:
+        parser.error(f"jobs desconhecidos: {', '.join(sorted(unknown))}")
+
+    db = Database()
+    if args.list:
+        for job in jobs:
+            last = db.get_job_runs(job.name, limit=1)
+            status = (f"último: {last[0]['started_at']} {last[0]['status']} ({last[0]['duration_ms']} ms)"
+                      if last else "nunca executado")
+            print(f"{job.name:<24} a cada {job.interval // MINUTE} min  {status}")
+        return 0
+
+    scheduler = Scheduler(db, jobs)
+    if args.once:
+        scheduler.run_once()
+        return 0
+
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    print(f"Agendador iniciado com {len(jobs)} jobs")
+    scheduler.run_forever()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
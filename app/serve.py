@@ -0,0 +1,70 @@
+"""Servidor web com vários workers (todos os núcleos de cada servidor).
+
+Cada worker é um processo uvicorn com a aplicação Flet exportada como ASGI;
+o socket é aberto uma vez e compartilhado, e o sistema distribui as conexões
+entre os workers. Não é preciso afinidade de sessão (sticky sessions): uma
+sessão Flet vive na conexão WebSocket do navegador e, se ela cair e voltar
+por outro worker (ou outro servidor atrás do balanceador), a sessão é
+restaurada pelo token salvo no cliente e o status do ponto é relido do banco.
+
+Para isso todos os workers precisam de:
+    SESSION_SECRET   o mesmo segredo, para validar tokens emitidos por outro worker
+    STATE_STORE      revogações de sessão, versões de presença e tentativas de
+                     login compartilhadas
+                     (padrão aqui: SQLite local; use 'mysql' com vários servidores)
+    DB_POOL_SIZE     conexões abertas por worker (padrão 5)
+
+A criação/migração do banco roda uma vez, no processo principal, antes de
+iniciar os workers.
+
+Uso:
+    python serve.py --workers 4 --port 8550
+    STATE_STORE=mysql python serve.py --host 0.0.0.0 --port 8000 --workers 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from dotenv import load_dotenv
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def create_app():
+    """Aplicação ASGI do Flet, criada em cada worker."""
+    import flet as ft
+    import main
+
+    return ft.app(target=main.main, export_asgi_app=True)
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.getenv('WEB_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('WEB_PORT', '8550')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_WORKERS', str(os.cpu_count() or 1))))
+    args = parser.parse_args(argv)
+
+    if not os.getenv('SESSION_SECRET'):
+        parser.error("defina SESSION_SECRET: cada worker geraria um segredo próprio")
+    if args.workers > 1 and os.getenv('STATE_STORE', 'memory') == 'memory':
+        os.environ['STATE_STORE'] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'timetrack_state.db')}"
+        print(f"STATE_STORE não definido; usando {os.environ['STATE_STORE']}")
+
+    sys.path.insert(0, APP_DIR)
+    from db import Database
+
+    # Migração única; os workers herdam DB_SKIP_BOOTSTRAP pelo ambiente
+    Database()
+    os.environ['DB_SKIP_BOOTSTRAP'] = '1'
+
+    import uvicorn
+
+    print(f"Servindo em http://{args.host}:{args.port} com {args.workers} workers")
+    uvicorn.run('serve:create_app', factory=True, app_dir=APP_DIR,
+                host=args.host, port=args.port, workers=args.workers)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
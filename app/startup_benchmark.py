@@ -0,0 +1,114 @@
+"""Benchmark de inicialização do cliente (cold start).
+
+Cada repetição roda em um processo Python novo e mede, até a tela de login:
+importação de main, construção do TimeTrackApp e montagem do LoginScreen.
+Também mede a importação dos módulos adiados (dashboard e relatórios), que
+hoje acontece em segundo plano ou ao abrir a tela correspondente.
+
+Uso:
+    python startup_benchmark.py --repeat 10 --output startup.jsonl
+    python startup_benchmark.py --importtime   # maiores custos de importação
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Executado em um processo novo; imprime os tempos em JSON na última linha
+PROBE = r"""
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.TimeTrackApp()
+constructed = time.perf_counter()
+from ui_login import LoginScreen
+LoginScreen(app.auth, lambda user: None, lambda: None).build()
+login_ready = time.perf_counter()
+deferred = {}
+for name in main.PREFETCH_MODULES:
+    begin = time.perf_counter()
+    try:
+        __import__(name)
+    except Exception as e:
+        deferred[name] = f"{type(e).__name__}: {e}"
+        continue
+    deferred[name] = round((time.perf_counter() - begin) * 1000, 3)
+db_ready_begin = time.perf_counter()
+app.db.wait_ready(30)
+print(json.dumps({
+    'import_main_ms': round((imported - started) * 1000, 3),
+    'app_init_ms': round((constructed - imported) * 1000, 3),
+    'login_build_ms': round((login_ready - constructed) * 1000, 3),
+    'time_to_login_ms': round((login_ready - started) * 1000, 3),
+    'db_bootstrap_remaining_ms': round((time.perf_counter() - db_ready_begin) * 1000, 3),
+    'deferred_imports_ms': deferred,
+}))
+"""
+
+def run_probe(python, extra_args=()):
+    result = subprocess.run(
+        [python, *extra_args, '-c', PROBE], cwd=APP_DIR,
+        capture_output=True, text=True, timeout=120
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'falha')
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def top_imports(stderr, limit):
+    """Extrai os módulos de maior custo cumulativo da saída de -X importtime."""
+    costs = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        if not name.startswith(' '):
+            costs.append((int(cumulative_us), name.strip()))
+    return sorted(costs, reverse=True)[:limit]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--python', default=sys.executable)
+    parser.add_argument('--importtime', action='store_true', help="lista as importações mais caras")
+    parser.add_argument('--output', help="acrescenta o resultado em JSON Lines")
+    args = parser.parse_args(argv)
+
+    runs = []
+    for _ in range(args.repeat):
+        sample, _stderr = run_probe(args.python)
+        runs.append(sample)
+
+    keys = ('import_main_ms', 'app_init_ms', 'login_build_ms', 'time_to_login_ms', 'db_bootstrap_remaining_ms')
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'runs': len(runs),
+        **{key: round(statistics.median(run[key] for run in runs), 3) for key in keys},
+        'deferred_imports_ms': runs[-1]['deferred_imports_ms'],
+    }
+
+    for key in keys:
+        print(f"{key:<28}{record[key]:>10.1f} ms (mediana)")
+    for name, value in record['deferred_imports_ms'].items():
+        print(f"{'adiado: ' + name:<28}{value if isinstance(value, str) else f'{value:>10.1f} ms'}")
+
+    if args.importtime:
+        _sample, stderr = run_probe(args.python, ('-X', 'importtime'))
+        print("\nImportações de primeiro nível mais caras (cumulativo):")
+        for cumulative_us, name in top_imports(stderr, 15):
+            print(f"  {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    if args.output:
+        with open(args.output, 'a', encoding='utf-8') as output:
+            output.write(json.dumps(record) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Estado compartilhado entre processos (revogações de sessão, versões de presença,
+tentativas de login).
+
+Com vários workers servindo a aplicação web, o que antes vivia na memória de
+um processo precisa ser visto por todos. O armazenamento é escolhido por
+STATE_STORE:
+
+    memory (padrão)           dicionário do processo; um único processo (desktop)
+    sqlite:///caminho.db      arquivo SQLite local, para vários workers na mesma máquina
+    mysql                     tabela shared_state no banco da aplicação (vários servidores)
+
+Os valores são gravados como JSON e podem ter validade (ttl em segundos).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class MemoryStateStore:
+    """Armazenamento em memória do processo (não compartilhado)."""
+
+    shared = False
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, ttl=None):
+        """Incrementa um contador e retorna o novo valor.
+
+        Com ttl, um contador novo (ou já expirado) recomeça em 1 e vale por
+        ttl segundos; os incrementos seguintes não prorrogam a validade.
+        """
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or (item[1] is not None and item[1] < now):
+                item = (0, now + ttl if ttl else None)
+            value = item[0] + 1
+            self._data[key] = (value, item[1])
+            return value
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_value, expires_at) in self._data.items()
+                       if expires_at is not None and expires_at < now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+class SQLiteStateStore:
+    """Armazenamento em um arquivo SQLite compartilhado pelos processos da máquina."""
+
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS shared_state (
+                    state_key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL
+                )
+            """)
+
+    def _connection(self):
+        """Conexão própria da thread (e do processo: não atravessa um fork)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM shared_state WHERE state_key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO shared_state (state_key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM shared_state WHERE state_key = ?", (key,))
+
+    def incr(self, key, ttl=None):
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            # No SQLite as expressões do UPDATE veem os valores antigos da linha
+            connection.execute("""
+                INSERT INTO shared_state (state_key, value, expires_at) VALUES (?, '1', ?)
+                ON CONFLICT(state_key) DO UPDATE SET
+                    value = CASE WHEN expires_at < ? THEN 1 ELSE CAST(value AS INTEGER) + 1 END,
+                    expires_at = CASE WHEN expires_at < ? THEN excluded.expires_at ELSE expires_at END
+            """, (key, now + ttl if ttl else None, now, now))
+            row = connection.execute("SELECT value FROM shared_state WHERE state_key = ?", (key,)).fetchone()
+        return int(row[0])
+
+    def purge_expired(self):
+        cursor = self._connection().execute(
+            "DELETE FROM shared_state WHERE expires_at < ?", (time.time(),))
+        return cursor.rowcount
+
+class MySQLStateStore:
+    """Armazenamento na tabela shared_state do banco da aplicação."""
+
+    shared = True
+
+    def __init__(self, db):
+        self.db = db
+
+    def get(self, key):
+        rows = self.db.execute_query(
+            "SELECT value FROM shared_state WHERE state_key = %s AND (expires_at IS NULL OR expires_at >= NOW())",
+            (key,)
+        )
+        return json.loads(rows[0]['value']) if rows else None
+
+    def set(self, key, value, ttl=None):
+        self.db.execute_update("""
+            INSERT INTO shared_state (state_key, value, expires_at)
+            VALUES (%s, %s, IF(%s IS NULL, NULL, NOW() + INTERVAL %s SECOND))
+            ON DUPLICATE KEY UPDATE value = VALUES(value), expires_at = VALUES(expires_at)
+        """, (key, json.dumps(value), ttl, ttl))
+
+    def delete(self, key):
+        self.db.execute_update("DELETE FROM shared_state WHERE state_key = %s", (key,))
+
+    def incr(self, key, ttl=None):
+        # Com LAST_INSERT_ID(expr) o novo valor volta como lastrowid do próprio INSERT.
+        # No MySQL as atribuições do UPDATE são avaliadas em ordem: value antes de
+        # expires_at, para que ambas comparem a validade antiga
+        return self.db.execute_query("""
+            INSERT INTO shared_state (state_key, value, expires_at)
+            VALUES (%s, LAST_INSERT_ID(1), IF(%s IS NULL, NULL, NOW() + INTERVAL %s SECOND))
+            ON DUPLICATE KEY UPDATE
+                value = LAST_INSERT_ID(IF(expires_at < NOW(), 1, CAST(value AS UNSIGNED) + 1)),
+                expires_at = IF(expires_at < NOW(), VALUES(expires_at), expires_at)
+        """, (key, ttl, ttl))
+
+    def purge_expired(self):
+        return self.db.execute_update("DELETE FROM shared_state WHERE expires_at < NOW()")
+
+_store = None
+_store_lock = threading.Lock()
+
+def create_state_store(url, db=None):
+    """Cria o armazenamento descrito por ``url`` (ver STATE_STORE)."""
+    url = (url or 'memory').strip()
+    if url == 'memory':
+        return MemoryStateStore()
+    if url.startswith('sqlite:'):
+        # sqlite:///relativo.db ou sqlite:////caminho/absoluto.db
+        path = url[len('sqlite:'):]
+        return SQLiteStateStore(path[3:] if path.startswith('///') else path)
+    if url == 'mysql':
+        if db is None:
+            raise ValueError("STATE_STORE=mysql requer a instância do banco")
+        return MySQLStateStore(db)
+    raise ValueError(f"STATE_STORE inválido: {url!r}")
+
+def get_state_store(db=None):
+    """Retorna o armazenamento compartilhado configurado para o processo."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_state_store(os.getenv('STATE_STORE'), db)
+        return _store
@@ -0,0 +1,115 @@
+"""Envio da telemetria do cliente (atividade e localização).
+
+Com INGEST_URL definido, as amostras vão para o agente de ingestão do
+servidor ou da filial (ingest_agent.py) por HTTP, em lotes compactos, e o
+cliente não precisa de conexão com o banco para a telemetria. Sem INGEST_URL
+elas são gravadas diretamente no banco, como em uma instalação única.
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import deque
+from datetime import datetime
+
+INGEST_URL = os.getenv('INGEST_URL')
+INGEST_TOKEN = os.getenv('INGEST_TOKEN')
+# Intervalo de envio do cliente e limite de amostras guardadas se o agente estiver fora
+INGEST_CLIENT_FLUSH_SECONDS = float(os.getenv('INGEST_CLIENT_FLUSH_SECONDS', '30'))
+INGEST_CLIENT_MAX_BUFFER = int(os.getenv('INGEST_CLIENT_MAX_BUFFER', '5000'))
+
+class DirectSink:
+    """Grava cada amostra diretamente no banco."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def send_activity(self, timetrack_id, activity_level, timestamp=None):
+        self.db.log_activity_batch([(timetrack_id, timestamp or datetime.now(), activity_level)])
+
+    def send_location(self, timetrack_id, lat, lon, details=None, timestamp=None):
+        self.db.log_location_batch([(timetrack_id, timestamp or datetime.now(), lat, lon, details)])
+
+    def flush(self):
+        pass
+
+class HttpSink:
+    """Acumula amostras e as envia em lote ao agente de ingestão.
+
+    Formato do corpo (JSON): ``{"a": [[timetrack_id, epoch, nível], ...],
+    "l": [[timetrack_id, epoch, lat, lon, cidade, região, país, fuso], ...]}``.
+    Se o agente estiver inacessível, as amostras ficam no buffer (até
+    INGEST_CLIENT_MAX_BUFFER, descartando as mais antigas) para o próximo envio.
+    """
+
+    def __init__(self, url, token=None, flush_interval=None, max_buffer=None, timeout=5):
+        self.url = url.rstrip('/') + '/samples'
+        self.token = token
+        self.flush_interval = flush_interval or INGEST_CLIENT_FLUSH_SECONDS
+        self.timeout = timeout
+        max_buffer = max_buffer or INGEST_CLIENT_MAX_BUFFER
+        self._activity = deque(maxlen=max_buffer)
+        self._location = deque(maxlen=max_buffer)
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='telemetry-sink', daemon=True)
+        self._thread.start()
+
+    def send_activity(self, timetrack_id, activity_level, timestamp=None):
+        moment = timestamp.timestamp() if timestamp else time.time()
+        with self._lock:
+            self._activity.append([timetrack_id, int(moment), activity_level])
+
+    def send_location(self, timetrack_id, lat, lon, details=None, timestamp=None):
+        moment = timestamp.timestamp() if timestamp else time.time()
+        details = details or {}
+        with self._lock:
+            self._location.append([
+                timetrack_id, int(moment), lat, lon, details.get('city'),
+                details.get('region'), details.get('country'), details.get('timezone')
+            ])
+
+    def flush(self):
+        """Envia o buffer; em caso de falha as amostras voltam para o próximo envio."""
+        with self._send_lock:
+            with self._lock:
+                activity, location = list(self._activity), list(self._location)
+                self._activity.clear()
+                self._location.clear()
+            if not activity and not location:
+                return True
+
+            body = json.dumps({'a': activity, 'l': location}, separators=(',', ':')).encode('utf-8')
+            request = urllib.request.Request(self.url, data=body, method='POST',
+                                             headers={'Content-Type': 'application/json'})
+            if self.token:
+                request.add_header('Authorization', f"Bearer {self.token}")
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                return True
+            except Exception as e:
+                print(f"Erro ao enviar telemetria ao agente: {e}")
+                with self._lock:
+                    # Devolve à frente do buffer; no limite, descarta as mais antigas
+                    self._activity = deque(activity + list(self._activity), maxlen=self._activity.maxlen)
+                    self._location = deque(location + list(self._location), maxlen=self._location.maxlen)
+                return False
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+_sink = None
+_sink_lock = threading.Lock()
+
+def get_telemetry_sink(db):
+    """Retorna o destino da telemetria do processo (agente, se configurado, ou o banco)."""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = HttpSink(INGEST_URL, INGEST_TOKEN) if INGEST_URL else DirectSink(db)
+        return _sink
@@ -0,0 +1,296 @@
+"""Importação em lote de folhas de ponto históricas (CSV ou JSON).
+
+Cada linha vira um registro em ``timetrack``. Colaboradores, projetos e
+tarefas são informados pelo nome e resolvidos para ids com mapas carregados
+uma única vez; as linhas válidas são gravadas em lotes com INSERT de várias
+linhas. Erros de validação são reportados por linha sem interromper o lote.
+
+A importação é idempotente: cada registro recebe uma ``import_key`` única
+(o id externo da linha, se houver, ou colaborador + entrada), e rodar o mesmo
+arquivo de novo não duplica registros.
+
+Colunas aceitas (CSV com ',' ou ';', ou JSON/JSON Lines com as mesmas chaves):
+    colaborador | username | user    login ou nome completo (obrigatório)
+    entrada | check_in                data/hora de entrada (obrigatório)
+    saida | check_out                 data/hora de saída (obrigatório)
+    data | date                       dia, quando entrada/saída trazem só a hora
+    projeto | project                 nome do projeto (opcional)
+    tarefa | task                     nome da tarefa do projeto (opcional)
+    id | external_id                  identificador na origem (opcional)
+
+Uso:
+    python timesheet_import.py horas_2023.csv --source aquisicao-x --errors erros.csv
+    python timesheet_import.py horas.json --dry-run
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+BATCH_SIZE = 1000
+MAX_SHIFT_HOURS = 24
+
+COLUMN_ALIASES = {
+    'user': ('colaborador', 'username', 'user', 'usuario', 'full_name'),
+    'check_in': ('entrada', 'check_in', 'inicio', 'start'),
+    'check_out': ('saida', 'check_out', 'fim', 'end'),
+    'date': ('data', 'date', 'dia'),
+    'project': ('projeto', 'project', 'project_name'),
+    'task': ('tarefa', 'task', 'task_name'),
+    'external_id': ('id', 'external_id', 'id_externo'),
+}
+
+DATETIME_FORMATS = (
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M',
+    '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M',
+)
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y')
+TIME_FORMATS = ('%H:%M:%S', '%H:%M')
+
+TIMETRACK_COLUMNS = (
+    'user_id', 'project_id', 'task_id', 'check_in', 'check_out', 'total_hours',
+    'date', 'manual_entry', 'manual_entry_reason', 'approved_by', 'import_key'
+)
+PROJECT_ID_INDEX = TIMETRACK_COLUMNS.index('project_id')
+
+class RowError(ValueError):
+    """Linha inválida; a mensagem vai para o relatório de erros."""
+
+def _parse(value, formats):
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+def read_rows(path):
+    """Lê o arquivo e devolve (número da linha, dicionário) de cada registro."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding='utf-8-sig', newline='') as source:
+        if extension == '.jsonl':
+            return [(number, json.loads(line)) for number, line in enumerate(source, 1) if line.strip()]
+        if extension == '.json':
+            data = json.load(source)
+            if isinstance(data, dict):
+                data = data.get('entries', [])
+            return list(enumerate(data, 1))
+
+        sample = source.read(4096)
+        source.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        # Linha 1 é o cabeçalho
+        return list(enumerate(csv.DictReader(source, dialect=dialect), 2))
+
+class TimesheetImporter:
+    """Valida, resolve nomes para ids e grava registros de ponto em lote."""
+
+    def __init__(self, db, approver_id, source='importacao', batch_size=BATCH_SIZE):
+        self.db = db
+        self.approver_id = approver_id
+        self.source = source
+        self.batch_size = batch_size
+        self.errors = []
+        self.project_ids = set()
+        self.stats = {'read': 0, 'valid': 0, 'inserted': 0, 'duplicates': 0, 'failed': 0}
+        self._load_lookups()
+
+    def _load_lookups(self):
+        """Carrega colaboradores, projetos e tarefas uma única vez."""
+        self.users = {}
+        for user in self.db.execute_query("SELECT id, username, full_name FROM users") or []:
+            self.users[user['username'].strip().lower()] = user['id']
+            # O login tem prioridade quando um nome completo coincide com outro login
+            self.users.setdefault(user['full_name'].strip().lower(), user['id'])
+        self.projects = {
+            project['name'].strip().lower(): project['id']
+            for project in self.db.execute_query("SELECT id, name FROM projects") or []
+        }
+        self.tasks = {
+            (task['project_id'], task['name'].strip().lower()): task['id']
+            for task in self.db.execute_query("SELECT id, project_id, name FROM tasks") or []
+        }
+
+    @staticmethod
+    def _field(row, name):
+        for alias in COLUMN_ALIASES[name]:
+            value = row.get(alias)
+            if value not in (None, ''):
+                return str(value).strip()
+        return None
+
+    def _parse_moment(self, value, day, label):
+        if value is None:
+            raise RowError(f"{label} ausente")
+        moment = _parse(value, DATETIME_FORMATS)
+        if moment is None and day is not None:
+            clock = _parse(value, TIME_FORMATS)
+            if clock is not None:
+                moment = datetime.combine(day, clock.time())
+        if moment is None:
+            raise RowError(f"{label} inválida: {value!r}")
+        return moment
+
+    def build_record(self, row):
+        """Converte uma linha do arquivo na tupla de TIMETRACK_COLUMNS."""
+        if not isinstance(row, dict):
+            raise RowError("registro não é um objeto")
+
+        user = self._field(row, 'user')
+        if not user:
+            raise RowError("colaborador ausente")
+        user_id = self.users.get(user.lower())
+        if user_id is None:
+            raise RowError(f"colaborador desconhecido: {user!r}")
+
+        project_id = None
+        project = self._field(row, 'project')
+        if project:
+            project_id = self.projects.get(project.lower())
+            if project_id is None:
+                raise RowError(f"projeto desconhecido: {project!r}")
+
+        task_id = None
+        task = self._field(row, 'task')
+        if task:
+            if project_id is None:
+                raise RowError("tarefa informada sem projeto")
+            task_id = self.tasks.get((project_id, task.lower()))
+            if task_id is None:
+                raise RowError(f"tarefa desconhecida no projeto {project!r}: {task!r}")
+
+        day = self._field(row, 'date')
+        if day is not None:
+            parsed_day = _parse(day, DATE_FORMATS)
+            if parsed_day is None:
+                raise RowError(f"data inválida: {day!r}")
+            day = parsed_day.date()
+
+        check_in = self._parse_moment(self._field(row, 'check_in'), day, "entrada")
+        check_out = self._parse_moment(self._field(row, 'check_out'), day, "saída")
+        if check_out <= check_in:
+            # Turno que atravessa a meia-noite informado só com horas
+            if day is not None and _parse(self._field(row, 'check_out'), TIME_FORMATS):
+                check_out += timedelta(days=1)
+            else:
+                raise RowError("saída anterior à entrada")
+        total_hours = (check_out - check_in).total_seconds() / 3600
+        if total_hours > MAX_SHIFT_HOURS:
+            raise RowError(f"turno acima de {MAX_SHIFT_HOURS}h ({total_hours:.1f}h)")
+
+        external_id = self._field(row, 'external_id')
+        natural_key = f"{self.source}|{external_id}" if external_id else f"{user_id}|{check_in.isoformat()}"
+        import_key = hashlib.sha1(natural_key.encode('utf-8')).hexdigest()
+
+        return (
+            user_id, project_id, task_id, check_in, check_out, round(total_hours, 2),
+            check_in.date(), True, f"Importado de {self.source}", self.approver_id, import_key
+        )
+
+    def _insert_query(self):
+        placeholders = ', '.join(['%s'] * len(TIMETRACK_COLUMNS))
+        # Chave já importada: mantém o registro existente (rowcount 0)
+        return (f"INSERT INTO timetrack ({', '.join(TIMETRACK_COLUMNS)}) VALUES ({placeholders}) "
+                f"ON DUPLICATE KEY UPDATE id = id")
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        query = self._insert_query()
+        written = len(batch)
+        inserted = self.db.execute_many(query, [record for _, record in batch])
+        if inserted is None:
+            # O lote foi desfeito: grava linha a linha para isolar as que falham
+            inserted = 0
+            for number, record in batch:
+                result = self.db.execute_update(query, record)
+                if result is None:
+                    self.errors.append((number, "erro ao gravar no banco"))
+                    self.stats['failed'] += 1
+                    written -= 1
+                else:
+                    inserted += result
+        self.stats['inserted'] += inserted
+        self.stats['duplicates'] += written - inserted
+        batch.clear()
+
+    def run(self, rows, dry_run=False):
+        """Importa (número da linha, registro) e devolve as estatísticas."""
+        batch = []
+        for number, row in rows:
+            self.stats['read'] += 1
+            try:
+                record = self.build_record(row)
+            except RowError as e:
+                self.errors.append((number, str(e)))
+                continue
+            self.stats['valid'] += 1
+            if dry_run:
+                continue
+            if record[PROJECT_ID_INDEX]:
+                self.project_ids.add(record[PROJECT_ID_INDEX])
+            batch.append((number, record))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+        if not dry_run:
+            self._flush(batch)
+            # Horas importadas entram nos contadores dos projetos (e tarefas) afetados
+            if self.project_ids and self.stats['inserted']:
+                self.db.rebuild_counters(self.project_ids)
+        self.stats['errors'] = len(self.errors)
+        return self.stats
+
+    def write_errors(self, path):
+        with open(path, 'w', encoding='utf-8', newline='') as output:
+            writer = csv.writer(output)
+            writer.writerow(('linha', 'erro'))
+            writer.writerows(self.errors)
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help="arquivo .csv, .json ou .jsonl")
+    parser.add_argument('--source', help="nome da origem (compõe a chave de idempotência); padrão: nome do arquivo")
+    parser.add_argument('--approver', default='admin', help="login do administrador que aprova os registros importados")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--errors', help="grava os erros por linha em CSV")
+    parser.add_argument('--dry-run', action='store_true', help="apenas valida, sem gravar")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from db import Database
+
+    db = Database()
+    approver = db.execute_query(
+        "SELECT id FROM users WHERE username = %s AND role = 'admin'", (args.approver,))
+    if not approver:
+        print(f"Administrador não encontrado: {args.approver}")
+        return 1
+
+    source = args.source or os.path.splitext(os.path.basename(args.path))[0]
+    importer = TimesheetImporter(db, approver[0]['id'], source=source, batch_size=args.batch_size)
+    stats = importer.run(read_rows(args.path), dry_run=args.dry_run)
+
+    print(f"Linhas lidas: {stats['read']} | válidas: {stats['valid']} | "
+          f"inseridas: {stats['inserted']} | já importadas: {stats['duplicates']} | "
+          f"erros: {stats['errors']}")
+    for number, message in importer.errors[:20]:
+        print(f"  linha {number}: {message}")
+    if len(importer.errors) > 20:
+        print(f"  ... e mais {len(importer.errors) - 20} erros")
+    if args.errors:
+        importer.write_errors(args.errors)
+        print(f"Erros gravados em {args.errors}")
+    return 0 if not importer.errors else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
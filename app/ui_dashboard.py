@@ -4,11 +4,14 @@ from components.navbar import NavBar
 from components.cards import StatsCard, TimeCard
 from components.charts import WeeklyChart
 from components.tables import HistoryTable, UsersTable
+from components.virtual_table import VirtualTable
 from components.activity_monitor_ui import ActivityCard, ActivityGraph
 from components.location_ui import LocationCard, LocationHistoryTable
-from components.reports_ui import ReportsScreen
 from activity_monitor import ActivityMonitor
 from location_service import GeolocationService
+from telemetry import get_telemetry_sink
+from presence import get_presence_registry
+from profiling import profiled
 
 class DashboardScreen:
     def __init__(self, user, db, auth, on_logout, toggle_theme, dark_mode):
@@ -27,13 +30,21 @@ class DashboardScreen:
         # Componentes e estado do monitoramento de atividade
         self.activity_monitor = None
         self.current_activity_level = 0
-        self.activity_update_timer = None
+        self.activity_refreshed_at = None
+        # Destino da telemetria: agente de ingestão (INGEST_URL) ou o banco
+        self.telemetry = get_telemetry_sink(db)
         
         # Serviço de geolocalização
         self.location_service = GeolocationService()
         self.current_location = None
         self.location_details = None
         
+        # Status de presença compartilhado ("quem está online") e componentes que o exibem
+        self.presence = get_presence_registry(db)
+        self.users_table = None
+        self.online_card = None
+        self.presence_unsubscribe = None
+        
         # Inicia monitoramento se o usuário estiver em um timetrack ativo e tiver consentido
         self.load_current_status()
         if self.is_checked_in and self.current_timetrack:
@@ -132,12 +143,17 @@ class DashboardScreen:
         self.approvals_dialog = ft.AlertDialog(
             modal=True,
             title=ft.Text("Aprovações Pendentes"),
-            content=ft.Column([], scroll=ft.ScrollMode.AUTO, height=400),
+            content=ft.Container(width=1000),
             actions=[
                 ft.TextButton("Fechar", on_click=self.close_dialog),
             ],
             actions_alignment=ft.MainAxisAlignment.END,
         )
+        self.approvals_table = None
+        self.approval_selection = set()
+        self.approval_selection_text = None
+        self.approvals_button = None
+        self.bulk_approval_dialog = None
         
         self.project_dropdown = ft.Dropdown(
             label="Selecione um Projeto",
@@ -273,82 +289,209 @@ class DashboardScreen:
             self.manual_error_text.value = f"Erro nos dados: {str(err)}"
             self.page.dialog.update()
             
-    def show_pending_approvals(self, pending_approvals):
-        """Mostra o diálogo com as aprovações pendentes"""
-        if not pending_approvals:
+    def _build_approval_cells(self, entry):
+        """Células de uma linha da lista de aprovações pendentes"""
+        return [
+            ft.Checkbox(
+                value=entry['id'] in self.approval_selection,
+                on_change=lambda e, id=entry['id']: self.toggle_approval_selection(id, e.control.value)
+            ),
+            ft.Text(entry['full_name'], weight=ft.FontWeight.BOLD),
+            ft.Text(entry['project_name'] or '--', color=ft.Colors.BLUE),
+            ft.Text(entry['date'].strftime('%d/%m/%Y')),
+            ft.Text(f"{entry['check_in'].strftime('%H:%M')} - {entry['check_out'].strftime('%H:%M')}"),
+            ft.Text(f"{entry['total_hours']:.2f}h"),
+            ft.Text(entry['manual_entry_reason'] or '', italic=True, tooltip=entry['manual_entry_reason']),
+            ft.Row([
+                ft.IconButton(
+                    icon=ft.Icons.CLOSE,
+                    icon_color=ft.Colors.RED,
+                    tooltip="Rejeitar",
+                    on_click=lambda e, id=entry['id']: self.handle_entry_rejection(id)
+                ),
+                ft.IconButton(
+                    icon=ft.Icons.CHECK,
+                    icon_color=ft.Colors.GREEN,
+                    tooltip="Aprovar",
+                    on_click=lambda e, id=entry['id']: self.handle_entry_approval(id)
+                ),
+            ], spacing=0)
+        ]
+
+    def show_pending_approvals(self):
+        """Mostra o diálogo com as aprovações pendentes (carregadas por páginas)"""
+        if not self.db.count_pending_approvals():
             self.show_snackbar("Não há registros manuais pendentes de aprovação.")
             return
             
-        content_list = []
-        for entry in pending_approvals:
-            card = ft.Card(
-                content=ft.Container(
-                    content=ft.Column([
-                        ft.Text(
-                            f"Colaborador: {entry['full_name']}",
-                            size=16,
-                            weight=ft.FontWeight.BOLD
-                        ),
-                        ft.Text(
-                            f"Projeto: {entry['project_name']}",
-                            size=14,
-                            color=ft.Colors.BLUE
-                        ),
-                        ft.Text(
-                            f"Data: {entry['date'].strftime('%d/%m/%Y')}",
-                            size=14
-                        ),
-                        ft.Text(
-                            f"Horário: {entry['check_in'].strftime('%H:%M')} - {entry['check_out'].strftime('%H:%M')}",
-                            size=14
-                        ),
-                        ft.Text(
-                            f"Total: {entry['total_hours']:.2f}h",
-                            size=14
-                        ),
-                        ft.Text(
-                            f"Motivo: {entry['manual_entry_reason']}",
-                            size=14,
-                            italic=True
-                        ),
-                        ft.Row([
-                            ft.OutlinedButton(
-                                "❌ Rejeitar",
-                                on_click=lambda e, id=entry['id']: self.handle_entry_rejection(id)
-                            ),
-                            ft.FilledButton(
-                                "✅ Aprovar",
-                                on_click=lambda e, id=entry['id']: self.handle_entry_approval(id)
-                            ),
-                        ], alignment=ft.MainAxisAlignment.END)
-                    ], spacing=10),
-                    padding=20
-                ),
-                margin=ft.margin.only(bottom=10)
+        self.approval_selection = set()
+        self.approvals_table = VirtualTable(
+            columns=[
+                {'key': 'select', 'label': "", 'width': 50},
+                {'key': 'full_name', 'label': "Colaborador", 'width': 170, 'sortable': True},
+                {'key': 'project_name', 'label': "Projeto", 'width': 140, 'sortable': True},
+                {'key': 'date', 'label': "Data", 'width': 100, 'sortable': True},
+                {'key': 'check_in', 'label': "Horário", 'width': 110},
+                {'key': 'total_hours', 'label': "Total", 'width': 80, 'sortable': True},
+                {'key': 'manual_entry_reason', 'label': "Motivo", 'expand': True},
+                {'key': 'actions', 'label': "", 'width': 100},
+            ],
+            fetch_page=lambda offset, limit, sort_key, descending, filters: self.db.get_pending_approvals(
+                offset=offset, limit=limit, sort=sort_key, descending=descending, **filters
+            ),
+            build_cells=self._build_approval_cells,
+            sort_key='date',
+            descending=True,
+            height=420,
+            empty_message="Não há registros manuais pendentes de aprovação."
+        )
+        
+        projects = self.db.get_active_projects() or []
+        project_filter = ft.Dropdown(
+            label="Projeto",
+            width=220,
+            options=[ft.dropdown.Option("todos", "Todos")] + [
+                ft.dropdown.Option(str(p['id']), p['name']) for p in projects
+            ],
+            value="todos",
+            on_change=lambda e: self.filter_pending_approvals(
+                project_id=None if e.control.value == "todos" else int(e.control.value)
             )
-            content_list.append(card)
+        )
+        self.approval_selection_text = ft.Text("Nenhum selecionado", size=12)
+        
+        toolbar = ft.Row([
+            project_filter,
+            ft.TextButton("Selecionar carregados", on_click=lambda e: self.select_loaded_approvals(True)),
+            ft.TextButton("Limpar seleção", on_click=lambda e: self.select_loaded_approvals(False)),
+            self.approval_selection_text,
+            ft.Container(expand=True),
+            ft.OutlinedButton("❌ Rejeitar selecionados", on_click=lambda e: self.reject_selected_entries()),
+            ft.FilledButton("✅ Aprovar selecionados", on_click=lambda e: self.approve_selected_entries()),
+            ft.FilledButton("Aprovar todos do filtro", on_click=lambda e: self.approve_filtered_entries()),
+        ], wrap=True)
             
-        self.approvals_dialog.content.controls = content_list
+        self.approvals_dialog.content = ft.Container(
+            ft.Column([toolbar, self.approvals_table.build()], tight=True),
+            width=1000
+        )
+        self.page.dialog = self.approvals_dialog
+        self.approvals_dialog.open = True
+        self.page.update()
+        
+    def toggle_approval_selection(self, timetrack_id, selected):
+        if selected:
+            self.approval_selection.add(timetrack_id)
+        else:
+            self.approval_selection.discard(timetrack_id)
+        self._update_approval_selection_text()
+        
+    def select_loaded_approvals(self, selected):
+        """Marca ou desmarca todas as linhas já carregadas"""
+        if selected:
+            self.approval_selection.update(entry['id'] for entry in self.approvals_table.records)
+        else:
+            self.approval_selection.clear()
+        self.approvals_table.refresh()
+        self._update_approval_selection_text()
+        
+    def filter_pending_approvals(self, **filters):
+        self.approval_selection.clear()
+        self.approvals_table.set_filters(**filters)
+        self._update_approval_selection_text()
+        
+    def _update_approval_selection_text(self):
+        count = len(self.approval_selection)
+        self.approval_selection_text.value = f"{count} selecionado(s)" if count else "Nenhum selecionado"
+        if self.approval_selection_text.page:
+            self.approval_selection_text.update()
+        
+    def _after_bulk_action(self, count, message):
+        """Atualiza a lista e o contador do botão sem reconstruir o dashboard"""
+        if count is None:
+            self.show_snackbar("Erro ao processar os registros selecionados.")
+            return
+        self.approval_selection.clear()
+        self._update_approval_selection_text()
+        self.approvals_table.refresh()
+        self._update_approvals_button()
+        self.show_snackbar(message.format(count=count))
+        
+    def approve_selected_entries(self):
+        if not self.approval_selection:
+            self.show_snackbar("Selecione ao menos um registro.")
+            return
+        count = self.db.approve_manual_entries(self.user['id'], ids=list(self.approval_selection))
+        self._after_bulk_action(count, "{count} registro(s) aprovado(s).")
+        
+    def reject_selected_entries(self):
+        if not self.approval_selection:
+            self.show_snackbar("Selecione ao menos um registro.")
+            return
+        count = self.db.reject_manual_entries(ids=list(self.approval_selection))
+        self._after_bulk_action(count, "{count} registro(s) rejeitado(s).")
+        
+    def approve_filtered_entries(self):
+        """Pede confirmação, com a quantidade exata, antes de aprovar todos os pendentes do filtro"""
+        filters = dict(self.approvals_table.filters)
+        pending = self.db.count_pending_approvals(**filters)
+        if not pending:
+            self.show_snackbar("Não há registros pendentes para este filtro.")
+            return
+        scope = "que atendem ao filtro atual" if filters else "de TODOS os colaboradores e projetos"
+        self.bulk_approval_dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Confirmar aprovação em massa"),
+            content=ft.Text(
+                f"Aprovar {pending} registro(s) manual(is) pendente(s) {scope}, "
+                "inclusive os que não foram carregados na lista? Esta ação não pode ser desfeita."
+            ),
+            actions=[
+                ft.TextButton("Cancelar", on_click=lambda e: self._close_bulk_approval()),
+                ft.FilledButton(f"Aprovar {pending}", on_click=lambda e: self._confirm_bulk_approval(filters)),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END,
+        )
+        self.page.dialog = self.bulk_approval_dialog
+        self.bulk_approval_dialog.open = True
+        self.page.update()
+
+    def _close_bulk_approval(self):
+        """Fecha a confirmação e volta à lista de aprovações"""
+        self.bulk_approval_dialog.open = False
         self.page.dialog = self.approvals_dialog
         self.approvals_dialog.open = True
         self.page.update()
+
+    def _confirm_bulk_approval(self, filters):
+        """Aprova todos os pendentes do filtro confirmado (inclusive os não carregados)"""
+        self._close_bulk_approval()
+        count = self.db.approve_manual_entries(self.user['id'], all_pending=not filters, **filters)
+        self._after_bulk_action(count, "{count} registro(s) aprovado(s).")
         
     def handle_entry_approval(self, timetrack_id):
         """Aprova um registro manual"""
-        result = self.db.approve_manual_entry(timetrack_id, self.user['id'])
-        if result:
-            self.show_snackbar("Registro aprovado com sucesso!")
-            self.close_dialog(None)
-            self.refresh_dashboard()
-        else:
-            self.show_snackbar("Erro ao aprovar registro.")
+        count = self.db.approve_manual_entries(self.user['id'], ids=[timetrack_id])
+        self.approval_selection.discard(timetrack_id)
+        self._after_bulk_action(count, "Registro aprovado com sucesso!")
             
     def handle_entry_rejection(self, timetrack_id):
         """Rejeita um registro manual (remove o registro)"""
-        # Aqui você pode implementar a lógica de rejeição
-        # Por exemplo, movendo o registro para uma tabela de histórico
-        # ou simplesmente deletando
-        self.show_snackbar("Função de rejeição a ser implementada.")
+        count = self.db.reject_manual_entries(ids=[timetrack_id])
+        self.approval_selection.discard(timetrack_id)
+        self._after_bulk_action(count, "Registro rejeitado.")
+        
+    def _update_approvals_button(self):
+        if not self.approvals_button:
+            return
+        approvals_count = self.db.count_pending_approvals()
+        self.approvals_button.text = f"Aprovações Pendentes ({approvals_count})"
+        self.approvals_button.style = ft.ButtonStyle(
+            bgcolor=ft.Colors.ORANGE if approvals_count > 0 else ft.Colors.GREY,
+            color=ft.Colors.WHITE
+        )
+        if self.approvals_button.page:
+            self.approvals_button.update()
     # --- Fim das Funções de Cadastro ---
 
     def load_current_status(self):
@@ -372,6 +515,28 @@ class DashboardScreen:
             self.is_checked_in = False
             self.is_on_break = False
 
+    def publish_presence(self):
+        """Publica o status atual do usuário no registro de presença."""
+        self.presence.set_status(self.user, self.current_timetrack, self.is_on_break)
+
+    def on_presence_change(self, changes):
+        """Aplica no painel do admin apenas as linhas de status alteradas."""
+        if not self.users_table:
+            return
+        if not self.users_table.apply_changes(changes):
+            self.refresh_dashboard()
+            return
+        if self.online_card:
+            self.online_card.set_value(str(self.presence.online_count()))
+
+    def logout(self):
+        """Cancela a inscrição no registro de presença e encerra a sessão."""
+        if self.presence_unsubscribe:
+            self.presence_unsubscribe()
+            self.presence_unsubscribe = None
+        self.users_table = None
+        self.on_logout()
+
     def load_projects(self):
         """Carrega os projetos ativos do banco de dados e preenche o dropdown."""
         projects = self.db.get_active_projects()
@@ -425,17 +590,18 @@ class DashboardScreen:
                 if not location:
                     self.show_snackbar("Aviso: Não foi possível obter sua localização.")
                 
-            result = self.db.check_in_user(self.user['id'], project_id)
+            result = self.db.check_in_user(self.user['id'], project_id, int(task_id) if task_id else None)
             if result:
                 # Registra localização se disponível
                 if location:
                     lat, lon = location
                     self.current_location = location
                     self.location_details = self.location_service.get_location_details(lat, lon)
-                    self.db.log_location(result, lat, lon, self.location_details)
+                    self.telemetry.send_location(result, lat, lon, self.location_details)
                     
                 self.show_snackbar("Check-in realizado com sucesso!")
                 self.load_current_status()
+                self.publish_presence()
                 self.load_projects()
                 
                 # Inicia monitoramentos conforme consentimento
@@ -457,7 +623,7 @@ class DashboardScreen:
                 if location:
                     lat, lon = location
                     self.location_details = self.location_service.get_location_details(lat, lon)
-                    self.db.log_location(self.current_timetrack['id'], lat, lon, self.location_details)
+                    self.telemetry.send_location(self.current_timetrack['id'], lat, lon, self.location_details)
                 else:
                     self.show_snackbar("Aviso: Não foi possível obter sua localização.")
 
@@ -465,10 +631,12 @@ class DashboardScreen:
             if result:
                 self.show_snackbar("Check-out realizado com sucesso!")
                 self.load_current_status()
+                self.publish_presence()
                 self.project_dropdown.value = None
                 self.load_projects()
                 self.refresh_dashboard()
                 
+    @profiled("DashboardScreen.refresh_dashboard")
     def refresh_dashboard(self):
         """Atualiza o conteúdo principal do dashboard."""
         if self.auth.is_admin(self.user):
@@ -490,7 +658,7 @@ class DashboardScreen:
             self.location_details = self.location_service.get_location_details(lat, lon)
             
             if self.current_timetrack:
-                self.db.log_location(
+                self.telemetry.send_location(
                     self.current_timetrack['id'],
                     lat,
                     lon,
@@ -522,41 +690,38 @@ class DashboardScreen:
         if not self.user.get('location_tracking_consent'):
             return None
             
-        history_data = self.db.get_location_history(
-            self.user['id'],
-            start_date=datetime.now().replace(hour=0, minute=0, second=0)
-        )
-        return LocationHistoryTable(history_data).build()
+        start_date = datetime.now().replace(hour=0, minute=0, second=0)
+        return LocationHistoryTable(
+            lambda offset, limit, sort_key, descending, filters: self.db.get_location_history(
+                self.user['id'], start_date=start_date, offset=offset, limit=limit
+            )
+        ).build()
         
     def start_activity_monitoring(self, timetrack_id):
         """Inicia o monitoramento de atividade do usuário."""
-        if not hasattr(self, 'activity_monitor') or not self.activity_monitor:
-            self.activity_monitor = ActivityMonitor()
+        if not self.activity_monitor:
+            self.activity_monitor = ActivityMonitor(
+                self.telemetry, self.user['id'], timetrack_id, on_level=self.on_activity_level
+            )
             self.activity_monitor.start()
-            
-            # Configura o timer para atualizar o nível de atividade
-            def update_activity():
-                if self.activity_monitor and self.activity_monitor.is_running:
-                    current_level = self.activity_monitor.get_activity_level()
-                    if current_level != self.current_activity_level:
-                        self.current_activity_level = current_level
-                        self.db.update_activity_level(timetrack_id, current_level)
-                        # Atualiza o gráfico de atividade se estiver visível
-                        self.refresh_dashboard()
-                
-            # Atualiza a cada 5 minutos
-            self.activity_update_timer = ft.Timer(update_activity, 300)
-            self.activity_update_timer.start()
-            
+
+    def on_activity_level(self, level):
+        """Recebe cada leitura do monitor (thread do monitor) e atualiza a tela."""
+        now = datetime.now()
+        # Redesenha o painel no máximo a cada 5 minutos, e só se o nível mudou
+        if level == self.current_activity_level or (
+                self.activity_refreshed_at and (now - self.activity_refreshed_at).total_seconds() < 300):
+            return
+        self.current_activity_level = level
+        self.activity_refreshed_at = now
+        self.refresh_dashboard()
+
     def stop_activity_monitoring(self):
         """Para o monitoramento de atividade do usuário."""
-        if hasattr(self, 'activity_monitor') and self.activity_monitor:
+        if self.activity_monitor:
             self.activity_monitor.stop()
             self.activity_monitor = None
-            
-        if hasattr(self, 'activity_update_timer') and self.activity_update_timer:
-            self.activity_update_timer.stop()
-            self.activity_update_timer = None
+
     def handle_break_start(self, e):
         """Inicia uma pausa"""
         if self.is_checked_in and not self.is_on_break and self.current_timetrack:
@@ -565,6 +730,7 @@ class DashboardScreen:
             if result:
                 self.show_snackbar("Pausa iniciada com sucesso!")
                 self.load_current_status()
+                self.publish_presence()
                 self.refresh_dashboard()
                 
     def handle_break_end(self, e):
@@ -574,8 +740,10 @@ class DashboardScreen:
             if result:
                 self.show_snackbar("Pausa finalizada com sucesso!")
                 self.load_current_status()
+                self.publish_presence()
                 self.refresh_dashboard()
     
+    @profiled("DashboardScreen.build_colaborador_content")
     def build_colaborador_content(self):
         """Constrói o conteúdo da UI para um colaborador."""
         if self.is_on_break:
@@ -675,9 +843,11 @@ class DashboardScreen:
             ])
         ]
         
+    @profiled("DashboardScreen.build_admin_content")
     def build_admin_content(self):
         """Constrói o conteúdo da UI para um administrador."""
-        users_data = self.db.get_all_users_status() or []
+        # Status vem do registro de presença, atualizado por eventos (sem consultar o banco a cada refresh)
+        users_data = self.presence.snapshot()
         online_count = sum(1 for u in users_data if u.get('check_in') and not u.get('check_out'))
         total_users = len(users_data)
         
@@ -685,6 +855,10 @@ class DashboardScreen:
         online_card = StatsCard("Online Agora", str(online_count), ft.Icons.CIRCLE, ft.Colors.GREEN)
         
         users_table = UsersTable(users_data)
+        self.users_table = users_table
+        self.online_card = online_card
+        if not self.presence_unsubscribe:
+            self.presence_unsubscribe = self.presence.subscribe(self.on_presence_change)
         
         weekly_data = self.db.get_weekly_report()
         weekly_chart = WeeklyChart(weekly_data or [], admin_view=True)
@@ -703,18 +877,18 @@ class DashboardScreen:
             style=ft.ButtonStyle(bgcolor=ft.Colors.BLUE, color=ft.Colors.WHITE)
         )
 
-        pending_approvals = self.db.get_pending_approvals()
-        approvals_count = len(pending_approvals) if pending_approvals else 0
+        approvals_count = self.db.count_pending_approvals()
         
         approvals_button = ft.ElevatedButton(
             f"Aprovações Pendentes ({approvals_count})",
             icon=ft.Icons.PENDING_ACTIONS,
-            on_click=lambda e: self.show_pending_approvals(pending_approvals),
+            on_click=lambda e: self.show_pending_approvals(),
             style=ft.ButtonStyle(
                 bgcolor=ft.Colors.ORANGE if approvals_count > 0 else ft.Colors.GREY,
                 color=ft.Colors.WHITE
             )
         )
+        self.approvals_button = approvals_button
         
         return [
             ft.Row([
@@ -754,6 +928,7 @@ class DashboardScreen:
         from ui_project_manager import ProjectManagerScreen
         
         self.show_projects = True
+        self.users_table = None
         project_screen = ProjectManagerScreen(
             self.db,
             self.user,
@@ -769,7 +944,10 @@ class DashboardScreen:
         
     def show_reports_screen(self):
         """Mostra a tela de relatórios"""
+        from components.reports_ui import ReportsScreen
+        
         self.show_projects = False  # Garante que a tela de projetos está fechada
+        self.users_table = None
         reports_screen = ReportsScreen(
             self.user,
             self.db,
@@ -786,6 +964,7 @@ class DashboardScreen:
         """Mostra a tela de gerenciamento de colaboradores"""
         from components.collaborators_ui import CollaboratorsScreen
         
+        self.users_table = None
         collaborators_screen = CollaboratorsScreen(
             self.user,
             self.db,
@@ -798,6 +977,7 @@ class DashboardScreen:
         """Volta para a tela principal"""
         self.refresh_dashboard()
         
+    @profiled("DashboardScreen.build")
     def build(self, page: ft.Page):
         """Constrói a interface principal do dashboard."""
         self.page = page
@@ -810,7 +990,7 @@ class DashboardScreen:
             self.checkout_time_picker
         ])
         
-        navbar = NavBar(self.user, self.db, self.on_logout, self.toggle_theme, self.dark_mode)
+        navbar = NavBar(self.user, self.db, self.logout, self.toggle_theme, self.dark_mode)
         
         if self.auth.is_admin(self.user):
             content = self.build_admin_content()
@@ -1,6 +1,7 @@
 import flet as ft
 from datetime import datetime
-import bcrypt
+from auth import hash_password
+from components.virtual_table import VirtualTable
 
 class EmployeeManagementScreen(ft.UserControl):
     def __init__(self, db, page, show_snack_bar, current_user):
@@ -9,7 +10,6 @@ class EmployeeManagementScreen(ft.UserControl):
         self.page = page
         self.show_snack_bar = show_snack_bar
         self.current_user = current_user
-        self.employees = []
         self.init_fields()
 
     def init_fields(self):
@@ -63,35 +63,26 @@ class EmployeeManagementScreen(ft.UserControl):
             value=False
         )
 
-        # DataTable columns
-        self.columns = [
-            ft.DataColumn(ft.Text("Nome completo")),
-            ft.DataColumn(ft.Text("Usuário")),
-            ft.DataColumn(ft.Text("Taxa horária")),
-            ft.DataColumn(ft.Text("Rastreamento"), numeric=True),
-            ft.DataColumn(ft.Text("Ações"), numeric=True)
-        ]
-
-        self.data_table = ft.DataTable(
-            columns=self.columns,
-            rows=[],
-            border=ft.border.all(1, ft.Colors.OUTLINE),
-            border_radius=10,
-            vertical_lines=ft.border.BorderSide(1, ft.Colors.OUTLINE_VARIANT),
-            horizontal_lines=ft.border.BorderSide(1, ft.Colors.OUTLINE_VARIANT),
-            column_spacing=50,
-            heading_row_height=70,
-            data_row_min_height=50,
-            data_row_max_height=100,
-            divider_thickness=0,
-            column_spacing=5,
-            width=1100
+        # Tabela paginada: ordenação e filtros no servidor, linhas buscadas sob demanda
+        self.data_table = VirtualTable(
+            columns=[
+                {'key': 'full_name', 'label': "Nome completo", 'expand': True, 'sortable': True},
+                {'key': 'username', 'label': "Usuário", 'width': 180, 'sortable': True},
+                {'key': 'hourly_rate', 'label': "Taxa horária", 'width': 140, 'sortable': True},
+                {'key': 'tracking', 'label': "Rastreamento", 'width': 130},
+                {'key': 'actions', 'label': "Ações", 'width': 110}
+            ],
+            fetch_page=lambda offset, limit, sort_key, descending, filters: self.db.get_collaborators(
+                offset=offset, limit=limit, sort=sort_key, descending=descending, **filters
+            ),
+            build_cells=self.build_employee_cells,
+            sort_key='full_name',
+            row_height=56,
+            height=600
         )
 
     def build(self):
         """Build the employee management screen"""
-        self.load_employees()
-        
         # Title and Add button
         title_row = ft.Row(
             [
@@ -112,7 +103,8 @@ class EmployeeManagementScreen(ft.UserControl):
             content=ft.Column([
                 title_row,
                 ft.Divider(height=2, color=ft.Colors.SURFACE_VARIANT),
-                self.data_table
+                self.data_table.search_field("Buscar por nome, usuário ou e-mail"),
+                self.data_table.build()
             ]),
             padding=20,
             bgcolor=ft.Colors.SURFACE,
@@ -125,67 +117,55 @@ class EmployeeManagementScreen(ft.UserControl):
             padding=20
         )
 
-    def load_employees(self):
-        """Load employees from database and update DataTable"""
-        query = """
-            SELECT id, username, full_name, hourly_rate, location_tracking_consent, activity_tracking_consent 
-            FROM users WHERE role = 'colaborador'
-            ORDER BY full_name
-        """
-        self.employees = self.db.execute_query(query)
+    def build_employee_cells(self, emp):
+        """Build the cells of one employee row"""
+        tracking_icons = ft.Row(
+            controls=[
+                ft.Icon(
+                    ft.Icons.LOCATION_ON if emp['location_tracking_consent'] else ft.Icons.LOCATION_OFF,
+                    color=ft.Colors.PRIMARY if emp['location_tracking_consent'] else ft.Colors.ERROR,
+                    size=20
+                ),
+                ft.Icon(
+                    ft.Icons.MONITOR_HEART if emp['activity_tracking_consent'] else ft.Icons.MONITOR_HEART_OUTLINED,
+                    color=ft.Colors.PRIMARY if emp['activity_tracking_consent'] else ft.Colors.ERROR,
+                    size=20
+                ),
+            ],
+            spacing=5
+        )
         
-        rows = []
-        for emp in self.employees:
-            tracking_icons = ft.Row(
-                controls=[
-                    ft.Icon(
-                        ft.Icons.LOCATION_ON if emp['location_tracking_consent'] else ft.Icons.LOCATION_OFF,
-                        color=ft.Colors.PRIMARY if emp['location_tracking_consent'] else ft.Colors.ERROR,
-                        size=20
-                    ),
-                    ft.Icon(
-                        ft.Icons.MONITOR_HEART if emp['activity_tracking_consent'] else ft.Icons.MONITOR_HEART_OUTLINED,
-                        color=ft.Colors.PRIMARY if emp['activity_tracking_consent'] else ft.Colors.ERROR,
-                        size=20
-                    ),
-                ],
-                spacing=5
-            )
-            
-            actions = ft.Row(
-                controls=[
-                    ft.IconButton(
-                        icon=ft.Icons.EDIT,
-                        icon_color=ft.Colors.PRIMARY,
-                        tooltip="Editar",
-                        data=emp,
-                        on_click=self.show_edit_dialog
-                    ),
-                    ft.IconButton(
-                        icon=ft.Icons.DELETE,
-                        icon_color=ft.Colors.ERROR,
-                        tooltip="Excluir",
-                        data=emp,
-                        on_click=self.show_delete_dialog
-                    )
-                ],
-                spacing=0
-            )
-            
-            rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(emp['full_name'])),
-                        ft.DataCell(ft.Text(emp['username'])),
-                        ft.DataCell(ft.Text(f"R$ {emp['hourly_rate'] or 0:.2f}")),
-                        ft.DataCell(tracking_icons),
-                        ft.DataCell(actions)
-                    ]
+        actions = ft.Row(
+            controls=[
+                ft.IconButton(
+                    icon=ft.Icons.EDIT,
+                    icon_color=ft.Colors.PRIMARY,
+                    tooltip="Editar",
+                    data=emp,
+                    on_click=self.show_edit_dialog
+                ),
+                ft.IconButton(
+                    icon=ft.Icons.DELETE,
+                    icon_color=ft.Colors.ERROR,
+                    tooltip="Excluir",
+                    data=emp,
+                    on_click=self.show_delete_dialog
                 )
-            )
+            ],
+            spacing=0
+        )
         
-        self.data_table.rows = rows
-        self.update()
+        return [
+            ft.Text(emp['full_name']),
+            ft.Text(emp['username']),
+            ft.Text(f"R$ {emp['hourly_rate'] or 0:.2f}"),
+            tracking_icons,
+            actions
+        ]
+
+    def load_employees(self):
+        """Reload employees from the first page"""
+        self.data_table.reload()
 
     def validate_employee_form(self):
         """Validate employee form fields"""
@@ -239,11 +219,8 @@ class EmployeeManagementScreen(ft.UserControl):
                 
                 # Update password if provided
                 if self.password_field.value:
-                    hashed_password = bcrypt.hashpw(
-                        self.password_field.value.encode('utf-8'),
-                        bcrypt.gensalt()
-                    ).decode('utf-8')
-                    query = query.replace("WHERE", ", password = %s WHERE")
+                    hashed_password = hash_password(self.password_field.value)
+                    query = query.replace("WHERE", ", password = %s, session_version = session_version + 1 WHERE")
                     params = (
                         self.fullname_field.value,
                         hourly_rate,
@@ -262,10 +239,7 @@ class EmployeeManagementScreen(ft.UserControl):
                     return
 
                 # Create new employee
-                hashed_password = bcrypt.hashpw(
-                    self.password_field.value.encode('utf-8'),
-                    bcrypt.gensalt()
-                ).decode('utf-8')
+                hashed_password = hash_password(self.password_field.value)
                 
                 query = """
                     INSERT INTO users (
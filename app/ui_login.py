@@ -1,4 +1,5 @@
 import flet as ft
+from auth import LoginRateLimited
 
 class LoginScreen:
     def __init__(self, auth_manager, on_success, toggle_theme):
@@ -8,6 +9,7 @@ class LoginScreen:
         self.username_field = ft.TextField()
         self.password_field = ft.TextField()
         self.error_text = ft.Text()
+        self.login_btn = None
         
     def handle_login(self, e):
         """Processa tentativa de login"""
@@ -17,8 +19,25 @@ class LoginScreen:
         if not username or not password:
             self.show_error("Por favor, preencha todos os campos")
             return
+        if self.login_btn.disabled:
+            return
+            
+        # O bcrypt leva centenas de ms: roda em outra thread para não travar a interface
+        self.login_btn.disabled = True
+        self.login_btn.update()
+        e.page.run_thread(self.authenticate, username, password, getattr(e.page, 'client_ip', None))
+
+    def authenticate(self, username, password, ip):
+        """Verifica as credenciais (fora da thread do evento) e conclui o login"""
+        try:
+            user = self.auth.login(username, password, ip=ip)
+        except LoginRateLimited as error:
+            self.show_error(str(error))
+            return
+        finally:
+            self.login_btn.disabled = False
+            self.login_btn.update()
             
-        user = self.auth.login(username, password)
         if user:
             self.on_success(user)
         else:
@@ -52,7 +71,7 @@ class LoginScreen:
         )
         
         # Botão de login
-        login_btn = ft.ElevatedButton(
+        self.login_btn = ft.ElevatedButton(
             text="Entrar",
             on_click=self.handle_login,
             style=ft.ButtonStyle(
@@ -97,7 +116,7 @@ class LoginScreen:
                     self.password_field,
                     self.error_text,
                     ft.Divider(height=10, color=ft.Colors.TRANSPARENT),
-                    login_btn,
+                    self.login_btn,
                     ft.Divider(height=20, color=ft.Colors.TRANSPARENT),
                     ft.Text(
                         "Login padrão: admin / admin123",
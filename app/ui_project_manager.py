@@ -1,5 +1,6 @@
 import flet as ft
 from components.project_manager import ProjectManager
+from profiling import profiled
 
 class ProjectManagerScreen:
     def __init__(self, db, user, on_back):
@@ -8,6 +9,7 @@ class ProjectManagerScreen:
         self.on_back = on_back
         self.project_manager = ProjectManager(db, user)
         
+    @profiled("ProjectManagerScreen.build")
     def build(self, page):
         """Constrói a interface de gerenciamento de projetos"""
         header = ft.Row([